@@ -0,0 +1,58 @@
+"""Check that all servers of a geoserver cluster hold the same catalog.
+
+All servers in the config file (the [server:<name>] sections, see
+geoserver/cluster.py) are crawled at the same time, every server to its own
+export in the export directory. The settings of every object are hashed and
+the objects that are not the same on all servers are printed, with the servers
+grouped by the version of the object they have.
+
+Exits with status 1 when the servers differ.
+"""
+
+import argparse
+import os
+import sys
+from geoserver import util
+from geoserver import cluster
+
+parser = argparse.ArgumentParser(description='Compare the catalogs of the ' +
+                                             'servers of a geoserver cluster.')
+parser.add_argument('--config', default='settings.cfg',
+                    help='config file with a [server:<name>] section for ' +
+                         'every server')
+parser.add_argument('--servers', nargs='+', default=None,
+                    help='names of the servers to compare (default: all)')
+parser.add_argument('--directory', default='exports',
+                    help='the directory for the exports of the servers')
+parser.add_argument('--workers', type=int, default=None,
+                    help='number of concurrent requests per server ' +
+                         '(default: pool_size from the config file)')
+parser.add_argument('--skip-export', action='store_true',
+                    help='compare the exports in the directory instead of ' +
+                         'crawling the servers')
+args = parser.parse_args()
+
+sections = util.server_sections(args.config)
+if args.servers:
+    sections = [s for s in sections if cluster.node_name(s) in args.servers]
+
+if args.skip_export:
+    exports = dict((cluster.node_name(s),
+                    os.path.join(args.directory,
+                                 cluster.node_name(s) + '.jsonl'))
+                   for s in sections)
+else:
+    exports = cluster.export_servers(args.config, args.directory, sections,
+                                     args.workers)
+
+hashes = {}
+for node, filename in sorted(exports.items()):
+    if filename is None or not os.path.exists(filename):
+        print 'No export of server "{0}"'.format(node)
+        continue
+    hashes[node] = cluster.hash_export(filename)
+
+differences = cluster.compare_hashes(hashes)
+cluster.print_report(differences, sorted(hashes))
+if differences or len(hashes) < len(exports):
+    sys.exit(1)
@@ -0,0 +1,155 @@
+"""Benchmark a full export against a fake geoserver (see fake_geoserver.py).
+
+The fake geoserver runs in a separate process with a synthetic catalog of the
+given size and latency. The export is done like get_all_from_geoserver.py does
+it, in a temporary directory. Reports the wall time, the number of requests
+per second and per object type and the peak memory of the export.
+
+Example:
+    $ python benchmark.py --workspaces 50 --featuretypes 20 --latency 5
+    $ python benchmark.py --workers 1 --output serial.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+import urllib2
+
+import fake_geoserver
+from geoserver import util
+from geoserver import crawler
+from geoserver import export
+
+def run_server(args, queue):
+    """Start the fake geoserver and put its address on the queue."""
+    catalog = fake_geoserver.Catalog(workspaces=args.workspaces,
+                                     datastores=args.datastores,
+                                     featuretypes=args.featuretypes,
+                                     coveragestores=args.coveragestores,
+                                     styles=args.styles,
+                                     sld_size=args.sld_size,
+                                     layergroups=args.layergroups)
+    server = fake_geoserver.FakeGeoserver(('127.0.0.1', 0), catalog,
+                                          latency=args.latency / 1000.0)
+    queue.put(server.server_address)
+    server.serve_forever()
+
+def write_config(directory, address, args):
+    """Write the config file for the fake geoserver.
+
+    Returns the filename of the config file.
+    """
+    filename = os.path.join(directory, 'settings.cfg')
+    with open(filename, 'w') as f:
+        f.write('[server]\n')
+        f.write('url = {0}\nport = {1}\n'.format(*address))
+        f.write('address = geoserver\nuser = admin\npass = geoserver\n')
+        f.write('pool_size = {0}\n'.format(args.pool_size or args.workers))
+        f.write('\n[logging]\n')
+        f.write('filename = {0}\n'.format(os.path.join(directory,
+                                                       'benchmark.log')))
+        f.write('level = WARNING\n')
+        f.write('\n[cache]\nenabled = {0}\n'.format(args.cache))
+    return filename
+
+def run_export(config_file, workers):
+    """Do a full export like get_all_from_geoserver.py in the current
+    directory.
+    """
+    config = util.Util(config_file=config_file)
+    gs_crawler = crawler.Crawler(config, workers=workers)
+    export.write_export(gs_crawler, 'geoserver_config.jsonl')
+    gs_crawler.download_slds(dict((name, data) for kind, name, data in
+                                  export.iter_export('geoserver_config.jsonl',
+                                                     'styles')))
+    gs_crawler.close()
+    config.close()
+    export.write_json('geoserver_config.jsonl', 'geoserver_config.json')
+    export.write_json('geoserver_config.jsonl',
+                      'geoserver_config_prettyprint.json', indent=4)
+
+def get_stats(address):
+    """Get the request statistics of the fake geoserver."""
+    return json.load(urllib2.urlopen('http://{0}:{1}/_stats'.format(*address)))
+
+def print_report(result):
+    print 'Wall time:        {0:10.2f} s'.format(result['wall_time'])
+    print 'Requests:         {0:10d}'.format(result['requests'])
+    print 'Requests/sec:     {0:10.1f}'.format(result['requests_per_second'])
+    print 'Connections:      {0:10d}'.format(result['connections'])
+    print 'Peak memory:      {0:10.1f} MB'.format(result['peak_memory_mb'])
+    print
+    print 'Requests per object type:'
+    for name, count in sorted(result['requests_per_type'].items()):
+        print '  {0:28} {1:8d}'.format(name, count)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark a full export ' +
+                                                 'against a fake geoserver.')
+    parser.add_argument('--workspaces', type=int, default=20)
+    parser.add_argument('--datastores', type=int, default=2,
+                        help='datastores per workspace')
+    parser.add_argument('--featuretypes', type=int, default=10,
+                        help='featuretypes per datastore')
+    parser.add_argument('--coveragestores', type=int, default=1,
+                        help='coveragestores per workspace')
+    parser.add_argument('--styles', type=int, default=50)
+    parser.add_argument('--layergroups', type=int, default=10)
+    parser.add_argument('--sld-size', type=int, default=2048,
+                        help='approximate size of every SLD in bytes')
+    parser.add_argument('--latency', type=float, default=2.0,
+                        help='latency per request in milliseconds')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=None,
+                        help='connection pool size (default: workers)')
+    parser.add_argument('--cache', action='store_true',
+                        help='enable the response cache')
+    parser.add_argument('--output', default=None,
+                        help='also write the results as json to this file')
+    args = parser.parse_args()
+
+    queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=run_server, args=(args, queue))
+    server.daemon = True
+    server.start()
+    address = queue.get()
+
+    directory = tempfile.mkdtemp(prefix='geoserver_benchmark_')
+    cwd = os.getcwd()
+    try:
+        config_file = write_config(directory, address, args)
+        os.chdir(directory)
+        start = time.time()
+        run_export(config_file, args.workers)
+        wall_time = time.time() - start
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory)
+
+    stats = get_stats(address)
+    server.terminate()
+
+    requests = sum(stats['requests'].values())
+    result = {
+        'settings': vars(args),
+        'wall_time': wall_time,
+        'requests': requests,
+        'requests_per_second': requests / wall_time,
+        'connections': stats['connections'],
+        'requests_per_type': stats['requests'],
+        # ru_maxrss is in kilobytes on Linux
+        'peak_memory_mb': resource.getrusage(
+                            resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    }
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=4, sort_keys=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Delete objects from a geoserver in bulk, for example to tear down a test
+environment.
+
+The objects are deleted in the reverse order of their dependencies, every
+level concurrently, and everything in a workspace or store is deleted with
+the workspace or store itself (see geoserver/bulkdelete.py). Either --all or
+--workspaces has to be given. With --dry-run, the objects are only printed in
+the order they would be deleted.
+"""
+
+import argparse
+from geoserver import util
+from geoserver import crawler
+from geoserver import catalog
+from geoserver import bulkdelete
+
+parser = argparse.ArgumentParser(description='Delete objects from a ' +
+                                             'geoserver in bulk.')
+parser.add_argument('--config', default='settings.cfg',
+                    help='config file of the geoserver')
+parser.add_argument('--export',
+                    help='export (.json or .jsonl) of the geoserver to use ' +
+                         'instead of crawling it')
+selection = parser.add_mutually_exclusive_group(required=True)
+selection.add_argument('--all', action='store_true',
+                       help='delete all objects of the geoserver')
+selection.add_argument('--workspaces', nargs='+', metavar='WORKSPACE',
+                       help='delete these workspaces with everything in ' +
+                            'them and the layergroups using their layers')
+parser.add_argument('--styles', action='store_true',
+                    help='with --workspaces, also delete the styles that ' +
+                         'are only used by the deleted objects')
+parser.add_argument('--workers', type=int, default=None,
+                    help='number of concurrent requests ' +
+                         '(default: pool_size from the config file)')
+parser.add_argument('--no-recurse', action='store_true',
+                    help='delete every object with its own request')
+parser.add_argument('--dry-run', action='store_true',
+                    help='only print what would be deleted')
+args = parser.parse_args()
+
+config = util.Util(config_file=args.config)
+if args.export:
+    gs_catalog = catalog.load_catalog(args.export)
+else:
+    gs_crawler = crawler.Crawler(config, workers=args.workers)
+    gs_catalog = catalog.Catalog(catalog.iter_objects(gs_crawler.crawl()))
+    gs_crawler.close()
+
+keys = bulkdelete.select(gs_catalog, args.workspaces, args.styles)
+deleter = bulkdelete.Deleter(config, workers=args.workers,
+                             recurse=not args.no_recurse)
+if args.dry_run:
+    for i, level in enumerate(deleter.levels(gs_catalog, keys)):
+        for key in level:
+            print '{0:14} {1:8} {2}'.format(key[0], 'level ' + str(i),
+                                            '/'.join(key[1:]))
+else:
+    results = deleter.delete(gs_catalog, keys)
+    for kind, key, result in results:
+        print '{0:14} {1:8} {2}'.format(kind, result, '/'.join(key[1:]))
+    deleted = [key for kind, key, result in results
+               if result == bulkdelete.DELETED]
+    print 'Deleted {0} of {1} objects'.format(len(deleted), len(results))
+deleter.close()
+config.close()
@@ -0,0 +1,369 @@
+"""A fake geoserver REST interface with a synthetic catalog, to benchmark and try
+out the tools without a real geoserver.
+
+It answers GET-requests on the workspaces, datastores, featuretypes,
+coveragestores, coverages, wmsstores, wmtsstores, layers, layergroups and
+styles (json and sld) like geoserver does, with an ETag for conditional
+requests. POST, PUT and DELETE-requests are accepted, but do not change the
+catalog. Every request can be delayed to emulate the latency of a real server.
+The number of requests per object type is available on /_stats.
+
+Example:
+    >>> server = FakeGeoserver(('localhost', 0), Catalog(workspaces=10))
+    >>> thread = threading.Thread(target=server.serve_forever)
+    >>> thread.start()
+    >>> print server.server_address
+    >>> server.shutdown()
+
+Or standalone:
+    $ python fake_geoserver.py --port 8080 --workspaces 200 --latency 5
+"""
+
+import argparse
+import BaseHTTPServer
+import collections
+import hashlib
+import json
+import SocketServer
+import threading
+import time
+
+class Catalog:
+    """A synthetic geoserver catalog with a configurable size."""
+
+    def __init__(self, workspaces=10, datastores=2, featuretypes=10,
+                 coveragestores=1, coverages=1, wmsstores=1, wmtsstores=1,
+                 styles=20, layergroups=5, sld_size=2048):
+        """Generate the catalog
+
+        Keyword arguments:
+        workspaces -- number of workspaces
+        datastores -- number of datastores per workspace
+        featuretypes -- number of featuretypes per datastore
+        coveragestores -- number of coveragestores per workspace
+        coverages -- number of coverages per coveragestore
+        wmsstores -- number of wmsstores per workspace
+        wmtsstores -- number of wmtsstores per workspace
+        styles -- number of styles
+        layergroups -- number of layergroups
+        sld_size -- approximate size of every SLD in bytes
+        """
+        self.workspaces = {}
+        self.layers = {}
+        self.styles = {}
+        self.slds = {}
+        self.layergroups = {}
+        stylenames = ['style{0}'.format(s) for s in range(styles)]
+        for s in stylenames:
+            self.styles[s] = {'name': s, 'format': 'sld',
+                              'filename': s + '.sld',
+                              'dateModified': '2020-01-01 00:00:00.0 UTC'}
+            rules = '<Rule><Name>{0}</Name></Rule>'.format(s) * \
+                    (sld_size // 40 + 1)
+            self.slds[s] = '<StyledLayerDescriptor>{0}' \
+                           '</StyledLayerDescriptor>'.format(rules)
+
+        for i in range(workspaces):
+            w = 'ws{0}'.format(i)
+            ws = {'datastores': {}, 'coveragestores': {}, 'wmsstores': {},
+                  'wmtsstores': {}}
+            self.workspaces[w] = ws
+            for j in range(datastores):
+                d = 'ds{0}'.format(j)
+                ws['datastores'][d] = {
+                    'info': {'name': d, 'type': 'PostGIS', 'enabled': True,
+                             'workspace': {'name': w},
+                             'connectionParameters': {'entry': [
+                                {'@key': 'host', '$': 'db{0}'.format(i)},
+                                {'@key': 'dbtype', '$': 'postgis'}]}},
+                    'children': {}}
+                for k in range(featuretypes):
+                    f = 'ft_{0}_{1}'.format(j, k)
+                    ws['datastores'][d]['children'][f] = {
+                        'name': f, 'nativeName': f, 'title': f,
+                        'namespace': {'name': w},
+                        'nativeCRS': 'EPSG:28992', 'srs': 'EPSG:28992',
+                        'store': {'@class': 'dataStore',
+                                  'name': w + ':' + d},
+                        'attributes': {'attribute': [
+                            {'name': 'attr{0}'.format(a),
+                             'binding': 'java.lang.String'}
+                            for a in range(10)]}}
+                    self._add_layer(w, f, 'featureType', stylenames, k)
+            for j in range(coveragestores):
+                c = 'cs{0}'.format(j)
+                ws['coveragestores'][c] = {
+                    'info': {'name': c, 'type': 'GeoTIFF', 'enabled': True,
+                             'workspace': {'name': w},
+                             'url': 'file:data/{0}/{1}.tif'.format(w, c)},
+                    'children': {}}
+                for k in range(coverages):
+                    v = 'cov_{0}_{1}'.format(j, k)
+                    ws['coveragestores'][c]['children'][v] = {
+                        'name': v, 'nativeName': v, 'title': v,
+                        'nativeCRS': 'EPSG:28992', 'srs': 'EPSG:28992',
+                        'store': {'@class': 'coverageStore',
+                                  'name': w + ':' + c}}
+                    self._add_layer(w, v, 'coverage', stylenames, k)
+            for kind, count, prefix in (('wmsstores', wmsstores, 'wms'),
+                                        ('wmtsstores', wmtsstores, 'wmts')):
+                for j in range(count):
+                    name = '{0}{1}'.format(prefix, j)
+                    ws[kind][name] = {
+                        'info': {'name': name, 'type': prefix.upper(),
+                                 'enabled': True, 'workspace': {'name': w},
+                                 'capabilitiesURL': 'http://example.com/' +
+                                                    prefix},
+                        'children': {}}
+
+        layernames = sorted(self.layers)
+        for g in range(layergroups):
+            name = 'group{0}'.format(g)
+            published = layernames[g * 3:g * 3 + 3]
+            self.layergroups[name] = {
+                'name': name, 'mode': 'SINGLE',
+                'publishables': {'published': [
+                    {'@type': 'layer', 'name': l} for l in published]},
+                'styles': {'style': [{'name': ''} for l in published]}}
+
+    def _add_layer(self, w, resource, resource_class, stylenames, k):
+        name = w + ':' + resource
+        style = stylenames[k % len(stylenames)] if stylenames else ''
+        self.layers[name] = {'name': resource, 'type': 'VECTOR'
+                                 if resource_class == 'featureType'
+                                 else 'RASTER',
+                             'defaultStyle': {'name': style},
+                             'resource': {'@class': resource_class,
+                                          'name': name},
+                             'enabled': True}
+
+# collection -> (json root key, json child key) of the listings and objects
+ROOT_KEYS = {
+    'workspaces': ('workspaces', 'workspace'),
+    'datastores': ('dataStores', 'dataStore'),
+    'featuretypes': ('featureTypes', 'featureType'),
+    'coveragestores': ('coverageStores', 'coverageStore'),
+    'coverages': ('coverages', 'coverage'),
+    'wmsstores': ('wmsStores', 'wmsStore'),
+    'wmtsstores': ('wmtsStores', 'wmtsStore'),
+    'layers': ('layers', 'layer'),
+    'layergroups': ('layerGroups', 'layerGroup'),
+    'styles': ('styles', 'style'),
+}
+
+# store collection -> collection of its resources
+RESOURCES = {
+    'datastores': 'featuretypes',
+    'coveragestores': 'coverages',
+    'wmsstores': 'wmslayers',
+    'wmtsstores': 'layers',
+}
+
+def object_type(path):
+    """Returns the object type of a REST path, the last collection in it."""
+    parts = path.split('?')[0].split('.')[0].strip('/').split('/')
+    if 'rest' in parts:
+        parts = parts[parts.index('rest') + 1:]
+    names = parts[0::2]
+    return names[-1] if names else ''
+
+class FakeGeoserverHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answer the requests on the fake geoserver."""
+
+    protocol_version = 'HTTP/1.1'
+    # buffer the headers and body, so they go out in one packet and do not
+    # wait for a delayed ACK of the client
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status, body='', mime='application/json', etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', mime)
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self):
+        self.server.count(self.command, self.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def do_GET(self):
+        if self.path == '/_stats':
+            return self._respond(200, json.dumps(self.server.stats()))
+        self._count()
+        try:
+            body, mime = self._route()
+        except KeyError:
+            body, mime = None, None
+        if body is None:
+            return self._respond(404, 'No such object', 'text/plain')
+        etag = '"{0}"'.format(hashlib.md5(body).hexdigest())
+        if self.headers.get('If-None-Match') == etag:
+            return self._respond(304, '', mime, etag)
+        self._respond(200, body, mime, etag)
+
+    def _write(self, status):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self._count()
+        self._respond(status, '', 'text/plain')
+
+    def do_POST(self):
+        self._write(201)
+
+    def do_PUT(self):
+        self._write(200)
+
+    def do_DELETE(self):
+        self._write(200)
+
+    def _route(self):
+        """Find the answer on a GET-request.
+
+        Returns the body and mime type, body is None when the object does not
+        exist.
+        """
+        catalog = self.server.catalog
+        path = self.path.split('?')[0]
+        prefix = '/' + self.server.address + '/rest/'
+        if not path.startswith(prefix):
+            return None, None
+        path = path[len(prefix):]
+        if path.endswith('.sld'):
+            return catalog.slds[path[len('styles/'):-len('.sld')]], \
+                   'application/vnd.ogc.sld+xml'
+        if path.endswith('.json'):
+            path = path[:-len('.json')]
+        parts = path.split('/')
+
+        if parts == ['workspaces', 'default']:
+            return _item('workspaces', {'name': sorted(catalog.workspaces)[0]})
+        if parts[0] in ('layers', 'layergroups', 'styles'):
+            objects = getattr(catalog, parts[0])
+            if len(parts) == 1:
+                return _listing(parts[0], objects)
+            return _item(parts[0], objects[parts[1]])
+        if parts[0] != 'workspaces':
+            return None, None
+
+        if len(parts) == 1:
+            return _listing('workspaces', catalog.workspaces)
+        ws = catalog.workspaces[parts[1]]
+        if len(parts) == 2:
+            return _item('workspaces', {'name': parts[1]})
+        if len(parts) in (3, 4) and parts[2] in ('featuretypes', 'coverages'):
+            store_kind = 'datastores' if parts[2] == 'featuretypes' \
+                         else 'coveragestores'
+            resources = {}
+            for store in ws[store_kind].values():
+                resources.update(store['children'])
+            if len(parts) == 4:
+                return _item(parts[2], resources[parts[3]])
+            return _listing(parts[2], resources)
+        stores = ws[parts[2]]
+        if len(parts) == 3:
+            return _listing(parts[2], stores)
+        store = stores[parts[3]]
+        if len(parts) == 4:
+            return _item(parts[2], store['info'])
+        if parts[4] != RESOURCES[parts[2]]:
+            return None, None
+        if len(parts) == 5:
+            return _listing(parts[4], store['children'])
+        return _item(parts[4], store['children'][parts[5]])
+
+def _listing(collection, objects):
+    root, child = ROOT_KEYS[collection]
+    if not objects:
+        return json.dumps({root: ''}), 'application/json'
+    return json.dumps({root: {child: [
+                        {'name': name,
+                         'href': 'http://fake/' + collection + '/' + name}
+                        for name in sorted(objects)]}}), 'application/json'
+
+def _item(collection, info):
+    return json.dumps({ROOT_KEYS[collection][1]: info}), 'application/json'
+
+class FakeGeoserver(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """Threaded HTTP server with the fake geoserver REST interface."""
+
+    daemon_threads = True
+    # like the accept queue of a servlet container, many clients connect at
+    # the same time
+    request_queue_size = 128
+
+    def __init__(self, server_address, catalog, latency=0.0,
+                 address='geoserver'):
+        """Initialise the server
+
+        Keyword arguments:
+        server_address -- tuple (host, port) to listen on, port 0 picks one
+        catalog -- the Catalog to serve
+        latency -- seconds to wait before answering a request
+        address -- the path geoserver is on, like in the config file
+        """
+        BaseHTTPServer.HTTPServer.__init__(self, server_address,
+                                           FakeGeoserverHandler)
+        self.catalog = catalog
+        self.latency = latency
+        self.address = address
+        self._counts = collections.Counter()
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    def count(self, method, path):
+        with self._lock:
+            self._counts[method + ' ' + object_type(path)] += 1
+
+    def get_request(self):
+        request, client_address = BaseHTTPServer.HTTPServer.get_request(self)
+        with self._lock:
+            self._connections.add(client_address)
+        return request, client_address
+
+    def stats(self):
+        """Returns dict with the number of requests per method and object
+        type and the number of connections.
+        """
+        with self._lock:
+            return {'requests': dict(self._counts),
+                    'connections': len(self._connections)}
+
+    def reset_stats(self):
+        with self._lock:
+            self._counts.clear()
+            self._connections.clear()
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a fake geoserver.')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='latency per request in milliseconds')
+    parser.add_argument('--workspaces', type=int, default=10)
+    parser.add_argument('--datastores', type=int, default=2,
+                        help='datastores per workspace')
+    parser.add_argument('--featuretypes', type=int, default=10,
+                        help='featuretypes per datastore')
+    parser.add_argument('--styles', type=int, default=20)
+    parser.add_argument('--layergroups', type=int, default=5)
+    args = parser.parse_args()
+
+    catalog = Catalog(workspaces=args.workspaces,
+                      datastores=args.datastores,
+                      featuretypes=args.featuretypes,
+                      styles=args.styles,
+                      layergroups=args.layergroups)
+    server = FakeGeoserver((args.host, args.port), catalog,
+                           latency=args.latency / 1000.0)
+    print 'Fake geoserver on http://{0}:{1}/geoserver'.format(
+                *server.server_address)
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,510 @@
+"""This file has an asynchronous variant of the utility class Util (see
+util.py). Instead of one thread per connection, a single event loop thread
+keeps many HTTP/1.1 keep-alive connections to the geoserver open and sends the
+requests over them, so hundreds of requests can be in flight at the same time.
+
+Requests return a Future right away, the response is set on it when it
+arrives. The functions of the other modules (get_workspaces,
+get_datastore_info, get_sld, ...) can be called asynchronously with call: the
+function is run once on one of the worker threads of call, with a stand-in
+for Util of which every request is sent on the event loop and waited for. So
+the parsing code of the modules is used as is, off the event loop thread, and
+a function can make any number of requests. Functions that stream a response
+(iter_layer_names, download_sld, ...) work too, but the response is read
+completely before it is handed to them, and a function that yields gets a
+list of what it yields. As a worker thread waits for the responses of its
+function, at most workers (the option workers in the async section, by
+default the number of connections) calls run at the same time; use
+request_async to have more requests in flight without threads.
+
+The response cache (see util.py) and the request statistics are used, the
+retries, rate limiting and conditional requests only by the blocking request.
+
+Example:
+    >>> config = AsyncUtil('settings.cfg')
+    >>> futures = [config.call(datastore.get_datastores, w)
+    ...            for w in workspace.get_workspaces(config)]
+    >>> for datastores in gather(futures):
+    ...     print datastores
+    >>> status, response = config.request_async('GET', 'rest/about/version.json',
+    ...                                         None, 'application/json').result()
+    >>> config.close()
+"""
+import asyncore
+import collections
+import errno
+import fcntl
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+import types
+from multiprocessing.pool import ThreadPool
+from StringIO import StringIO
+
+from util import Util
+
+class Future:
+    """The result of an asynchronous request or call, that is set later."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._result = None
+        self._error = None
+        self._callbacks = []
+
+    def set_result(self, result):
+        """Set the result and run the callbacks."""
+        self._result = result
+        self._finish()
+
+    def set_exception(self, error):
+        """Set the error that result raises and run the callbacks."""
+        self._error = error
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def add_done_callback(self, callback):
+        """Call callback with the future when it is done, right away when it
+        is done already.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def done(self):
+        """Returns True if the result or error is set."""
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """Wait for the result and return it, or raise the error of the
+        request.
+        """
+        if not self._done.wait(timeout):
+            raise RuntimeError('Timeout while waiting for the result')
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+def gather(futures, timeout=None):
+    """Wait for all futures.
+
+    Returns a list with the results in the same order as futures.
+    """
+    return [future.result(timeout) for future in futures]
+
+class _Request:
+    """A request waiting to be sent or answered."""
+
+    def __init__(self, method, path, payload, mime, future):
+        self.method = method
+        self.path = path
+        self.payload = payload
+        self.mime = mime
+        self.future = future
+        self.start = None
+        # a request on a connection that was closed by the server before
+        # anything was received is sent again once
+        self.resent = False
+
+class _Connection(asyncore.dispatcher):
+    """A keep-alive connection to the geoserver, that sends one request at a
+    time and parses the response.
+    """
+
+    def __init__(self, client):
+        asyncore.dispatcher.__init__(self, map=client.map)
+        self._client = client
+        self.request = None
+        self.used = False
+        self._out = ''
+        self._reset()
+        self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.connect((client.host, client.port))
+
+    def _reset(self):
+        self._in = ''
+        self._received = False
+        self._status = None
+        self._headers = None
+        self._length = None
+        self._chunked = False
+        self._chunks = []
+
+    def send_request(self, request):
+        """Start sending the request over the connection."""
+        self.request = request
+        self._reset()
+        request.start = time.time()
+        payload = request.payload or ''
+        lines = ['{0} /{1}/{2} HTTP/1.1'.format(request.method.upper(),
+                                                self._client.address,
+                                                request.path),
+                 'Host: {0}:{1}'.format(self._client.host, self._client.port),
+                 'Authorization: ' + self._client.auth,
+                 'Content-type: ' + request.mime,
+                 'Content-Length: {0}'.format(len(payload)),
+                 '', '']
+        self._out = '\r\n'.join(lines) + payload
+
+    def handle_connect(self):
+        pass
+
+    def writable(self):
+        return bool(self._out) or not self.connected
+
+    def handle_write(self):
+        sent = self.send(self._out)
+        self._out = self._out[sent:]
+
+    def handle_read(self):
+        data = self.recv(65536)
+        if not data:
+            return
+        self._received = True
+        self._in += data
+        self._parse()
+
+    def _parse(self):
+        """Parse as much of the response as has been received."""
+        if self._headers is None:
+            end = self._in.find('\r\n\r\n')
+            if end < 0:
+                return
+            lines = self._in[:end].split('\r\n')
+            self._in = self._in[end + 4:]
+            self._status = int(lines[0].split()[1])
+            self._headers = {}
+            for line in lines[1:]:
+                key, _, value = line.partition(':')
+                self._headers[key.strip().lower()] = value.strip()
+            if (self.request.method.upper() == 'HEAD'
+                    or self._status in (204, 304) or self._status < 200):
+                self._length = 0
+            elif 'chunked' in self._headers.get('transfer-encoding', ''):
+                self._chunked = True
+            elif 'content-length' in self._headers:
+                self._length = int(self._headers['content-length'])
+        if self._chunked:
+            self._parse_chunks()
+        elif self._length is not None and len(self._in) >= self._length:
+            self._complete(self._in[:self._length])
+
+    def _parse_chunks(self):
+        while True:
+            end = self._in.find('\r\n')
+            if end < 0:
+                return
+            size = int(self._in[:end].split(';')[0], 16)
+            if size == 0:
+                if self._in.find('\r\n\r\n', end) < 0:
+                    return
+                self._complete(''.join(self._chunks))
+                return
+            if len(self._in) < end + 2 + size + 2:
+                return
+            self._chunks.append(self._in[end + 2:end + 2 + size])
+            self._in = self._in[end + 2 + size + 2:]
+
+    def _complete(self, body):
+        request, self.request = self.request, None
+        self.used = True
+        keep_alive = self._headers.get('connection', '').lower() != 'close'
+        self._client.response(self, request, self._status, body, keep_alive)
+
+    def handle_close(self):
+        request, self.request = self.request, None
+        self.close()
+        if (request is not None and self._headers is not None
+                and self._length is None and not self._chunked):
+            # the body of the response ends when the connection closes
+            self.request = request
+            self._headers['connection'] = 'close'
+            self._complete(self._in)
+            return
+        self._client.closed(self, request, self._received,
+                            socket.error('Connection closed by the server'))
+
+    def handle_error(self):
+        error = sys.exc_info()[1]
+        request, self.request = self.request, None
+        self.close()
+        self._client.closed(self, request, self._received, error)
+
+class AsyncUtil(Util):
+    """Util class with asynchronous requests over an event loop thread.
+
+    request_async only needs the event loop thread. call runs the function
+    once on one of workers threads, that waits for each response of its
+    function, so at most workers calls are run at the same time.
+    """
+
+    def __init__(self, config_file='settings.sfg', section='server'):
+        """Initialise the util class and start the event loop
+
+        The number of connections of the event loop is the option connections
+        in the async section of the config file, the number of worker threads
+        of call the option workers.
+
+        Keyword arguments:
+        config_file -- the config file to use
+        section -- the section of the config file with the server to use, see
+                   util.server_sections
+        """
+        Util.__init__(self, config_file, section)
+        self.host = self._url
+        self.port = int(self._port)
+        self.address = self._address
+        self.auth = self._auth
+        self.connections = self.get_option('async', 'connections', 100)
+        self.workers = self.get_option('async', 'workers', self.connections)
+        # the worker threads of call are only started when it is used
+        self._workers = None
+        self.map = {}
+        self._pending = collections.deque()
+        self._idle = []
+        self._open = 0
+        self._lock = threading.Lock()
+        self._running = True
+        self._wake_read, self._wake_write = os.pipe()
+        fcntl.fcntl(self._wake_write, fcntl.F_SETFL, os.O_NONBLOCK)
+        self._waker = asyncore.file_dispatcher(self._wake_read, map=self.map)
+        self._waker.handle_read = lambda: self._waker.recv(4096)
+        self._waker.writable = lambda: False
+        self._thread = threading.Thread(target=self._loop)
+        self._thread.daemon = True
+        self._thread.start()
+        logging.info('Started event loop with {0} connections'.format(
+                    self.connections))
+
+    def request_async(self, method, path, payload='', mime='text/xml'):
+        """Send a http-request without waiting for the response.
+
+        Keyword-arguments:
+          method -- the http method to use
+          path -- the path to send the request to
+          payload -- the extra content to send
+          mime -- mime-type
+
+        Returns a Future with as result the HTTP statuscode and the response
+        as text.
+        """
+        logging.debug('Queueing request with method: %s to path: %s',
+                      method, path)
+        future = Future()
+        if self.cache is not None:
+            if method.upper() == 'GET':
+                cached = self.cache.get(method, path, mime)
+                if cached is not None:
+                    self.stats.record_cached(method, path)
+                    future.set_result(cached)
+                    return future
+            else:
+                self.cache.invalidate(path)
+        with self._lock:
+            self._pending.append(_Request(method, path, payload, mime,
+                                          future))
+        self._wake()
+        return future
+
+    def _wake(self):
+        """Wake up the event loop to send the pending requests."""
+        try:
+            os.write(self._wake_write, 'x')
+        except OSError as e:
+            # the pipe is full, so the event loop is woken up already
+            if e.errno != errno.EAGAIN:
+                raise
+
+    def call(self, func, *args):
+        """Call a function of the other modules asynchronously, like
+        func(*args, u).
+
+        The function is run once on a worker thread, its requests are sent
+        on the event loop.
+
+        Returns a Future with as result the return value of func, or a list
+        of what it yields.
+        """
+        future = Future()
+        def run():
+            try:
+                result = func(*(args + (_Blocking(self),)))
+                if isinstance(result, types.GeneratorType):
+                    # its requests are made while it is iterated
+                    result = list(result)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+        with self._lock:
+            if self._workers is None:
+                self._workers = ThreadPool(self.workers)
+            self._workers.apply_async(run)
+        return future
+
+    def map_async(self, func, items):
+        """Call func for every item in items, a tuple with the arguments for
+        func.
+
+        Returns a list with a Future for every item.
+        """
+        return [self.call(func, *item) for item in items]
+
+    def _loop(self):
+        """Run the event loop until the util is closed."""
+        while self._running:
+            self._dispatch()
+            asyncore.loop(timeout=1.0, map=self.map, count=1)
+
+    def _dispatch(self):
+        """Hand out the pending requests to idle or new connections."""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                if self._idle:
+                    connection = self._idle.pop()
+                elif self._open < self.connections:
+                    connection = None
+                    self._open += 1
+                else:
+                    return
+                request = self._pending.popleft()
+            if connection is None:
+                try:
+                    connection = _Connection(self)
+                except socket.error as e:
+                    with self._lock:
+                        self._open -= 1
+                    self._fail(request, e)
+                    continue
+            connection.send_request(request)
+
+    def response(self, connection, request, status, body, keep_alive):
+        """Handle a complete response, called by the connection."""
+        if keep_alive:
+            with self._lock:
+                self._idle.append(connection)
+        else:
+            connection.close()
+            with self._lock:
+                self._open -= 1
+        self.stats.record(request.method, request.path, status,
+                          time.time() - request.start, len(body))
+        if (self.cache is not None and request.method.upper() == 'GET'
+                and status in (200, 404)):
+            self.cache.put(request.method, request.path, request.mime,
+                           (status, body))
+        request.future.set_result((status, body))
+
+    def closed(self, connection, request, received, error):
+        """Handle a connection that was closed, called by the connection."""
+        with self._lock:
+            self._open -= 1
+            if connection in self._idle:
+                self._idle.remove(connection)
+            if (request is not None and connection.used and not received
+                    and not request.resent):
+                # the server has closed the idle keep-alive connection in the
+                # meantime, try once more with a fresh connection
+                request.resent = True
+                self._pending.appendleft(request)
+                return
+        if request is not None:
+            self._fail(request, error)
+
+    def _fail(self, request, error):
+        logging.error('Error with sending "{0}"-request to {1}:{2}/{3}/{4}. '
+                      'Get error: {5}'.format(request.method, self.host,
+                                              self.port, self.address,
+                                              request.path, error))
+        self.stats.record(request.method, request.path, None,
+                          time.time() - (request.start or time.time()), 0)
+        request.future.set_exception(error)
+
+    def close(self):
+        """Stop the event loop and close all connections to the server."""
+        if self._workers is not None:
+            self._workers.close()
+            self._workers.join()
+        self._running = False
+        self._wake()
+        self._thread.join()
+        for dispatcher in self.map.values():
+            dispatcher.close()
+        os.close(self._wake_write)
+        Util.close(self)
+
+class _Blocking:
+    """Stand-in for Util, that sends the requests of a function on the event
+    loop and waits for the responses.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def request(self, method, path, payload='', mime='text/xml'):
+        return self._client.request_async(method, path, payload,
+                                          mime).result()
+
+    def stream(self, method, path, payload=None, mime='application/json'):
+        """Like Util.stream, with the response read completely."""
+        status, resp = self.request(method, path, payload, mime)
+        return _ReceivedResponse(status, resp)
+
+    def download(self, path, filename, mime='text/xml'):
+        """Like Util.download, the file is only written when the request is
+        succesful.
+        """
+        status, resp = self.request('GET', path, None, mime)
+        if status == 200:
+            tmp = '{0}.{1}.part'.format(filename,
+                                        threading.current_thread().ident)
+            with open(tmp, 'wb') as f:
+                f.write(resp)
+            os.rename(tmp, filename)
+        return status
+
+class _ReceivedResponse:
+    """Stand-in for a StreamedResponse, with a body that has been received
+    completely.
+    """
+
+    def __init__(self, status, body):
+        self.status = status
+        self._body = StringIO(body or '')
+
+    def getheader(self, name, default=None):
+        # the headers are not kept with the response
+        return default
+
+    def read(self, size=-1):
+        return self._body.read(size)
+
+    def __iter__(self):
+        while True:
+            chunk = self._body.read(65536)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,244 @@
+"""This file deletes many objects of a geoserver at once, for example to tear
+down a test environment.
+
+Geoserver refuses to delete an object that is still used, so the objects are
+deleted in the reverse order of their dependencies:
+
+    layergroups -> layers -> featuretypes and coverages -> stores ->
+    workspaces -> styles
+
+Layergroups in other layergroups are deleted after the layergroups they are
+in. Styles come last, as the layers that use them can be deleted together with
+their workspace. All objects of one level are deleted concurrently by a pool
+of worker threads.
+
+With recurse, an object is not deleted separately when the object it is in
+(for a layer: its featuretype or coverage) is deleted as well. That object is
+deleted with recurse=true, which deletes everything in it with a single
+request. So deleting a complete workspace costs one request, however many
+stores, featuretypes and layers it has.
+
+The objects and their dependencies are taken from a Catalog (see
+catalog.py). When an object could not be deleted, the objects it depends on
+are skipped. This class uses the utility class Util (see util.py) to read the
+configuration and the enable general functionality. Make sure there is a
+valid configuration file.
+
+Example:
+    >>> config = Util()
+    >>> catalog = Catalog(iter_objects(Crawler(config).crawl()))
+    >>> deleter = Deleter(config, workers=8)
+    >>> for kind, key, result in deleter.delete(catalog):
+    ...     print kind, key, result
+    >>> deleter.close()
+"""
+import logging
+from multiprocessing.pool import ThreadPool
+
+import rest
+from rest import STORE_KINDS
+from catalog import Catalog, iter_objects
+from crawler import Crawler
+from util import Util
+
+DELETED = 'deleted'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+# the kinds in the order they are deleted
+LEVELS = (('layergroups',), ('layers',), ('featuretypes', 'coverages'),
+          STORE_KINDS, ('workspaces',), ('styles',))
+
+class Deleter:
+    """Delete objects of a geoserver with a number of worker threads."""
+
+    def __init__(self, u, workers=None, recurse=True):
+        """Initialise the deleter
+
+        Keyword arguments:
+        u -- the Util instance of the geoserver
+        workers -- number of worker threads, defaults to the size of the
+                   connection pool of u
+        recurse -- delete the objects in a workspace, store, featuretype or
+                   coverage together with it
+        """
+        self._u = u
+        self._recurse = recurse
+        if workers is None:
+            workers = u.pool_size
+        self._pool = ThreadPool(workers)
+        logging.info('Initialised deleter with {0} workers'.format(workers))
+
+    def delete(self, catalog, keys=None):
+        """Delete objects of the catalog from the geoserver.
+
+        Keyword arguments:
+        catalog -- the Catalog of the geoserver
+        keys -- the keys of the objects to delete, default all objects of the
+                catalog
+
+        Returns a list with a tuple (kind, key, result) for every object, in
+        the order they were deleted. The result is one of DELETED, FAILED or
+        SKIPPED.
+        """
+        if keys is None:
+            keys = catalog.keys()
+        todo = set(keys)
+        roots = self._roots(catalog, todo)
+        explicit = set(key for key, root in roots.items() if root == key)
+        logging.info('Deleting {0} objects with {1} requests'.format(
+                        len(todo), len(explicit)))
+
+        results = {}
+        out = []
+        for level in self._levels(catalog, explicit):
+            todo_level = []
+            for key in level:
+                # the objects that have to be gone before this one
+                blockers = set(roots[d] for d in catalog.dependents(key)
+                               if d in todo) - set([key])
+                if any(results.get(b, DELETED) != DELETED for b in blockers):
+                    results[key] = SKIPPED
+                    out.append((key[0], key, SKIPPED))
+                else:
+                    todo_level.append(key)
+            u = self._u
+            recurse = self._recurse
+            for key, ok in self._pool.map(
+                                lambda key: (key, _delete(key, recurse, u)),
+                                todo_level):
+                results[key] = DELETED if ok else FAILED
+                out.append((key[0], key, results[key]))
+        for kind, key, result in out:
+            if result != DELETED:
+                logging.error('Could not delete {0} {1}: {2}'.format(
+                                    kind, '/'.join(key[1:]), result))
+
+        # the objects deleted together with the object they are in
+        for key in sorted(todo - explicit):
+            result = results[roots[key]]
+            out.append((key[0], key, DELETED if result == DELETED
+                                     else SKIPPED))
+        return out
+
+    def _roots(self, catalog, todo):
+        """Returns python dict with every key of todo as key and the key of
+        the object it is deleted with as value.
+        """
+        return dict((key, self._root(catalog, key, todo)) for key in todo)
+
+    def _root(self, catalog, key, todo):
+        """Find the object that key is deleted with: the outermost object it
+        is in that is deleted as well, or key itself.
+        """
+        if not self._recurse:
+            return key
+        root = key
+        while True:
+            if key[0] == 'layers':
+                parent = catalog.resource_of_layer(key[1])
+            else:
+                parent = rest.RESOURCES[key[0]].parent
+                if parent is not None:
+                    parent = (parent,) + key[1:-1]
+            if parent is None:
+                return root
+            if parent in todo:
+                root = parent
+            key = parent
+
+    def levels(self, catalog, keys=None):
+        """Split the objects into the levels they are deleted in, see LEVELS.
+        Only the objects that get a request of their own are in the levels.
+
+        Keyword arguments:
+        catalog -- the Catalog of the geoserver
+        keys -- the keys of the objects to delete, default all objects of the
+                catalog
+
+        Returns a list with a sorted list of keys for every level.
+        """
+        if keys is None:
+            keys = catalog.keys()
+        roots = self._roots(catalog, set(keys))
+        return self._levels(catalog, set(key for key, root in roots.items()
+                                         if root == key))
+
+    def _levels(self, catalog, keys):
+        """Split the keys into the levels, layergroups in other layergroups
+        get a level after those layergroups.
+        """
+        levels = []
+        for kinds in LEVELS:
+            level = set(key for key in keys if key[0] in kinds)
+            if kinds != ('layergroups',):
+                if level:
+                    levels.append(sorted(level))
+                continue
+            while level:
+                # the layergroups that are not in another layergroup that
+                # still has to be deleted
+                first = set(g for g in level
+                            if not level.intersection(catalog.dependents(g)))
+                if not first:
+                    # a cycle, try the rest at once
+                    first = level
+                levels.append(sorted(first))
+                level -= first
+        return levels
+
+    def close(self):
+        """Stop the worker threads."""
+        self._pool.close()
+        self._pool.join()
+
+def _delete(key, recurse, u):
+    """Delete a single object, with everything in it if recurse.
+
+    Returns True or False if succesful.
+    """
+    kind = key[0]
+    return rest.delete(kind, key[1:-1], key[-1], u,
+                       recurse and kind not in ('layers', 'styles'))
+
+def select(catalog, workspaces=None, styles=False):
+    """Select the objects to delete.
+
+    Keyword arguments:
+    catalog -- the Catalog of the geoserver
+    workspaces -- the names of the workspaces to delete with everything in
+                  them and the layergroups that use their layers, default
+                  everything
+    styles -- also delete the styles that are only used by the deleted
+              objects, when workspaces are given
+
+    Returns a sorted list with the keys of the objects.
+    """
+    if workspaces is None:
+        return catalog.keys()
+    keys = set()
+    for w in workspaces:
+        key = ('workspaces', w)
+        if key in catalog:
+            keys.add(key)
+            keys.update(catalog.dependents(key))
+    if styles:
+        for key in catalog.keys('styles'):
+            users = set(catalog.dependents(key))
+            if users and users <= keys:
+                keys.add(key)
+    return sorted(keys)
+
+def main():
+    config = Util()
+    crawler = Crawler(config)
+    catalog = Catalog(iter_objects(crawler.crawl()))
+    crawler.close()
+    deleter = Deleter(config)
+    for kind, key, result in deleter.delete(catalog,
+                                            select(catalog, ['testing'])):
+        print kind, key, result
+    deleter.close()
+
+if __name__ == '__main__':
+    main()
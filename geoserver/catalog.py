@@ -0,0 +1,407 @@
+"""This file keeps an index of the catalog of a geoserver in memory, to answer
+questions about the objects and how they depend on each other without asking
+the geoserver, like which layers use a style or what is affected when a
+datastore is deleted.
+
+The index is built once from a crawl (see crawler.py) or an export (see
+export.py). Only the names of the objects and what the indexes need are kept,
+in small records (see Record), every name is kept once however often it
+occurs. The objects are identified by keys like sync.flatten uses, a tuple of
+the kind and the names of the object and its parents, for example
+('featuretypes', workspace, datastore, featuretype) or ('layers', layer).
+
+Example:
+    >>> catalog = load_catalog('geoserver_config.jsonl')
+    >>> print catalog.layers_of_style('line')
+    >>> print catalog.resources(('datastores', 'tiger', 'nyc'))
+    >>> for key in catalog.dependents(('styles', 'line')):
+    ...     print key
+"""
+import json
+
+import export
+import rest
+from rest import STORE_KINDS, as_list
+
+class Record(object):
+    """An object in the catalog. Only the key of the object and the CRS of
+    featuretypes and coverages are kept, the slots keep the record small.
+    """
+    __slots__ = ('key', 'native_crs', 'srs')
+
+    def __init__(self, key, native_crs=None, srs=None):
+        self.key = key
+        self.native_crs = native_crs
+        self.srs = srs
+
+    @property
+    def kind(self):
+        return self.key[0]
+
+    @property
+    def name(self):
+        return self.key[-1]
+
+    def __repr__(self):
+        return 'Record{0!r}'.format(self.key)
+
+class Catalog:
+    """Index of the objects of a geoserver catalog."""
+
+    def __init__(self, objects=()):
+        """Build the index
+
+        Keyword arguments:
+        objects -- iterable with tuples (kind, name, data) like
+                   export.iter_export yields, see add
+        """
+        self._strings = {}
+        self._records = {}
+        # key of a workspace or store -> keys of the objects in it
+        self._children = {}
+        # workspace:name of a featuretype or coverage -> its key
+        self._qualified = {}
+        self._crs_resources = {}
+        # layer -> workspace:name of its resource, and back
+        self._layer_resource = {}
+        self._resource_layers = {}
+        # layer -> its styles (default style first), and back
+        self._layer_styles = {}
+        self._style_layers = {}
+        # layergroup -> keys of the layers and layergroups in it, and back
+        self._layergroup_published = {}
+        self._published_layergroups = {}
+        # layergroup -> its styles, and back
+        self._layergroup_styles = {}
+        self._style_layergroups = {}
+        for kind, name, data in objects:
+            self.add(kind, name, data)
+
+    def _intern(self, value):
+        """Returns the copy of the string that is kept already, so equal
+        names share their memory.
+        """
+        if value is None:
+            return None
+        return self._strings.setdefault(value, value)
+
+    def _key(self, kind, *names):
+        return (self._intern(kind),) + tuple(self._intern(n) for n in names)
+
+    def _parent(self, key):
+        """Returns the key of the workspace or store the object is in, or
+        None.
+        """
+        parent = rest.RESOURCES[key[0]].parent
+        if parent is None:
+            return None
+        return (parent,) + key[1:-1]
+
+    def _put(self, key, record=None):
+        self._records[key] = record or Record(key)
+        parent = self._parent(key)
+        if parent is not None:
+            self._children.setdefault(parent, []).append(key)
+
+    def add(self, kind, name, data):
+        """Add an object of the export, a workspace with its stores and their
+        resources, a layer, a layergroup or a style. Adding an object that is
+        in the index already replaces it.
+        """
+        if (kind, name) in self._records:
+            self.remove((kind, name))
+        if kind == 'workspaces':
+            self._add_workspace(name, data)
+        elif kind == 'layers':
+            self._add_layer(name, data)
+        elif kind == 'layergroups':
+            self._add_layergroup(name, data)
+        else:
+            self._put(self._key(kind, name))
+
+    def _add_workspace(self, w, data):
+        self._put(self._key('workspaces', w))
+        for store_kind in STORE_KINDS:
+            for s, store in sorted(((data or {}).get(store_kind) or {})
+                                   .items()):
+                self._put(self._key(store_kind, w, s))
+                for kind in rest.children(store_kind):
+                    for r, info in sorted(((store or {}).get(kind) or {})
+                                          .items()):
+                        self._add_resource(self._key(kind, w, s, r), info)
+
+    def _add_resource(self, key, info):
+        info = info or {}
+        native_crs = info.get('nativeCRS')
+        if isinstance(native_crs, dict):
+            # the definition of a CRS without code
+            native_crs = native_crs.get('$')
+        record = Record(key, self._intern(native_crs),
+                        self._intern(info.get('srs')))
+        self._put(key, record)
+        self._qualified[self._intern(key[1] + ':' + key[-1])] = key
+        for crs in set((record.native_crs, record.srs)) - set([None]):
+            self._crs_resources.setdefault(crs, set()).add(key)
+
+    def _add_layer(self, l, info):
+        info = info or {}
+        key = self._key('layers', l)
+        self._put(key)
+        resource = self._intern((info.get('resource') or {}).get('name'))
+        if resource:
+            self._layer_resource[key[1]] = resource
+            self._resource_layers.setdefault(resource, set()).add(key[1])
+        styles = [(info.get('defaultStyle') or {}).get('name')]
+        styles.extend(s.get('name') for s in
+                      as_list((info.get('styles') or {}).get('style')))
+        styles = tuple(self._intern(s) for s in _unique(styles))
+        if styles:
+            self._layer_styles[key[1]] = styles
+        for s in styles:
+            self._style_layers.setdefault(s, set()).add(key[1])
+
+    def _add_layergroup(self, g, info):
+        info = info or {}
+        key = self._key('layergroups', g)
+        self._put(key)
+        published = []
+        for p in as_list((info.get('publishables') or {}).get('published')):
+            kind = 'layergroups' if p.get('@type') == 'layerGroup' \
+                   else 'layers'
+            if p.get('name'):
+                published.append(self._key(kind, p.get('name')))
+        self._layergroup_published[key[1]] = tuple(published)
+        for p in published:
+            self._published_layergroups.setdefault(p, set()).add(key[1])
+        styles = tuple(self._intern(s) for s in _unique(
+                        s.get('name') for s in
+                        as_list((info.get('styles') or {}).get('style'))))
+        if styles:
+            self._layergroup_styles[key[1]] = styles
+        for s in styles:
+            self._style_layergroups.setdefault(s, set()).add(key[1])
+
+    def remove(self, key):
+        """Remove an object and the objects in it from the index."""
+        for child in list(self._children.get(key, ())):
+            self.remove(child)
+        record = self._records.pop(key, None)
+        if record is None:
+            return
+        self._children.pop(key, None)
+        parent = self._parent(key)
+        if parent is not None:
+            self._children[parent].remove(key)
+        name = key[-1]
+        if key[0] in ('featuretypes', 'coverages'):
+            if self._qualified.get(key[1] + ':' + name) == key:
+                del self._qualified[key[1] + ':' + name]
+            for crs in (record.native_crs, record.srs):
+                _discard(self._crs_resources, crs, key)
+        if key[0] == 'layers':
+            resource = self._layer_resource.pop(name, None)
+            _discard(self._resource_layers, resource, name)
+            for s in self._layer_styles.pop(name, ()):
+                _discard(self._style_layers, s, name)
+        elif key[0] == 'layergroups':
+            for p in self._layergroup_published.pop(name, ()):
+                _discard(self._published_layergroups, p, name)
+            for s in self._layergroup_styles.pop(name, ()):
+                _discard(self._style_layergroups, s, name)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def get(self, key):
+        """Returns the Record of the object or None if it is not in the
+        catalog.
+        """
+        return self._records.get(key)
+
+    def keys(self, kind=None):
+        """Returns a sorted list with the keys of all objects of the kind,
+        default of all objects.
+        """
+        return sorted(k for k in self._records if kind is None or k[0] == kind)
+
+    def children(self, key):
+        """Returns a sorted list with the keys of the objects in a workspace
+        or store.
+        """
+        return sorted(self._children.get(key, ()))
+
+    def resources(self, store_key):
+        """Returns a sorted list with the keys of the featuretypes or coverages
+        in a store.
+        """
+        return self.children(store_key)
+
+    def resource_of_layer(self, layername):
+        """Returns the key of the featuretype or coverage of a layer, or None
+        if it is not in the catalog.
+        """
+        return self._qualified.get(self._layer_resource.get(layername))
+
+    def layers_of_resource(self, resource_key):
+        """Returns a sorted list with the names of the layers of a
+        featuretype or coverage.
+        """
+        return sorted(self._resource_layers.get(
+                            resource_key[1] + ':' + resource_key[-1], ()))
+
+    def styles_of_layer(self, layername):
+        """Returns a list with the names of the styles of a layer, the default
+        style first.
+        """
+        return list(self._layer_styles.get(layername, ()))
+
+    def layers_of_style(self, stylename):
+        """Returns a sorted list with the names of the layers that use the
+        style, as default style or not.
+        """
+        return sorted(self._style_layers.get(stylename, ()))
+
+    def layergroups_of_style(self, stylename):
+        """Returns a sorted list with the names of the layergroups that use the
+        style for one of their layers.
+        """
+        return sorted(self._style_layergroups.get(stylename, ()))
+
+    def layers_of_layergroup(self, layergroupname):
+        """Returns a list with the names of the layers in the layergroup, in
+        drawing order. Layergroups in the layergroup are not expanded.
+        """
+        return [p[1] for p in self._layergroup_published.get(layergroupname,
+                                                             ())
+                if p[0] == 'layers']
+
+    def layergroups_of_layer(self, layername):
+        """Returns a sorted list with the names of the layergroups the layer
+        is in.
+        """
+        return sorted(self._published_layergroups.get(('layers', layername),
+                                                      ()))
+
+    def crs(self, resource_key):
+        """Returns the native CRS of a featuretype or coverage, or None."""
+        record = self._records.get(resource_key)
+        return record and record.native_crs
+
+    def resources_with_crs(self, crs):
+        """Returns a sorted list with the keys of the featuretypes and
+        coverages with this native or declared CRS, like 'EPSG:28992'.
+        """
+        return sorted(self._crs_resources.get(crs, ()))
+
+    def _depending(self, key):
+        """Returns the keys of the objects that directly depend on the
+        object.
+        """
+        out = list(self._children.get(key, ()))
+        kind, name = key[0], key[-1]
+        if kind in ('featuretypes', 'coverages'):
+            out.extend(('layers', l) for l in self.layers_of_resource(key))
+        elif kind == 'styles':
+            out.extend(('layers', l) for l in self.layers_of_style(name))
+            out.extend(('layergroups', g)
+                       for g in self.layergroups_of_style(name))
+        if kind in ('layers', 'layergroups'):
+            out.extend(('layergroups', g) for g in
+                       self._published_layergroups.get((kind, name), ()))
+        return out
+
+    def _depended(self, key):
+        """Returns the keys of the objects the object directly depends on."""
+        out = []
+        kind, name = key[0], key[-1]
+        parent = self._parent(key)
+        if parent is not None:
+            out.append(parent)
+        if kind == 'layers':
+            resource = self.resource_of_layer(name)
+            if resource is not None:
+                out.append(resource)
+            out.extend(('styles', s) for s in self.styles_of_layer(name))
+        elif kind == 'layergroups':
+            out.extend(self._layergroup_published.get(name, ()))
+            out.extend(('styles', s)
+                       for s in self._layergroup_styles.get(name, ()))
+        return [k for k in out if k in self._records]
+
+    def dependents(self, key):
+        """Find everything that is affected when the object changes or is
+        deleted: the objects in it, the layers of a featuretype, coverage or
+        style, the layergroups of those layers and so on.
+
+        Returns a sorted list with the keys of the objects.
+        """
+        return sorted(_walk(key, self._depending))
+
+    def dependencies(self, key):
+        """Find everything the object needs: its workspace and store, the
+        resource and styles of a layer, the layers of a layergroup and so on.
+
+        Returns a sorted list with the keys of the objects.
+        """
+        return sorted(_walk(key, self._depended))
+
+def _walk(key, neighbours):
+    """Returns the set of keys reachable from key, without key itself."""
+    seen = set([key])
+    todo = [key]
+    while todo:
+        for k in neighbours(todo.pop()):
+            if k not in seen:
+                seen.add(k)
+                todo.append(k)
+    seen.discard(key)
+    return seen
+
+def _unique(values):
+    """Returns a list of the values that are not empty, without doubles, in
+    order.
+    """
+    out = []
+    for value in values:
+        if value and value not in out:
+            out.append(value)
+    return out
+
+def _discard(index, value, item):
+    """Remove item from the set of value in the index."""
+    items = index.get(value)
+    if items is not None:
+        items.discard(item)
+        if not items:
+            del index[value]
+
+def iter_objects(gs):
+    """Iterate over the objects of a catalog dict, like Crawler.crawl
+    returns, as (kind, name, data) for Catalog.
+    """
+    for kind in sorted(gs):
+        for name, data in sorted(gs[kind].items()):
+            yield kind, name, data
+
+def load_catalog(filename):
+    """Build the index of an export file or of a json document written by
+    export.write_json. An export file is read one object at a time.
+
+    Returns the Catalog.
+    """
+    if filename.endswith('.jsonl'):
+        return Catalog(export.iter_export(filename))
+    with open(filename) as f:
+        return Catalog(iter_objects(json.load(f)))
+
+def main():
+    catalog = load_catalog('geoserver_config.jsonl')
+    print len(catalog), 'objects'
+    for style in catalog.keys('styles'):
+        print style[1], catalog.layers_of_style(style[1])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""This file crawls all servers of a geoserver cluster at the same time and
+checks whether they hold the same catalog.
+
+Every server has its own section in the config file (see
+util.server_sections), for example:
+
+    [server]
+    port = 8080
+    address = geoserver
+    user = admin
+    pass = geoserver
+
+    [server:node1]
+    url = node1.example.com
+
+    [server:node2]
+    url = node2.example.com
+
+Every server is crawled by its own Crawler (see crawler.py) and written to its
+own export (see export.py). To compare the exports, the settings of every
+object are hashed, without the links and dates that differ between servers
+(see sync.flatten). Only the hashes are kept in memory, so the exports of many
+servers can be compared.
+
+Example:
+    >>> exports = export_servers('cluster.cfg', directory='exports')
+    >>> hashes = dict((node, hash_export(filename))
+    ...               for node, filename in exports.items() if filename)
+    >>> print_report(compare_hashes(hashes), sorted(hashes))
+"""
+import hashlib
+import json
+import logging
+import os
+from multiprocessing.pool import ThreadPool
+
+import export
+import sync
+from crawler import Crawler
+from util import Util, server_sections
+
+def node_name(section):
+    """Returns the name of the server of a section, like node1 for
+    server:node1.
+    """
+    return section.partition(':')[2] or section
+
+def export_server(config_file, section, filename, workers=None):
+    """Crawl a single server of the cluster and write its export.
+
+    Keyword arguments:
+    config_file -- the config file with the servers
+    section -- the section of the server
+    filename -- the export file to write
+    workers -- number of worker threads, defaults to the pool_size of the
+               server
+
+    Returns the filename of the export.
+    """
+    u = Util(config_file, section)
+    logging.info('Crawling server "{0}" to "{1}"'.format(section, filename))
+    crawler = Crawler(u, workers=workers)
+    try:
+        export.write_export(crawler, filename)
+    finally:
+        crawler.close()
+        u.close()
+    return filename
+
+def export_servers(config_file, directory='.', sections=None, workers=None):
+    """Crawl all servers of the cluster concurrently, every server to the
+    export <name of the server>.jsonl in directory.
+
+    Keyword arguments:
+    config_file -- the config file with the servers
+    directory -- the directory to write the exports to
+    sections -- the sections of the servers to crawl, default all
+    workers -- number of worker threads per server
+
+    Returns python dict with the name of the server as key and the filename
+    of its export as value, or None if the server could not be crawled.
+    """
+    if sections is None:
+        sections = server_sections(config_file)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    def crawl(section):
+        filename = os.path.join(directory, node_name(section) + '.jsonl')
+        try:
+            return export_server(config_file, section, filename, workers)
+        except Exception as e:
+            logging.error('Could not crawl server "{0}": {1}'.format(
+                                section, e))
+            return None
+    pool = ThreadPool(len(sections))
+    try:
+        filenames = pool.map(crawl, sections)
+    finally:
+        pool.close()
+        pool.join()
+    return dict(zip([node_name(s) for s in sections], filenames))
+
+def hash_export(filename):
+    """Hash the settings of every object in an export.
+
+    Returns python dict with the key of the object (see sync.flatten) as key
+    and the sha1 hash of its settings as value.
+    """
+    objects = sync.flatten(export.load_export(filename))
+    return dict((key, hashlib.sha1(json.dumps(info,
+                                              sort_keys=True)).hexdigest())
+                for key, info in objects.items())
+
+def compare_hashes(hashes):
+    """Find the objects that differ between the servers.
+
+    Keyword arguments:
+    hashes -- python dict with the name of the server as key and the hashes
+              of its export (see hash_export) as value
+
+    Returns python dict with the key of every object that is not the same on
+    all servers as key, and a dict with the name of the server as key and the
+    hash of the object, or None if it is missing, as value.
+    """
+    keys = set()
+    for node_hashes in hashes.values():
+        keys.update(node_hashes)
+    differences = {}
+    for key in keys:
+        values = dict((node, node_hashes.get(key))
+                      for node, node_hashes in hashes.items())
+        if len(set(values.values())) > 1:
+            differences[key] = values
+    return differences
+
+def print_report(differences, nodes):
+    """Print the objects that differ, with the servers grouped by the version
+    of the object they have.
+    """
+    if not differences:
+        print 'All {0} servers are consistent'.format(len(nodes))
+        return
+    print '{0} objects differ between {1} servers'.format(len(differences),
+                                                         len(nodes))
+    for key in sorted(differences):
+        print '{0:14} {1}'.format(key[0], '/'.join(key[1:]))
+        versions = {}
+        for node in nodes:
+            versions.setdefault(differences[key].get(node), []).append(node)
+        for value, version_nodes in sorted(versions.items(),
+                                           key=lambda v: -len(v[1])):
+            print '    {0:8} {1}'.format(value[:8] if value else 'missing',
+                                         ', '.join(version_nodes))
+
+def main():
+    exports = export_servers('cluster.cfg', directory='exports')
+    hashes = dict((node, hash_export(filename))
+                  for node, filename in exports.items() if filename)
+    print_report(compare_hashes(hashes), sorted(hashes))
+
+if __name__ == '__main__':
+    main()
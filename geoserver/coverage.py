@@ -0,0 +1,106 @@
+"""This file communicates with geoserver over the REST interface to deal with
+the coverages. It has functionality to create and delete coverages. This
+class uses the utility class Util (see util.py) to read the configuration and
+the enable general functionality. Make sure there is a valid configuration file.
+
+Example:
+    >>> config = Util()
+    >>> coverages = get_coverages('nurc', 'mosaic', config)
+    >>> print coverages
+    >>> print coverage_exists('nurc', 'mosaic', 'mosaic', config)
+    >>> print get_coverage_info('nurc', 'mosaic', 'mosaic', config)
+"""
+import rest
+from util import Util
+
+def get_coverages(workspace, coveragestore, u):
+    """Get an overview of all coverages of this coveragestore in the
+    workspace.
+
+    Uses the util class to get the specifices on the server etc. Assumes the
+    workspace exists.
+
+    Returns python dict with name of the coverages as key and a dict as
+    value. This dict contains the href to the coverage.
+    """
+    return rest.get_list('coverages', (workspace, coveragestore), u)
+
+def coverage_exists(workspacename, coveragestorename, coveragename, u):
+    """Check if coverage already exists in this geoserver configuration.
+
+    Only when the coverage is not found, the coveragestore is checked to log
+    why.
+
+    Returns True of False.
+    """
+    return rest.exists('coverages', (workspacename, coveragestorename),
+                       coveragename, u)
+
+def get_coverage_info(workspacename, coveragestorename, coveragename, u):
+    """Get information on the coverage
+
+    The coveragestore is only checked when the coverage is not found, to tell
+    which of the two is missing.
+
+    Returns a dict with the coverage info.
+    """
+    return rest.get_info('coverages', (workspacename, coveragestorename),
+                         coveragename, u)
+
+def create_coverage(workspacename, coveragestorename, coverage_info, u):
+    """Create (publish) a new coverage in the coveragestore of the workspace.
+
+    The coverage_info is a dict like get_coverage_info returns. Geoserver
+    also creates the layer of the coverage. Does not check if the coverage
+    already exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.create('coverages', (workspacename, coveragestorename),
+                       coverage_info, u)
+
+def update_coverage(workspacename, coveragestorename, coveragename,
+                    coverage_info, u):
+    """Change the settings of an existing coverage.
+
+    The coverage_info is a dict like get_coverage_info returns.
+
+    Returns True or False if succesful.
+    """
+    return rest.update('coverages', (workspacename, coveragestorename),
+                       coveragename, coverage_info, u)
+
+def delete_coverage(workspacename, coveragestorename, coveragename, u,
+                    recurse=False):
+    """Delete the coverage from the coveragestore.
+
+    With recurse, the layer of the coverage is deleted too, otherwise
+    geoserver refuses to delete a coverage that is published. Does not check
+    if the coverage exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.delete('coverages', (workspacename, coveragestorename),
+                       coveragename, u, recurse)
+
+def delete_all_coverages(workspacename, coveragestorename, u, recurse=False):
+    """Delete all coverages from the coveragestore, one after another.
+
+    With recurse, the layers of the coverages are deleted too, see
+    delete_coverage.
+
+    Returns python dict with the name of every coverage as key and True or
+    False if it was deleted as value.
+    """
+    return rest.delete_all('coverages', (workspacename, coveragestorename), u,
+                           recurse)
+
+def main():
+    config = Util()
+    coverages = get_coverages('nurc', 'mosaic', config)
+    print coverages
+    print coverage_exists('nurc', 'mosaic', 'mosaic', config)
+    print get_coverage_info('nurc', 'mosaic', 'mosaic', config)
+
+if __name__ == '__main__':
+    main()
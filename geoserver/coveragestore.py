@@ -13,81 +13,89 @@ Example:
     >>> print coveragestore_exists('tiger','nyc', config)
     >>> print get_coveragestore_info('tiger', 'nyc', config)
 """
-import json
-import logging
-import workspace
+import rest
 from util import Util
 
 def get_coveragestores(workspace, u):
     """Get an overview of all coveragestores of this workspace.
 
-    Uses the util class to get the specifices on the server etc.
+    Uses the util class to get the specifices on the server etc. Assumes the
+    workspace exists.
 
     Returns python dict with name of the coveragestores as key and a dict as
-    value. This dict contains the href to the coveragestore.
+    value. This dict contains the href to the coveragestore. Returns None
+    if there are no coveragestores. Raises rest.ListingError if they could
+    not be listed.
     """
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/workspaces/' + workspace + \
-                                  '/coveragestores.json',
-                           payload = None,
-                           mime = 'application/json')
-    json_coverage = json.loads(ds_request)
-    if json_coverage.get('coverageStores') == '':
-        return None
-    coveragestores = json_coverage.get('coverageStores').get('coverageStore')
-
-    out = {}
-    for coveragestore in coveragestores:
-        out[coveragestore.get('name')] = {'href': coveragestore.get('href')}
-    return out
+    return rest.get_list('coveragestores', (workspace,), u)
 
 def coveragestore_exists(workspacename, coveragestorename, u):
     """Check if coveragestore alreade exists in this geoserver configuration.
 
+    Only when the coveragestore is not found, the workspace is checked to log
+    why.
+
     Returns True of False.
     """
-    if (not(workspace.workspace_exists(workspacename, u))):
-            logging.error('Coveragestore cannot exist if workspace doesn\'t exist.')
-            return False
-    
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/workspaces/' + workspacename + \
-                                  '/coveragestores/' + coveragestorename + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    return stat == 200
+    return rest.exists('coveragestores', (workspacename,), coveragestorename,
+                       u)
 
 def get_coveragestore_info(workspacename, coveragestorename, u):
     """Get information on the coveragestore
 
+    The workspace is only checked when the coveragestore is not found, to tell
+    which of the two is missing.
+
     Returns a dict with the coveragestore info.
     """
-    if (not(workspace.workspace_exists(workspacename, u))):
-            logging.error('Workspace doesn\'t exist, so no info on ' + \
-                          'coveragestore available.')
-            return {'info': 'No workspace, so no coveragestore info.'}
-    stat, ds_request = u.request(method = 'GET',
-                                 path = 'rest/workspaces/' + workspacename + \
-                                        '/coveragestores/' + \
-                                        coveragestorename + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    if stat != 200:
-        logging.error('Coveragestore: "' + coveragestorename + '" does not' + \
-                      ' exist! Cannot get information.')
-        return {'info': 'Coveragestore does not exist!'}
-
-    ds_info = json.loads(ds_request).get('coverageStore')
-    return ds_info
-
-#TODO
-#def create_coveragestore(workspace, coveragestorename, u):
-
-#TODO
-#def delete_coveragestore(workspace, coveragestorename, u):
-
-#TODO
-#def delete_all_coveragestores(workspace, u):
+    return rest.get_info('coveragestores', (workspacename,),
+                         coveragestorename, u)
+
+def create_coveragestore(workspacename, coveragestore_info, u):
+    """Create a new coveragestore in the workspace.
+
+    The coveragestore_info is a dict like get_coveragestore_info returns. Does
+    not check if the coveragestore already exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.create('coveragestores', (workspacename,),
+                       coveragestore_info, u)
+
+def update_coveragestore(workspacename, coveragestorename, coveragestore_info,
+                         u):
+    """Change the settings of an existing coveragestore.
+
+    The coveragestore_info is a dict like get_coveragestore_info returns.
+
+    Returns True or False if succesful.
+    """
+    return rest.update('coveragestores', (workspacename,), coveragestorename,
+                       coveragestore_info, u)
+
+def delete_coveragestore(workspacename, coveragestorename, u, recurse=False):
+    """Delete the coveragestore from the workspace.
+
+    With recurse, everything in the coveragestore (and the layers of it) is
+    deleted too, otherwise geoserver refuses to delete a coveragestore that is
+    not empty. Does not check if the coveragestore exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.delete('coveragestores', (workspacename,), coveragestorename,
+                       u, recurse)
+
+def delete_all_coveragestores(workspacename, u, recurse=False):
+    """Delete all coveragestores from the workspace, one after another.
+
+    With recurse, everything in the coveragestores is deleted too, see
+    delete_coveragestore.
+
+    Returns python dict with the name of every coveragestore as key and True or
+    False if it was deleted as value.
+    """
+    return rest.delete_all('coveragestores', (workspacename,), u, recurse)
+
 
 def main():
     print 'calling coveragestore.main'
@@ -0,0 +1,419 @@
+"""This file crawls the complete catalog of a geoserver over the REST
+interface. The per-item requests (info on every store, featuretype, coverage,
+layer, layergroup and style) are independent of each other, so they are fanned
+out over a pool of worker threads. The results are put back together in a
+fixed order, so the resulting dict does not depend on the order in which the
+requests were answered. When a previous export is given, only the objects that
+are not in it are fetched, unless they are revalidated: then they are
+requested again with conditional requests, which only cost a '304 Not
+Modified' for the objects that did not change. This class uses the utility
+class Util (see util.py) to read the configuration and the enable general
+functionality. Make sure there is a valid configuration file.
+
+Example:
+    >>> config = Util()
+    >>> crawler = Crawler(config, workers=8)
+    >>> gs = crawler.crawl()
+    >>> for name, layer in crawler.iter_layers():
+    ...     print name
+    >>> crawler.download_slds(gs['styles'])
+    >>> crawler.close()
+"""
+import logging
+import os
+from multiprocessing.pool import ThreadPool
+
+import workspace
+import featuretype
+import styles
+import rest
+from rest import STORE_KINDS
+from util import Util
+
+class Crawler:
+    """Crawl the catalog of a geoserver with a number of worker threads."""
+
+    def __init__(self, u, workers=None, previous=None, revalidate=False):
+        """Initialise the crawler
+
+        Keyword arguments:
+        u -- the Util instance to use for the requests
+        workers -- number of worker threads, defaults to the size of the
+                   connection pool of u
+        previous -- ExportReader with a previous export (see export.py), the
+                    info of objects in it is reused instead of fetched again
+        revalidate -- request the objects in previous again, so the objects
+                      that changed are not reused. Meant for a Util with
+                      conditional requests (see util.ValidatorStore), which
+                      makes the request of an unchanged object cheap.
+        """
+        self._u = u
+        self._previous = previous
+        self._revalidate = revalidate
+        if workers is None:
+            workers = u.pool_size
+        self._workers = workers
+        self._pool = ThreadPool(workers)
+        logging.info('Initialised crawler with {0} workers'.format(workers))
+
+    def map(self, func, items):
+        """Call func for every item in items on the worker threads.
+
+        Every item is a tuple with the arguments for func, the Util instance is
+        appended as last argument.
+
+        Returns a list with the results in the same order as items.
+        """
+        u = self._u
+        return self._pool.map(lambda args: func(*(args + (u,))), items)
+
+    def imap(self, func, items):
+        """Like map, but returns an iterator that yields the results as soon as
+        they are available, still in the same order as items.
+        """
+        u = self._u
+        return self._pool.imap(lambda args: func(*(args + (u,))), items)
+
+    def crawl(self):
+        """Crawl the workspaces, layers, layergroups and styles of the
+        geoserver.
+
+        Returns a python dict with the workspaces, layers, layergroups and
+        styles.
+        """
+        gs = {}
+        gs['workspaces'] = dict(self.iter_workspaces())
+        gs['layers'] = dict(self.iter_layers())
+        gs['layergroups'] = dict(self.iter_layergroups())
+        gs['styles'] = dict(self.iter_styles())
+        return gs
+
+    def iter_workspaces(self):
+        """Crawl all workspaces with their stores, featuretypes and coverages.
+
+        The stores of every type of all workspaces are listed concurrently.
+        Then the workspaces are crawled one after another, the stores,
+        featuretypes and coverages within a workspace concurrently. So only
+        one workspace is kept in memory at a time.
+
+        Yields the name of the workspace and a dict with the workspace and its
+        stores, sorted on name.
+        """
+        logging.info('Crawling workspaces')
+        names = sorted(workspace.get_workspaces(self._u))
+        default_workspace = workspace.get_name_of_default_workspace(self._u)
+
+        # stores of every type of every workspace
+        listings = self.map(_get_store_list, [(kind, (w,)) for w in names
+                                              for kind in STORE_KINDS])
+        for i, w in enumerate(names):
+            ws_stores = dict(zip(STORE_KINDS,
+                                 listings[i * len(STORE_KINDS):
+                                          (i + 1) * len(STORE_KINDS)]))
+            out = {'name': w, 'default': w == default_workspace}
+            previous = self._get_previous('workspaces', w) or {}
+            stores = self._crawl_stores(w, ws_stores, previous)
+            for store_kind in STORE_KINDS:
+                if not stores[store_kind]:
+                    continue
+                store_previous = previous.get(store_kind) or {}
+                for kind in rest.children(store_kind):
+                    if kind == 'featuretypes':
+                        resources = self._crawl_featuretypes(
+                                        w, stores[store_kind], store_previous)
+                    else:
+                        resources = self._crawl_resources(
+                                        kind, w, stores[store_kind],
+                                        store_previous)
+                    self._add_resources(stores[store_kind], kind, resources)
+            for kind in STORE_KINDS:
+                if ws_stores[kind]:
+                    out[kind] = stores[kind]
+            yield w, out
+
+    def _crawl_stores(self, w, ws_stores, previous):
+        """Crawl the info of the stores of every type of workspace w.
+
+        The info of the stores in previous is reused.
+
+        Returns python dict with the store type as key and a dict with the
+        name of the store as key and the info as value.
+        """
+        items = [(kind, (w,), s) for kind in STORE_KINDS
+                 for s in sorted(ws_stores[kind] or {})]
+        def previous_store(kind, parents, s):
+            return _without((previous.get(kind) or {}).get(s),
+                            rest.children(kind))
+        out = dict((kind, {}) for kind in STORE_KINDS)
+        for (kind, parents, s), info in self._fetch_missing(rest.get_info,
+                                                            items,
+                                                            previous_store):
+            out[kind][s] = info
+        return out
+
+    def _add_resources(self, stores, key, resources):
+        """Put the resources (featuretypes or coverages) in the info of their
+        store under key.
+        """
+        for s, store_resources in resources.items():
+            if s in stores:
+                stores[s][key] = store_resources
+
+    def _crawl_featuretypes(self, w, datastores, previous):
+        """Crawl the featuretypes of the datastores of workspace w.
+
+        The featuretypes of all datastores are listed with a single request on
+        the workspace. When the geoserver does not support that, or a
+        featuretype can not be placed in its datastore, the featuretypes are
+        listed per datastore. The info of the featuretypes in previous is
+        reused, the featuretypes are always listed to find new ones.
+
+        Returns python dict with name of the datastore as key and a dict with
+        the featuretypes in it as value.
+        """
+        ds_featuretypes = self._crawl_workspace_featuretypes(w, previous)
+        if ds_featuretypes is None:
+            ds_featuretypes = self._crawl_resources('featuretypes', w,
+                                                    datastores, previous)
+        return ds_featuretypes
+
+    def _crawl_workspace_featuretypes(self, w, previous):
+        """Crawl the featuretypes of workspace w with a single listing.
+
+        Returns python dict with name of the datastore as key and a dict with
+        the featuretypes in it as value, or None if the featuretypes could not
+        be crawled this way.
+        """
+        features = featuretype.get_workspace_featuretypes(w, self._u)
+        if features is None:
+            return None
+
+        # datastore of every featuretype in the previous export
+        previous_datastores = {}
+        for d, ds in previous.items():
+            for f in (ds or {}).get('featuretypes') or {}:
+                previous_datastores[f] = d
+        def previous_featuretype(w, f):
+            d = previous_datastores.get(f)
+            if d is None:
+                return None
+            return previous[d]['featuretypes'][f]
+
+        out = {}
+        for (w, f), info in self._fetch_missing(
+                            featuretype.get_workspace_featuretype_info,
+                            [(w, f) for f in sorted(features)],
+                            previous_featuretype):
+            d = featuretype.get_datastore_of_featuretype(info)
+            if d is None:
+                logging.info('Datastore of featuretype "{0}:{1}" unknown, '
+                             'listing per datastore'.format(w, f))
+                return None
+            out.setdefault(d, {})[f] = info
+        return out
+
+    def _crawl_resources(self, kind, w, stores, previous):
+        """Crawl the resources (featuretypes or coverages) of the stores of
+        workspace w, one listing per store.
+
+        Keyword arguments:
+        kind -- the type of the resources, which is also their key in the
+                store info
+        w -- the name of the workspace
+        stores -- the names of the stores
+        previous -- the stores of the workspace in the previous export
+
+        Returns python dict with name of the store as key and a dict with the
+        resources in it as value.
+        """
+        out = {}
+        keys = []
+        store_keys = [(kind, (w, s)) for s in sorted(stores)]
+        store_resources = self.map(rest.get_list, store_keys)
+        for (kind, parents), resources in zip(store_keys, store_resources):
+            if resources:
+                out[parents[1]] = {}
+                keys.extend((kind, parents, r) for r in sorted(resources))
+
+        # info of every resource
+        def previous_resource(kind, parents, r):
+            return ((previous.get(parents[1]) or {}).get(kind) or {}).get(r)
+        for (kind, parents, r), info in self._fetch_missing(rest.get_info,
+                                                            keys,
+                                                            previous_resource):
+            out[parents[1]][r] = info
+        return out
+
+    def _get_previous(self, kind, name):
+        """Get the info of an object in the previous export.
+
+        Returns the info or None if there is no previous export or the object
+        is not in it.
+        """
+        if self._previous is None:
+            return None
+        return self._previous.get(kind, name)
+
+    def _fetch_missing(self, func, items, previous):
+        """Get the info of every item, reusing the info from the previous
+        export where possible.
+
+        Keyword arguments:
+        func -- the get_*_info function to fetch an item with
+        items -- list of tuples with the arguments for func
+        previous -- function that returns the previous info of an item
+
+        Yields every item with its info, in the same order as items.
+        """
+        if self._revalidate:
+            # every object is requested, the server answers with 304 Not
+            # Modified for the objects that did not change
+            reused = [None] * len(items)
+        else:
+            reused = [previous(*item) for item in items]
+        missing = [item for item, info in zip(items, reused)
+                   if not _is_valid(info)]
+        if len(missing) < len(items):
+            logging.info('Reusing {0} of {1} objects from the previous '
+                         'export'.format(len(items) - len(missing),
+                                         len(items)))
+        fetched = self.imap(func, missing)
+        for item, info in zip(items, reused):
+            if not _is_valid(info):
+                info = next(fetched)
+            yield item, info
+
+    def iter_layers(self):
+        """Crawl the info of all layers.
+
+        Yields the name of the layer and the layer info, sorted on name.
+        """
+        return self._iter_objects('layers')
+
+    def iter_layergroups(self):
+        """Crawl the info of all layergroups.
+
+        Yields the name of the layergroup and the layergroup info, sorted on
+        name.
+        """
+        return self._iter_objects('layergroups')
+
+    def iter_styles(self):
+        """Crawl the info of all styles.
+
+        Yields the name of the style and the style info, sorted on name.
+        """
+        return self._iter_objects('styles')
+
+    def _iter_objects(self, kind):
+        """Crawl the info of all objects of a type that is not in a
+        workspace, like layers.
+
+        Yields the name of the object and its info, sorted on name.
+        """
+        logging.info('Crawling ' + kind)
+        names = sorted(rest.iter_names(kind, (), self._u))
+        return ((name, info) for (kind, parents, name), info in
+                self._fetch_missing(rest.get_info,
+                                    [(kind, (), name) for name in names],
+                                    lambda kind, parents, name:
+                                        self._get_previous(kind, name)))
+
+    def download_slds(self, gs_styles, only_missing=False, store=None):
+        """Download the SLD of every style and write it to the filename in the
+        style info.
+
+        Keyword arguments:
+        gs_styles -- dict with name of the style as key and the info as value
+        only_missing -- only download the SLDs of which the file doesn't exist
+                        or of which the style info differs from the previous
+                        export
+        store -- SldStore (see sldstore.py) to keep the SLDs in, the files are
+                 links to it and the SLDs of unchanged styles are not
+                 downloaded again
+        """
+        logging.info('Downloading SLDs')
+        names = list(gs_styles)
+        failed = [s for s in gs_styles if not _is_valid(gs_styles[s])]
+        if failed:
+            # without the info, the filename of the SLD is unknown
+            logging.error('No info on the styles {0}, skipping their '
+                          'SLDs'.format(', '.join(sorted(failed))))
+            gs_styles = dict((s, info) for s, info in gs_styles.items()
+                             if s not in failed)
+        items = [(s, gs_styles[s]['filename']) for s in sorted(gs_styles)]
+        if only_missing:
+            items = [(s, filename) for s, filename in items
+                     if not os.path.exists(filename)
+                     or self._get_previous('styles', s) != gs_styles[s]]
+        if store is None:
+            self.map(_download_sld, items)
+            return
+        missing = [(s, filename) for s, filename in items
+                   if not store.is_current(s, gs_styles[s])]
+        if len(missing) < len(items):
+            logging.info('Reusing {0} of {1} SLDs from the store'.format(
+                            len(items) - len(missing), len(items)))
+        self.map(lambda s, filename, u: _store_sld(s, gs_styles[s], store, u),
+                 missing)
+        for s, filename in items:
+            store.link(s, filename)
+        # a style without info still exists, its SLD is kept
+        store.prune(names)
+        store.save()
+
+    def close(self):
+        """Stop the worker threads."""
+        self._pool.close()
+        self._pool.join()
+
+def _is_valid(info):
+    """Check if info is the info of an object and not missing or the message
+    of a get_*_info function that the object doesn't exist.
+    """
+    return bool(info) and info.keys() != ['info']
+
+def _get_store_list(kind, parents, u):
+    """List the stores of a type like rest.get_list. A type that the
+    geoserver does not have (see rest.OPTIONAL_KINDS) is skipped, any other
+    failed listing raises rest.ListingError, so the crawl stops instead of
+    returning an incomplete catalog.
+
+    Returns python dict with name of the stores as key, or None.
+    """
+    try:
+        return rest.get_list(kind, parents, u)
+    except rest.ListingError as e:
+        if kind not in rest.OPTIONAL_KINDS or e.status != 404:
+            raise
+        logging.warning('Skipping the {0} of "{1}", the geoserver does not '
+                        'have them'.format(kind, ':'.join(parents)))
+        return None
+
+def _without(info, keys):
+    """Returns a copy of the dict info without the keys, or None."""
+    if info is None:
+        return None
+    info = dict(info)
+    for key in keys:
+        info.pop(key, None)
+    return info
+
+def _download_sld(stylename, filename, u):
+    """Download the SLD of the style to filename."""
+    styles.download_sld(stylename, filename, u)
+
+def _store_sld(stylename, info, store, u):
+    """Download the SLD of the style and put it in the store."""
+    filename = store.new_file()
+    if styles.download_sld(stylename, filename, u):
+        store.put_file(stylename, filename, info)
+
+def main():
+    config = Util()
+    crawler = Crawler(config)
+    print crawler.crawl()
+    crawler.close()
+
+if __name__ == '__main__':
+    main()
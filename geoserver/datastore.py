@@ -13,9 +13,7 @@ Example:
     >>> print datastore_exists('tiger','nyc', config)
     >>> print get_datastore_info('tiger', 'nyc', config)
 """
-import json
-import logging
-import workspace
+import rest
 from util import Util
 
 def get_datastores(workspace, u):
@@ -25,70 +23,74 @@ def get_datastores(workspace, u):
     workspace exists.
 
     Returns python dict with name of the datastores as key and a dict as
-    value. This dict contains the href to the datastore.
+    value. This dict contains the href to the datastore. Returns None if
+    there are no datastores. Raises rest.ListingError if they could not be
+    listed.
     """
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/workspaces/' + workspace + \
-                                  '/datastores.json',
-                           payload = None,
-                           mime = 'application/json')
-    json_data = json.loads(ds_request)
-    if json_data.get('dataStores') == '':
-        return None
-    datastores = json_data.get('dataStores').get('dataStore')
-
-    out = {}
-    for datastore in datastores:
-        out[datastore.get('name')] = {'href': datastore.get('href')}
-    return out
+    return rest.get_list('datastores', (workspace,), u)
 
 def datastore_exists(workspacename, datastorename, u):
     """Check if datastore alreade exists in this geoserver configuration.
 
+    Only when the datastore is not found, the workspace is checked to log why.
+
     Returns True of False.
     """
-    if (not(workspace.workspace_exists(workspacename, u))):
-            logging.error('Datastore cannot exist if workspace doesn\'t exist.')
-            return False
-    
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/workspaces/' + workspacename + \
-                                  '/datastores/' + datastorename + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    return stat == 200
+    return rest.exists('datastores', (workspacename,), datastorename, u)
 
 def get_datastore_info(workspacename, datastorename, u):
     """Get information on the datastore
 
+    The workspace is only checked when the datastore is not found, to tell
+    which of the two is missing.
+
     Returns a dict with the datastore info.
     """
-    if (not(workspace.workspace_exists(workspacename, u))):
-            logging.error('Workspace doesn\'t exist, so no info on ' + \
-                          'datastore available.')
-            return {'info': 'No workspace, so no datastore info.'}
-    stat, ds_request = u.request(method = 'GET',
-                                 path = 'rest/workspaces/' + workspacename + \
-                                        '/datastores/' + \
-                                        datastorename + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    if stat != 200:
-        logging.error('Datastore: "' + datastorename + '" does not' + \
-                      ' exist! Cannot get information.')
-        return {'info': 'Datastore does not exist!'}
-
-    ds_info = json.loads(ds_request).get('dataStore')
-    return ds_info
-
-#TODO
-#def create_datastore(workspace, datastorename, u):
-
-#TODO
-#def delete_datastore(workspace, datastorename, u):
-
-#TODO
-#def delete_all_datastores(workspace, u):
+    return rest.get_info('datastores', (workspacename,), datastorename, u)
+
+def create_datastore(workspacename, datastore_info, u):
+    """Create a new datastore in the workspace.
+
+    The datastore_info is a dict like get_datastore_info returns. Does not
+    check if the datastore already exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.create('datastores', (workspacename,), datastore_info, u)
+
+def update_datastore(workspacename, datastorename, datastore_info, u):
+    """Change the settings of an existing datastore.
+
+    The datastore_info is a dict like get_datastore_info returns.
+
+    Returns True or False if succesful.
+    """
+    return rest.update('datastores', (workspacename,), datastorename,
+                       datastore_info, u)
+
+def delete_datastore(workspacename, datastorename, u, recurse=False):
+    """Delete the datastore from the workspace.
+
+    With recurse, everything in the datastore (and the layers of it) is deleted
+    too, otherwise geoserver refuses to delete a datastore that is not empty.
+    Does not check if the datastore exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.delete('datastores', (workspacename,), datastorename, u,
+                       recurse)
+
+def delete_all_datastores(workspacename, u, recurse=False):
+    """Delete all datastores from the workspace, one after another.
+
+    With recurse, everything in the datastores is deleted too, see
+    delete_datastore.
+
+    Returns python dict with the name of every datastore as key and True or
+    False if it was deleted as value.
+    """
+    return rest.delete_all('datastores', (workspacename,), u, recurse)
+
 
 def main():
     print 'calling datastore.main'
@@ -0,0 +1,258 @@
+"""This file writes an export of the geoserver catalog to disk while it is being
+crawled. Every workspace, layer, layergroup and style is written as a single
+line of json (JSON Lines) as soon as it is fetched, so only one object is kept
+in memory at a time. The nested json document, compact or pretty printed, is
+derived from that file afterwards, again reading one object at a time.
+
+Every line of the export is a json object with the keys:
+    kind -- the part of the catalog: workspaces, layers, layergroups or styles
+    name -- the name of the object
+    data -- the info of the object
+
+Example:
+    >>> config = Util()
+    >>> crawler = Crawler(config)
+    >>> write_export(crawler, 'geoserver_config.jsonl')
+    >>> write_json('geoserver_config.jsonl', 'geoserver_config.json')
+    >>> write_json('geoserver_config.jsonl',
+    ...            'geoserver_config_prettyprint.json', indent=4)
+
+For an incremental export, the previous export is given to the crawler, which
+then only fetches the objects that are not in it:
+    >>> previous = ExportReader('geoserver_config.jsonl')
+    >>> crawler = Crawler(config, previous=previous)
+    >>> write_export(crawler, 'geoserver_config.jsonl.new')
+
+The export file is also the checkpoint of a crawl: every line is written and
+flushed as soon as the object is fetched. When a crawl is interrupted, it is
+resumed by giving the partial export to the crawler as previous export and
+appending the objects that are not in it yet:
+    >>> previous = ExportReader('geoserver_config.jsonl.new')
+    >>> crawler = Crawler(config, previous=previous)
+    >>> write_export(crawler, 'geoserver_config.jsonl.new', resume=True)
+"""
+import json
+import logging
+import os
+import threading
+
+from crawler import Crawler
+from util import Util
+
+KINDS = ('workspaces', 'layers', 'layergroups', 'styles')
+
+class ExportWriter:
+    """Write catalog objects to a JSON Lines file."""
+
+    def __init__(self, filename, mode='w'):
+        """Open the export file
+
+        Keyword arguments:
+        filename -- the file to write to
+        mode -- 'w' to start a new export, 'a' to add to an existing one
+        """
+        self._file = open(filename, mode)
+
+    def write(self, kind, name, data):
+        """Write a single object to the export."""
+        self._file.write(json.dumps({'kind': kind, 'name': name, 'data': data},
+                                    sort_keys=True))
+        self._file.write('\n')
+        # every object is a checkpoint, it should survive a crash
+        self._file.flush()
+
+    def close(self):
+        """Close the export file."""
+        self._file.close()
+
+def write_export(crawler, filename, resume=False):
+    """Crawl the geoserver and write every object to the export file as soon
+    as it is fetched.
+
+    Keyword arguments:
+    crawler -- the Crawler to crawl the geoserver with
+    filename -- the export file to write
+    resume -- add the objects that are not in the file yet to it, instead of
+              starting a new export
+    """
+    done = {}
+    if resume and os.path.exists(filename):
+        repair_export(filename)
+        with open(filename) as export:
+            done = _index_export(export)
+        logging.info('Resuming export "' + filename + '" with {0} '
+                     'objects'.format(sum(len(d) for d in done.values())))
+    else:
+        logging.info('Writing export to "' + filename + '"')
+    writer = ExportWriter(filename, 'a' if done else 'w')
+    try:
+        for kind, crawl in (('workspaces', crawler.iter_workspaces),
+                            ('layers', crawler.iter_layers),
+                            ('layergroups', crawler.iter_layergroups),
+                            ('styles', crawler.iter_styles)):
+            for name, data in crawl():
+                if name not in done.get(kind, {}):
+                    writer.write(kind, name, data)
+    finally:
+        writer.close()
+
+def repair_export(filename):
+    """Remove the incomplete last line of an export file that was being
+    written when the crawl was interrupted.
+
+    Returns True if the file was changed, otherwise False.
+    """
+    with open(filename, 'rb+') as export:
+        end = 0
+        while True:
+            line = export.readline()
+            if not line.endswith('\n'):
+                break
+            try:
+                json.loads(line)
+            except ValueError:
+                break
+            end = export.tell()
+        export.seek(0, os.SEEK_END)
+        if export.tell() == end:
+            return False
+        logging.warning('Removing incomplete object at the end of "' +
+                        filename + '"')
+        export.truncate(end)
+        return True
+
+def iter_export(filename, kind=None):
+    """Read the objects from an export file.
+
+    Keyword arguments:
+    filename -- the export file to read
+    kind -- only yield objects of this kind, default all
+
+    Yields kind, name and data of every object.
+    """
+    with open(filename) as export:
+        for line in export:
+            record = json.loads(line)
+            if kind is None or record['kind'] == kind:
+                yield record['kind'], record['name'], record['data']
+
+def load_export(filename):
+    """Read an export file, or a json document written by write_json, into a
+    python dict like Crawler.crawl returns.
+    """
+    if not filename.endswith('.jsonl'):
+        with open(filename) as f:
+            return json.load(f)
+    gs = dict((kind, {}) for kind in KINDS)
+    for kind, name, data in iter_export(filename):
+        gs.setdefault(kind, {})[name] = data
+    return gs
+
+def _index_export(export):
+    """Find the offset of every object in an open export file.
+
+    When an object occurs more than once, the last one is used.
+
+    Returns a dict with kind as key and a dict name -> offset as value.
+    """
+    index = dict((kind, {}) for kind in KINDS)
+    while True:
+        offset = export.tell()
+        line = export.readline()
+        if not line:
+            break
+        record = json.loads(line)
+        index.setdefault(record['kind'], {})[record['name']] = offset
+    return index
+
+class ExportReader:
+    """Look up objects in an export file by kind and name.
+
+    Only the names and offsets of the objects are kept in memory, an object is
+    read from the file when it is asked for.
+    """
+
+    def __init__(self, filename):
+        """Open and index the export file."""
+        self._file = open(filename)
+        self._index = _index_export(self._file)
+        self._lock = threading.Lock()
+
+    def kinds(self):
+        """Returns a sorted list of the kinds in the export."""
+        return sorted(self._index)
+
+    def names(self, kind):
+        """Returns a sorted list of the names of the objects of this kind."""
+        return sorted(self._index.get(kind, {}))
+
+    def get(self, kind, name):
+        """Get the data of an object.
+
+        Returns the data or None if the object is not in the export.
+        """
+        offset = self._index.get(kind, {}).get(name)
+        if offset is None:
+            return None
+        with self._lock:
+            self._file.seek(offset)
+            line = self._file.readline()
+        return json.loads(line)['data']
+
+    def close(self):
+        """Close the export file."""
+        self._file.close()
+
+def write_json(export_filename, json_filename, indent=None):
+    """Write the export as a single nested json document with sorted keys,
+    like json.dumps of the complete catalog dict would.
+
+    Only the names and offsets of the objects are kept in memory, the objects
+    themselves are read and written one at a time.
+
+    Keyword arguments:
+    export_filename -- the export file to read
+    json_filename -- the json file to write
+    indent -- indentation for pretty printing, default compact
+    """
+    if indent is None:
+        newline, separators = '', (', ', ': ')
+    else:
+        newline, separators = '\n', (',', ': ')
+    ind1 = newline + ' ' * (indent or 0)
+    ind2 = ind1 + ' ' * (indent or 0)
+
+    reader = ExportReader(export_filename)
+    try:
+        with open(json_filename, 'w') as out:
+            out.write('{')
+            for i, kind in enumerate(reader.kinds()):
+                if i:
+                    out.write(separators[0])
+                out.write(ind1 + json.dumps(kind) + separators[1])
+                names = reader.names(kind)
+                if not names:
+                    out.write('{}')
+                    continue
+                out.write('{')
+                for j, name in enumerate(names):
+                    if j:
+                        out.write(separators[0])
+                    text = json.dumps(reader.get(kind, name), indent=indent,
+                                      separators=separators, sort_keys=True)
+                    out.write(ind2 + json.dumps(name) + separators[1] +
+                              text.replace('\n', ind2))
+                out.write(ind1 + '}')
+            out.write(newline + '}')
+    finally:
+        reader.close()
+
+def main():
+    config = Util()
+    crawler = Crawler(config)
+    write_export(crawler, 'geoserver_config.jsonl')
+    crawler.close()
+    write_json('geoserver_config.jsonl', 'geoserver_config.json')
+
+if __name__ == '__main__':
+    main()
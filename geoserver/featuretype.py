@@ -11,11 +11,9 @@ Example:
     >>> print featuretypes
     >>> print featuretype_exists('tiger','nyc', 'giant_polygon', config)
     >>> print get_featuretype_info('tiger', 'nyc', 'giant_polygon', config)
+    >>> print get_workspace_featuretypes('tiger', config)
 """
-import json
-import logging
-import workspace
-import datastore
+import rest
 from util import Util
 
 def get_featuretypes(workspace, datastore, u):
@@ -27,73 +25,113 @@ def get_featuretypes(workspace, datastore, u):
     Returns python dict with name of the datastores as key and a dict as
     value. This dict contains the href to the datastore.
     """
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/workspaces/' + workspace + \
-                                  '/datastores/' + datastore + \
-                                  '/featuretypes.json',
-                           payload = None,
-                           mime = 'application/json')
-    json_data = json.loads(ds_request)
-    if json_data.get('featureTypes') == '':
+    return rest.get_list('featuretypes', (workspace, datastore), u)
+
+def get_workspace_featuretypes(workspacename, u):
+    """Get an overview of all featuretypes of all datastores in the workspace
+    with a single request.
+
+    Returns python dict with name of the featuretypes as key and a dict as
+    value. This dict contains the href to the featuretype. Returns None if the
+    geoserver does not support this listing.
+    """
+    try:
+        return rest.get_list('workspace_featuretypes', (workspacename,),
+                             u) or {}
+    except rest.ListingError:
         return None
-    featuretypes = json_data.get('featureTypes').get('featureType')
 
-    out = {}
-    for featuretype in featuretypes:
-        out[featuretype.get('name')] = {'href': featuretype.get('href')}
-    return out
+def get_workspace_featuretype_info(workspacename, featuretypename, u):
+    """Get information on a featuretype of the workspace, without knowing its
+    datastore. The datastore is in the 'store' of the info.
+
+    Returns a dict with the featuretype info.
+    """
+    return rest.get_info('workspace_featuretypes', (workspacename,),
+                         featuretypename, u)
+
+def get_datastore_of_featuretype(featuretype_info):
+    """Get the name of the datastore from the featuretype info.
+
+    Returns the name or None if it is not in the info.
+    """
+    store = (featuretype_info or {}).get('store') or {}
+    name = store.get('name')
+    if not name:
+        return None
+    return name.split(':')[-1]
 
 def featuretype_exists(workspacename, datastorename, featuretypename, u):
     """Check if featuretype in datastore  alreade exists in this geoserver
     configuration.
 
+    Only when the featuretype is not found, the datastore is checked to log
+    why.
+
     Returns True of False.
     """
-    if (not(datastore.datastore_exists(workspacename, datastorename, u))):
-            logging.error('Featuretype cannot exist if datastore doesn\'t ' + \
-                          'exist.')
-            return False
-    
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/workspaces/' + workspacename + \
-                                  '/datastores/' + datastorename + \
-                                  '/featuretypes/' + featuretypename + '.json',
-                           payload = None,
-                           mime = 'application/json')
-    return stat == 200
+    return rest.exists('featuretypes', (workspacename, datastorename),
+                       featuretypename, u)
 
 def get_featuretype_info(workspacename, datastorename, featuretypename, u):
     """Get information on the featuretype
 
+    The datastore is only checked when the featuretype is not found, to tell
+    which of the two is missing.
+
     Returns a dict with the featuretype info.
     """
-    if (not(datastore.datastore_exists(workspacename, datastorename, u))):
-            logging.error('Datastore doesn\'t exist, so no info on ' + \
-                          'featuretype available.')
-            return {'info': 'No datastore, so no featuretype info.'}
-    stat, ds_request = u.request(method = 'GET',
-                                 path = 'rest/workspaces/' + workspacename + \
-                                        '/datastores/' + datastorename + \
-                                        '/featuretypes/' + featuretypename + \
-                                        '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    if stat != 200:
-        logging.error('Featuretype: "' + featuretypename + '" does not' + \
-                      ' exist! Cannot get information.')
-        return {'info': 'Featuretype does not exist!'}
-
-    ds_info = json.loads(ds_request).get('featureType')
-    return ds_info
-
-#TODO
-#def create_datastore(workspace, datastorename, u):
-
-#TODO
-#def delete_datastore(workspace, datastorename, u):
-
-#TODO
-#def delete_all_datastores(workspace, u):
+    return rest.get_info('featuretypes', (workspacename, datastorename),
+                         featuretypename, u)
+
+def create_featuretype(workspacename, datastorename, featuretype_info, u):
+    """Create (publish) a new featuretype in the datastore of the workspace.
+
+    The featuretype_info is a dict like get_featuretype_info returns. Geoserver
+    also creates the layer of the featuretype. Does not check if the
+    featuretype already exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.create('featuretypes', (workspacename, datastorename),
+                       featuretype_info, u)
+
+def update_featuretype(workspacename, datastorename, featuretypename,
+                       featuretype_info, u):
+    """Change the settings of an existing featuretype.
+
+    The featuretype_info is a dict like get_featuretype_info returns.
+
+    Returns True or False if succesful.
+    """
+    return rest.update('featuretypes', (workspacename, datastorename),
+                       featuretypename, featuretype_info, u)
+
+def delete_featuretype(workspacename, datastorename, featuretypename, u,
+                       recurse=False):
+    """Delete the featuretype from the datastore.
+
+    With recurse, the layer of the featuretype is deleted too, otherwise
+    geoserver refuses to delete a featuretype that is published. Does not
+    check if the featuretype exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.delete('featuretypes', (workspacename, datastorename),
+                       featuretypename, u, recurse)
+
+def delete_all_featuretypes(workspacename, datastorename, u, recurse=False):
+    """Delete all featuretypes from the datastore, one after another.
+
+    With recurse, the layers of the featuretypes are deleted too, see
+    delete_featuretype.
+
+    Returns python dict with the name of every featuretype as key and True or
+    False if it was deleted as value.
+    """
+    return rest.delete_all('featuretypes', (workspacename, datastorename), u,
+                           recurse)
+
 
 def main():
     config = Util()
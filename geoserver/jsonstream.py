@@ -0,0 +1,138 @@
+"""This file parses the json listings of the REST interface while they are
+being received, see Util.stream. A listing looks like
+
+    {"layers": {"layer": [{"name": "roads", "href": "..."}, ...]}}
+
+or {"layers": ""} when it is empty. Only the object of a single item is in
+memory at a time, so the listing with tens of thousands of layers is never
+completely in memory, as text nor as python dict.
+
+Example:
+    >>> config = Util()
+    >>> with config.stream('GET', 'rest/layers.json') as response:
+    ...     for layer in iter_list(response, 'layers', 'layer'):
+    ...         print layer['name']
+"""
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+# the characters that can follow a complete number
+_NUMBER_END = ',]}' + _WHITESPACE
+
+class _Reader:
+    """Buffer of the text received so far, that is read further on demand."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.text = ''
+        self.pos = 0
+
+    def more(self):
+        """Read the next chunk.
+
+        Returns False at the end of the response.
+        """
+        chunk = next(self._chunks, None)
+        if not chunk:
+            return False
+        # drop the text that has been parsed already
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, '' at the end."""
+        while True:
+            while (self.pos < len(self.text)
+                   and self.text[self.pos] in _WHITESPACE):
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ''
+
+    def expect(self, characters):
+        """Read the next character, that should be one of characters.
+
+        Returns the character.
+        """
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError('Expected {0!r} at {1!r}'.format(
+                                characters, self.text[self.pos:self.pos + 20]))
+        self.pos += 1
+        return character
+
+    def value(self):
+        """Read the next json value, reading more until it is complete.
+
+        Returns the value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                if not self.more():
+                    raise
+                continue
+            if (isinstance(value, (int, long, float))
+                    and (end == len(self.text)
+                         or self.text[end] not in _NUMBER_END)):
+                # a number may continue in the next chunk, '1.' or '1e' of
+                # '1.5' or '1e3' is decoded as 1 too
+                if self.more():
+                    continue
+            self.pos = end
+            return value
+
+def iter_list(chunks, root, child):
+    """Parse the items of a listing of the REST interface.
+
+    Keyword arguments:
+    chunks -- iterable with the text of the response in chunks, like a
+              StreamedResponse
+    root -- the key of the listing, like 'layers'
+    child -- the key of the items in the listing, like 'layer'
+
+    Yields the python dict of every item.
+    """
+    reader = _Reader(chunks)
+    reader.expect('{')
+    while reader.peek() != '}':
+        key = reader.value()
+        reader.expect(':')
+        if key != root:
+            reader.value()
+        elif reader.peek() != '{':
+            # the empty listing
+            reader.value()
+        else:
+            for item in _iter_child(reader, child):
+                yield item
+        if reader.peek() == ',':
+            reader.pos += 1
+    reader.expect('}')
+
+def _iter_child(reader, child):
+    """Parse the object of the listing, yield the items of the child key."""
+    reader.expect('{')
+    while reader.peek() != '}':
+        key = reader.value()
+        reader.expect(':')
+        if key != child:
+            reader.value()
+        elif reader.peek() != '[':
+            # a single item is not always put in a list
+            yield reader.value()
+        else:
+            reader.expect('[')
+            while reader.peek() != ']':
+                yield reader.value()
+                if reader.peek() == ',':
+                    reader.pos += 1
+            reader.expect(']')
+        if reader.peek() == ',':
+            reader.pos += 1
+    reader.expect('}')
@@ -3,8 +3,6 @@ the layergroups. It has functionality to create and delete layergroups. This
 class uses the utility class Util (see util.py) to read the configuration and
 the enable general functionality. Make sure there is a valid configuration file.
 
-TODO: add function to RENAME featurestype
-
 Example:
     >>> config = Util()
     >>> layergroups = get_layergroups(config)
@@ -12,8 +10,7 @@ Example:
     >>> print layergroup_exists(config)
     >>> print get_layergroup_info(config)
 """
-import json
-import logging
+import rest
 from util import Util
 
 def get_layergroups(u):
@@ -24,19 +21,7 @@ def get_layergroups(u):
     Returns python dict with name of the datastores as key and a dict as
     value. This dict contains the href to the layergroup..
     """
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/layergroups.json',
-                           payload = None,
-                           mime = 'application/json')
-    json_data = json.loads(ds_request)
-    if json_data.get('layerGroups') == '':
-        return None
-    layergroups = json_data.get('layerGroups').get('layerGroup')
-
-    out = {}
-    for layergroup in layergroups:
-        out[layergroup.get('name')] = {'href': layergroup.get('href')}
-    return out
+    return rest.get_list('layergroups', (), u)
 
 def layergroup_exists(layergroupname, u):
     """Check if layergroup already exists in this geoserver
@@ -44,39 +29,55 @@ def layergroup_exists(layergroupname, u):
 
     Returns True of False.
     """
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/layergroups/' + \
-                                  layergroupname + '.json',
-                           payload = None,
-                           mime = 'application/json')
-    return stat == 200
+    return rest.exists('layergroups', (), layergroupname, u)
 
 def get_layergroup_info(layergroupname, u):
     """Get information on the layergroup
 
     Returns a dict with the layergroup info.
     """
-    stat, ds_request = u.request(method = 'GET',
-                                 path = 'rest/layergroups/' + \
-                                        layergroupname + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    if stat != 200:
-        logging.error('Layergroup: "' + layergroupname + '" does not' + \
-                      ' exist! Cannot get information.')
-        return {'info': 'Layergroup does not exist!'}
-
-    ds_info = json.loads(ds_request).get('layerGroup')
-    return ds_info
-
-#TODO
-#def create_layergroup(layergroupname, u):
-
-#TODO
-#def delete_layergroup(layergroupname, u):
-
-#TODO
-#def delete_all_layergroups(u):
+    return rest.get_info('layergroups', (), layergroupname, u)
+
+def create_layergroup(layergroup_info, u):
+    """Create a new layergroup.
+
+    The layergroup_info is a dict like get_layergroup_info returns. Does not
+    check if the layergroup already exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.create('layergroups', (), layergroup_info, u)
+
+def update_layergroup(layergroupname, layergroup_info, u):
+    """Change the settings of an existing layergroup.
+
+    The layergroup_info is a dict like get_layergroup_info returns.
+
+    Returns True or False if succesful.
+    """
+    return rest.update('layergroups', (), layergroupname, layergroup_info,
+                       u)
+
+def delete_layergroup(layergroupname, u):
+    """Delete the layergroup.
+
+    Does not check if the layergroup exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.delete('layergroups', (), layergroupname, u)
+
+def delete_all_layergroups(u):
+    """Delete all layergroups, one after another.
+
+    A layergroup that is in another layergroup can only be deleted after that
+    layergroup, see bulkdelete.py to delete them in the right order.
+
+    Returns python dict with the name of every layergroup as key and True or
+    False if it was deleted as value.
+    """
+    return rest.delete_all('layergroups', (), u)
+
 
 def main():
     config = Util()
@@ -12,8 +12,7 @@ Example:
     >>> print layer_exists(layername, config)
     >>> print get_layer_info(config)
 """
-import json
-import logging
+import rest
 from util import Util
 
 def get_layers(u):
@@ -24,19 +23,17 @@ def get_layers(u):
     Returns python dict with name of the datastores as key and a dict as
     value. This dict contains the href to the layer..
     """
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/layers.json',
-                           payload = None,
-                           mime = 'application/json')
-    json_data = json.loads(ds_request)
-    if json_data.get('layers') == '':
-        return None
-    layers = json_data.get('layers').get('layer')
-
-    out = {}
-    for layer in layers:
-        out[layer.get('name')] = {'href': layer.get('href')}
-    return out
+    return rest.get_list('layers', (), u)
+
+def iter_layer_names(u):
+    """Iterate over the names of all layers.
+
+    The listing is parsed while it is received, so it is never completely in
+    memory (see jsonstream.py).
+
+    Yields the name of every layer.
+    """
+    return rest.iter_names('layers', (), u)
 
 def layer_exists(layername, u):
     """Check if layer already exists in this geoserver
@@ -44,39 +41,44 @@ def layer_exists(layername, u):
 
     Returns True of False.
     """
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/layers/' + \
-                                  layername + '.json',
-                           payload = None,
-                           mime = 'application/json')
-    return stat == 200
+    return rest.exists('layers', (), layername, u)
 
 def get_layer_info(layername, u):
     """Get information on the layer
 
     Returns a dict with the layer info.
     """
-    stat, ds_request = u.request(method = 'GET',
-                                 path = 'rest/layers/' + \
-                                        layername + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    if stat != 200:
-        logging.error('Layer: "' + layername + '" does not' + \
-                      ' exist! Cannot get information.')
-        return {'info': 'Layerdoes not exist!'}
-
-    ds_info = json.loads(ds_request).get('layer')
-    return ds_info
-
-#TODO
-#def create_layer(layername, u):
-
-#TODO
-#def delete_layer(layername, u):
-
-#TODO
-#def delete_all_layers(u):
+    return rest.get_info('layers', (), layername, u)
+
+def update_layer(layername, layer_info, u):
+    """Change the settings (styles, etc.) of a layer.
+
+    Geoserver creates a layer when its featuretype or coverage is published,
+    so there is no create_layer. The layer_info is a dict like get_layer_info
+    returns.
+
+    Returns True or False if succesful.
+    """
+    return rest.update('layers', (), layername, layer_info, u)
+
+def delete_layer(layername, u, recurse=False):
+    """Delete the layer.
+
+    With recurse, the resource (featuretype or coverage) of the layer is
+    deleted too. Does not check if the layer exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.delete('layers', (), layername, u, recurse)
+
+def delete_all_layers(u):
+    """Delete all layers, one after another.
+
+    Returns python dict with the name of every layer as key and True or False
+    if it was deleted as value.
+    """
+    return rest.delete_all('layers', (), u)
+
 
 def main():
     config = Util()
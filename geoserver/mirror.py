@@ -0,0 +1,281 @@
+"""This file keeps a copy of the catalog of a geoserver in a SQLite database,
+to query it with SQL without crawling the geoserver again, for example:
+
+    -- all layers in EPSG:28992
+    SELECT l.name FROM layers l
+      JOIN resources r ON r.workspace = l.resource_workspace
+                      AND r.name = l.resource_name
+     WHERE r.srs = 'EPSG:28992';
+
+    -- datastores pointing at host db1
+    SELECT workspace, store FROM store_parameters
+     WHERE key = 'host' AND value = 'db1';
+
+The database is filled from an export (see export.py), one object at a time.
+Every object of the export (a workspace with all its stores and their
+resources, a layer, a layergroup or a style) is stored in normalized tables,
+with the complete info as json in the info column. The database is updated
+incrementally: a hash of every object is kept, so only the objects that
+changed since the previous update are written again and the objects that are
+no longer in the export are deleted.
+
+Example:
+    >>> mirror = Mirror('geoserver_config.sqlite')
+    >>> print mirror.update(export.iter_export('geoserver_config.jsonl'))
+    >>> for row in mirror.query('SELECT name FROM styles'):
+    ...     print row[0]
+    >>> mirror.close()
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+
+import export
+import rest
+from rest import STORE_KINDS, as_list
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS updates (
+    id INTEGER PRIMARY KEY, time TEXT, objects INTEGER, changed INTEGER,
+    removed INTEGER);
+CREATE TABLE IF NOT EXISTS objects (
+    kind TEXT, name TEXT, hash TEXT, update_id INTEGER,
+    PRIMARY KEY (kind, name));
+CREATE TABLE IF NOT EXISTS workspaces (
+    name TEXT PRIMARY KEY, is_default INTEGER);
+CREATE TABLE IF NOT EXISTS stores (
+    workspace TEXT, kind TEXT, name TEXT, type TEXT, enabled INTEGER,
+    info TEXT, PRIMARY KEY (workspace, kind, name));
+CREATE INDEX IF NOT EXISTS stores_type ON stores (type);
+CREATE TABLE IF NOT EXISTS store_parameters (
+    workspace TEXT, kind TEXT, store TEXT, key TEXT, value TEXT);
+CREATE INDEX IF NOT EXISTS store_parameters_store
+    ON store_parameters (workspace, kind, store);
+CREATE INDEX IF NOT EXISTS store_parameters_key
+    ON store_parameters (key, value);
+CREATE TABLE IF NOT EXISTS resources (
+    workspace TEXT, store_kind TEXT, store TEXT, kind TEXT, name TEXT,
+    title TEXT, native_crs TEXT, srs TEXT, enabled INTEGER, info TEXT,
+    PRIMARY KEY (workspace, store_kind, store, name));
+CREATE INDEX IF NOT EXISTS resources_name ON resources (workspace, name);
+CREATE INDEX IF NOT EXISTS resources_srs ON resources (srs);
+CREATE INDEX IF NOT EXISTS resources_native_crs ON resources (native_crs);
+CREATE TABLE IF NOT EXISTS layers (
+    name TEXT PRIMARY KEY, type TEXT, resource_workspace TEXT,
+    resource_name TEXT, default_style TEXT, enabled INTEGER, info TEXT);
+CREATE INDEX IF NOT EXISTS layers_resource
+    ON layers (resource_workspace, resource_name);
+CREATE INDEX IF NOT EXISTS layers_default_style ON layers (default_style);
+CREATE TABLE IF NOT EXISTS layer_styles (
+    layer TEXT, style TEXT, is_default INTEGER, PRIMARY KEY (layer, style));
+CREATE INDEX IF NOT EXISTS layer_styles_style ON layer_styles (style);
+CREATE TABLE IF NOT EXISTS styles (
+    name TEXT PRIMARY KEY, filename TEXT, format TEXT, info TEXT);
+CREATE TABLE IF NOT EXISTS layergroups (
+    name TEXT PRIMARY KEY, mode TEXT, title TEXT, info TEXT);
+CREATE TABLE IF NOT EXISTS layergroup_items (
+    layergroup TEXT, position INTEGER, kind TEXT, name TEXT, style TEXT,
+    PRIMARY KEY (layergroup, position));
+CREATE INDEX IF NOT EXISTS layergroup_items_name ON layergroup_items (name);
+CREATE INDEX IF NOT EXISTS layergroup_items_style
+    ON layergroup_items (style);
+"""
+
+# kind of object in the export -> the tables with its rows and the column
+# with its name
+TABLES = {
+    'workspaces': (('workspaces', 'name'), ('stores', 'workspace'),
+                   ('store_parameters', 'workspace'),
+                   ('resources', 'workspace')),
+    'layers': (('layers', 'name'), ('layer_styles', 'layer')),
+    'layergroups': (('layergroups', 'name'), ('layergroup_items',
+                                              'layergroup')),
+    'styles': (('styles', 'name'),),
+}
+
+# keys in the info of a store that tell where its data is
+STORE_PARAMETERS = ('url', 'capabilitiesURL')
+
+class Mirror:
+    """Copy of the catalog of a geoserver in a SQLite database."""
+
+    def __init__(self, filename):
+        """Open the database, the tables are created when it is new
+
+        Keyword arguments:
+        filename -- the SQLite database file
+        """
+        self._db = sqlite3.connect(filename)
+        self._db.executescript(SCHEMA)
+
+    def update(self, objects, complete=True):
+        """Bring the database up to date with the objects of an export.
+
+        Keyword arguments:
+        objects -- iterable with tuples (kind, name, data) like
+                   export.iter_export yields
+        complete -- the objects are the complete catalog, the objects that
+                    are not in it are deleted from the database
+
+        Returns python dict with the number of objects, of changed objects
+        (new or different) and of removed objects.
+        """
+        db = self._db
+        with db:
+            update_id = db.execute(
+                            'INSERT INTO updates (time) VALUES (?)',
+                            (time.strftime('%Y-%m-%d %H:%M:%S'),)).lastrowid
+            hashes = dict(((kind, name), digest) for kind, name, digest in
+                          db.execute('SELECT kind, name, hash FROM objects'))
+            seen = []
+            count = changed = 0
+            for kind, name, data in objects:
+                if kind not in TABLES:
+                    continue
+                count += 1
+                # without sort_keys, as that is many times slower; objects
+                # read from the same json have their keys in the same order,
+                # at worst an unchanged object is written again
+                digest = hashlib.sha1(json.dumps(data)).hexdigest()
+                if hashes.get((kind, name)) == digest:
+                    seen.append((update_id, kind, name))
+                    continue
+                self._delete(kind, name)
+                self._insert(kind, name, data)
+                db.execute('INSERT OR REPLACE INTO objects '
+                           'VALUES (?, ?, ?, ?)',
+                           (kind, name, digest, update_id))
+                # an object can be in an export more than once, the last one
+                # counts
+                hashes[(kind, name)] = digest
+                changed += 1
+            db.executemany('UPDATE objects SET update_id = ? '
+                           'WHERE kind = ? AND name = ?', seen)
+            removed = 0
+            if complete:
+                gone = db.execute('SELECT kind, name FROM objects '
+                                  'WHERE update_id < ?',
+                                  (update_id,)).fetchall()
+                for kind, name in gone:
+                    self._delete(kind, name)
+                db.execute('DELETE FROM objects WHERE update_id < ?',
+                           (update_id,))
+                removed = len(gone)
+            db.execute('UPDATE updates SET objects = ?, changed = ?, '
+                       'removed = ? WHERE id = ?',
+                       (count, changed, removed, update_id))
+        logging.info('Updated mirror: {0} objects, {1} changed, {2} '
+                     'removed'.format(count, changed, removed))
+        return {'objects': count, 'changed': changed, 'removed': removed}
+
+    def _delete(self, kind, name):
+        """Delete the rows of an object of the export."""
+        for table, column in TABLES[kind]:
+            self._db.execute('DELETE FROM {0} WHERE {1} = ?'.format(table,
+                                                                   column),
+                             (name,))
+
+    def _insert(self, kind, name, data):
+        """Insert the rows of an object of the export."""
+        data = data or {}
+        db = self._db
+        if kind == 'workspaces':
+            db.execute('INSERT INTO workspaces VALUES (?, ?)',
+                       (name, bool(data.get('default'))))
+            for store_kind in STORE_KINDS:
+                for s, info in sorted((data.get(store_kind) or {}).items()):
+                    self._insert_store(name, store_kind, s, info or {})
+        elif kind == 'layers':
+            resource = (data.get('resource') or {}).get('name') or ''
+            resource_workspace, _, resource_name = resource.rpartition(':')
+            default_style = (data.get('defaultStyle') or {}).get('name')
+            db.execute('INSERT INTO layers VALUES (?, ?, ?, ?, ?, ?, ?)',
+                       (name, data.get('type'), resource_workspace or None,
+                        resource_name or None, default_style,
+                        data.get('enabled'), json.dumps(data)))
+            styles = [default_style] + [s.get('name') for s in as_list(
+                            (data.get('styles') or {}).get('style'))]
+            db.executemany('INSERT OR IGNORE INTO layer_styles '
+                           'VALUES (?, ?, ?)',
+                           [(name, s, i == 0) for i, s in enumerate(styles)
+                            if s])
+        elif kind == 'layergroups':
+            db.execute('INSERT INTO layergroups VALUES (?, ?, ?, ?)',
+                       (name, data.get('mode'), data.get('title'),
+                        json.dumps(data)))
+            published = as_list((data.get('publishables') or {})
+                                .get('published'))
+            styles = as_list((data.get('styles') or {}).get('style'))
+            # not in place, the list is in data
+            styles = styles + [{}] * (len(published) - len(styles))
+            db.executemany('INSERT INTO layergroup_items '
+                           'VALUES (?, ?, ?, ?, ?)',
+                           [(name, i, p.get('@type'), p.get('name'),
+                             s.get('name') or None)
+                            for i, (p, s) in enumerate(zip(published,
+                                                           styles))])
+        elif kind == 'styles':
+            db.execute('INSERT INTO styles VALUES (?, ?, ?, ?)',
+                       (name, data.get('filename'), data.get('format'),
+                        json.dumps(data)))
+
+    def _insert_store(self, w, kind, s, info):
+        """Insert a store with its parameters and resources."""
+        db = self._db
+        resource_kinds = rest.children(kind)
+        settings = dict((k, v) for k, v in info.items()
+                        if k not in resource_kinds)
+        db.execute('INSERT INTO stores VALUES (?, ?, ?, ?, ?, ?)',
+                   (w, kind, s, info.get('type'), info.get('enabled'),
+                    json.dumps(settings)))
+        parameters = [(e.get('@key'), e.get('$')) for e in as_list(
+                        (info.get('connectionParameters') or {}).get('entry'))]
+        parameters.extend((k, info[k]) for k in STORE_PARAMETERS if k in info)
+        db.executemany('INSERT INTO store_parameters VALUES (?, ?, ?, ?, ?)',
+                       [(w, kind, s, k, v) for k, v in parameters])
+        for resource_kind in resource_kinds:
+            rows = []
+            for r, resource in sorted((info.get(resource_kind) or {})
+                                      .items()):
+                resource = resource or {}
+                native_crs = resource.get('nativeCRS')
+                if isinstance(native_crs, dict):
+                    # the definition of a CRS without code
+                    native_crs = native_crs.get('$')
+                rows.append((w, kind, s, resource_kind, r,
+                             resource.get('title'), native_crs,
+                             resource.get('srs'), resource.get('enabled'),
+                             json.dumps(resource)))
+            db.executemany('INSERT INTO resources VALUES '
+                           '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def query(self, sql, parameters=()):
+        """Run a query on the database.
+
+        Returns a list with a tuple for every row.
+        """
+        return self._db.execute(sql, parameters).fetchall()
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
+
+def mirror_export(export_filename, database):
+    """Bring the database up to date with an export file.
+
+    Returns python dict with the number of objects, of changed objects and
+    of removed objects, see Mirror.update.
+    """
+    mirror = Mirror(database)
+    try:
+        return mirror.update(export.iter_export(export_filename))
+    finally:
+        mirror.close()
+
+def main():
+    print mirror_export('geoserver_config.jsonl', 'geoserver_config.sqlite')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""This file deals with the objects in the catalog of geoserver over the REST
+interface, for every type of object. Every type is described once in
+RESOURCES: where its objects are in the REST interface, the keys of its json
+and the type of object it is in. The functions of this file list, check, get,
+create, update and delete objects of any type with that description, the
+modules of the types (workspace.py, datastore.py, ...) call them. This class
+uses the utility class Util (see util.py) to read the configuration and the
+enable general functionality. Make sure there is a valid configuration file.
+
+An object is addressed by its type, the names of the objects it is in (the
+parents) and its own name, for example:
+
+    ('featuretypes', ('tiger', 'nyc'), 'giant_polygon')
+
+Example:
+    >>> config = Util()
+    >>> print get_list('datastores', ('tiger',), config)
+    >>> print exists('featuretypes', ('tiger', 'nyc'), 'giant_polygon', config)
+    >>> print get_info('layers', (), 'tasmania_roads', config)
+"""
+import json
+import logging
+import jsonstream
+from util import Util
+
+class Resource:
+    """Description of a type of object in the REST interface."""
+
+    def __init__(self, path, root, child, parent=None, name=None,
+                 delete_option='recurse'):
+        """Describe a type of object
+
+        Keyword arguments:
+        path -- the path of the listing without .json, with {0}, {1} for the
+                names of the parents
+        root -- the key of the listing in the json, like 'dataStores'
+        child -- the key of the object in the json, like 'dataStore'
+        parent -- the type of object the objects are in, None for the objects
+                  at the top
+        name -- the name of the type in messages, like 'Datastore'
+        delete_option -- the parameter to delete an object with everything
+                         in it, None if there is none
+        """
+        self.path = path
+        self.root = root
+        self.child = child
+        self.parent = parent
+        self.name = name
+        self.delete_option = delete_option
+
+RESOURCES = {
+    'workspaces': Resource('rest/workspaces', 'workspaces', 'workspace',
+                           name='Workspace'),
+    'datastores': Resource('rest/workspaces/{0}/datastores', 'dataStores',
+                           'dataStore', 'workspaces', 'Datastore'),
+    'coveragestores': Resource('rest/workspaces/{0}/coveragestores',
+                               'coverageStores', 'coverageStore',
+                               'workspaces', 'Coveragestore'),
+    'wmsstores': Resource('rest/workspaces/{0}/wmsstores', 'wmsStores',
+                          'wmsStore', 'workspaces', 'WMSstore'),
+    'wmtsstores': Resource('rest/workspaces/{0}/wmtsstores', 'wmtsStores',
+                           'wmtsStore', 'workspaces', 'WMTSstore'),
+    'featuretypes': Resource('rest/workspaces/{0}/datastores/{1}/featuretypes',
+                             'featureTypes', 'featureType', 'datastores',
+                             'Featuretype'),
+    'coverages': Resource('rest/workspaces/{0}/coveragestores/{1}/coverages',
+                          'coverages', 'coverage', 'coveragestores',
+                          'Coverage'),
+    'layers': Resource('rest/layers', 'layers', 'layer', name='Layer'),
+    'layergroups': Resource('rest/layergroups', 'layerGroups', 'layerGroup',
+                            name='Layergroup', delete_option=None),
+    'styles': Resource('rest/styles', 'styles', 'style', name='Style',
+                       delete_option='purge'),
+    # the featuretypes of all datastores of a workspace, only to list and
+    # get them (see featuretype.get_workspace_featuretypes), not in KINDS
+    'workspace_featuretypes': Resource('rest/workspaces/{0}/featuretypes',
+                                       'featureTypes', 'featureType',
+                                       'workspaces', 'Featuretype'),
+}
+# the types, every type after the type it is in
+KINDS = ('workspaces', 'datastores', 'coveragestores', 'wmsstores',
+         'wmtsstores', 'featuretypes', 'coverages', 'layers', 'layergroups',
+         'styles')
+STORE_KINDS = ('datastores', 'coveragestores', 'wmsstores', 'wmtsstores')
+# the types that older versions of geoserver do not have, their listing is
+# not found there
+OPTIONAL_KINDS = ('wmtsstores',)
+
+class ListingError(Exception):
+    """A listing could not be got from the geoserver. This is not the same
+    as an empty listing: the objects in it are unknown.
+    """
+
+    def __init__(self, kind, parents, status):
+        Exception.__init__(self, 'Could not get the {0} (status {1})'.format(
+                                    _describe(kind, parents), status))
+        self.kind = kind
+        self.parents = parents
+        self.status = status
+
+def as_list(value):
+    """Returns value as a list. Geoserver does not always put a single object
+    in a list, and leaves out an empty one.
+    """
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        return [value]
+    return value
+
+def children(kind):
+    """Returns a list with the types of object that are in objects of kind,
+    like ['featuretypes'] for 'datastores'.
+    """
+    return [k for k in KINDS if RESOURCES[k].parent == kind]
+
+def get_path(kind, parents, name=None):
+    """Returns the path of the listing of the type in the parents, or of the
+    object with name.
+    """
+    path = RESOURCES[kind].path.format(*parents)
+    if name is not None:
+        path += '/' + name
+    return path
+
+def _describe(kind, parents):
+    """Returns the type and parents of a listing for messages, like
+    datastores of "tiger".
+    """
+    if not parents:
+        return kind
+    return kind + ' of "' + ':'.join(parents) + '"'
+
+def get_list(kind, parents, u):
+    """Get an overview of all objects of the type in the parents.
+
+    Uses the util class to get the specifices on the server etc. Assumes the
+    parents exist.
+
+    Returns python dict with name of the objects as key and a dict as value.
+    This dict contains the href to the object. Returns None if there are no
+    objects. Raises ListingError when the listing failed.
+    """
+    resource = RESOURCES[kind]
+    stat, ds_request = u.request(method = 'GET',
+                                 path = get_path(kind, parents) + '.json',
+                                 payload = None,
+                                 mime = 'application/json')
+    if stat != 200:
+        logging.error('Could not get the ' + _describe(kind, parents))
+        raise ListingError(kind, parents, stat)
+    json_data = json.loads(ds_request)
+    if not json_data.get(resource.root):
+        return None
+    out = {}
+    for o in as_list(json_data.get(resource.root).get(resource.child)):
+        out[o.get('name')] = {'href': o.get('href')}
+    return out
+
+def iter_names(kind, parents, u):
+    """Iterate over the names of all objects of the type in the parents.
+
+    The listing is parsed while it is received, so it is never completely in
+    memory (see jsonstream.py).
+
+    Yields the name of every object. Raises ListingError when the listing
+    failed.
+    """
+    resource = RESOURCES[kind]
+    with u.stream(method = 'GET',
+                  path = get_path(kind, parents) + '.json',
+                  mime = 'application/json') as response:
+        if response.status != 200:
+            logging.error('Could not get the ' + _describe(kind, parents))
+            raise ListingError(kind, parents, response.status)
+        for o in jsonstream.iter_list(response, resource.root,
+                                      resource.child):
+            yield o.get('name')
+
+def _parent_exists(kind, parents, u):
+    """Check if the object the object is in exists, True for the objects at
+    the top.
+    """
+    parent = RESOURCES[kind].parent
+    if parent is None:
+        return True
+    return exists(parent, parents[:-1], parents[-1], u)
+
+def exists(kind, parents, name, u):
+    """Check if the object already exists in this geoserver configuration.
+
+    Only when the object is not found, its parent is checked to log why.
+
+    Returns True of False.
+    """
+    resource = RESOURCES[kind]
+    stat, ds_request = u.request(method = 'GET',
+                                 path = get_path(kind, parents, name) + \
+                                        '.json',
+                                 payload = None,
+                                 mime = 'application/json')
+    if stat != 200 and not _parent_exists(kind, parents, u):
+        logging.error(resource.name + ' cannot exist if ' + \
+                      RESOURCES[resource.parent].name.lower() + \
+                      ' doesn\'t exist.')
+    return stat == 200
+
+def get_info(kind, parents, name, u):
+    """Get information on the object
+
+    The parent is only checked when the object is not found, to tell which of
+    the two is missing.
+
+    Returns a dict with the info of the object, or a dict with only 'info'
+    with the reason when there is no info.
+    """
+    resource = RESOURCES[kind]
+    stat, ds_request = u.request(method = 'GET',
+                                 path = get_path(kind, parents, name) + \
+                                        '.json',
+                                 payload = None,
+                                 mime = 'application/json')
+    if stat != 200:
+        if not _parent_exists(kind, parents, u):
+            parent = RESOURCES[resource.parent].name
+            logging.error(parent + ' doesn\'t exist, so no info on ' + \
+                          resource.name.lower() + ' available.')
+            return {'info': 'No ' + parent.lower() + ', so no ' + \
+                            resource.name.lower() + ' info.'}
+        logging.error(resource.name + ': "' + name + '" does not' + \
+                      ' exist! Cannot get information.')
+        return {'info': resource.name + ' does not exist!'}
+
+    ds_info = json.loads(ds_request).get(resource.child)
+    return ds_info
+
+def create(kind, parents, info, u):
+    """Create a new object in the parents.
+
+    The info is a dict like get_info returns. Does not check if the object
+    already exists.
+
+    Returns True or False if succesful.
+    """
+    resource = RESOURCES[kind]
+    logging.info('Creating ' + resource.name.lower() + ' "' + \
+                 info.get('name') + '"')
+    payload = json.dumps({resource.child: info})
+
+    stat, ds_request = u.request(method = 'POST',
+                                 path = get_path(kind, parents),
+                                 payload = payload,
+                                 mime = 'application/json')
+    return stat == 201
+
+def update(kind, parents, name, info, u):
+    """Change the settings of an existing object.
+
+    The info is a dict like get_info returns.
+
+    Returns True or False if succesful.
+    """
+    resource = RESOURCES[kind]
+    logging.info('Updating ' + resource.name.lower() + ' "' + name + '"')
+    payload = json.dumps({resource.child: info})
+
+    stat, ds_request = u.request(method = 'PUT',
+                                 path = get_path(kind, parents, name),
+                                 payload = payload,
+                                 mime = 'application/json')
+    return stat == 200
+
+def delete(kind, parents, name, u, option=False):
+    """Delete the object.
+
+    With option, the delete option of the type is set: recurse deletes
+    everything in the object too, purge deletes the file of a style. Does not
+    check if the object exists.
+
+    Returns True or False if succesful.
+    """
+    resource = RESOURCES[kind]
+    logging.info('Deleting ' + resource.name.lower() + ' "' + name + '"')
+    path = get_path(kind, parents, name)
+    if option and resource.delete_option:
+        path += '?' + resource.delete_option + '=true'
+    stat, ds_request = u.request(method = 'DELETE',
+                                 path = path,
+                                 payload = None,
+                                 mime = 'text/xml')
+    return stat == 200
+
+def delete_all(kind, parents, u, option=False):
+    """Delete all objects of the type in the parents, one after another.
+
+    To delete many objects concurrently and in the order of their
+    dependencies, see bulkdelete.py.
+
+    Returns python dict with the name of every object as key and True or
+    False if it was deleted as value.
+    """
+    return dict((name, delete(kind, parents, name, u, option))
+                for name in sorted(get_list(kind, parents, u) or {}))
+
+def main():
+    config = Util()
+    print get_list('datastores', ('tiger',), config)
+    print exists('featuretypes', ('tiger', 'nyc'), 'giant_polygon', config)
+    print get_info('layers', (), 'tasmania_roads', config)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+"""This file restores an export of a geoserver (see get_all_from_geoserver.py)
+on another geoserver, for example to copy the configuration from development
+to testing to production.
+
+The objects in the export depend on each other: stores live in a workspace,
+featuretypes and coverages in a store, layers need their featuretype or
+coverage and styles and layergroups need their layers. So the export is
+restored level by level:
+
+    workspaces -> stores -> featuretypes and coverages -> styles -> layers ->
+    layergroups
+
+A layergroup in another layergroup gets a level before that layergroup. All
+objects of one level are created concurrently by a pool of worker threads.
+When an object could not be created, the objects that depend on it are
+skipped. This class uses the utility class Util (see util.py) to read the
+configuration and the enable general functionality. Make sure there is a valid
+configuration file for the target geoserver.
+
+Example:
+    >>> config = Util('target.cfg')
+    >>> gs = json.load(open('geoserver_config.json'))
+    >>> restorer = Restorer(config, workers=8)
+    >>> for kind, key, result in restorer.restore(gs):
+    ...     print kind, key, result
+    >>> restorer.close()
+"""
+import json
+import logging
+import os
+from multiprocessing.pool import ThreadPool
+
+import workspace
+import styles
+import rest
+from rest import STORE_KINDS
+from util import Util
+
+CREATED = 'created'
+EXISTS = 'exists'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+# keys in the exported info that are not settings of the object itself, but
+# its children or links to its parent
+NOT_SETTINGS = {
+    'workspaces': ('datastores', 'coveragestores', 'wmsstores', 'wmtsstores'),
+    'datastores': ('featuretypes', 'featureTypes', 'workspace'),
+    'featuretypes': ('store', 'namespace'),
+    'coveragestores': ('coverages', 'workspace'),
+    'coverages': ('store', 'namespace'),
+    'wmsstores': ('workspace',),
+    'wmtsstores': ('workspace',),
+    'styles': (),
+    'layers': (),
+    'layergroups': (),
+}
+
+class Restorer:
+    """Create the objects of an export on a geoserver with a number of worker
+    threads.
+    """
+
+    def __init__(self, u, workers=None, sld_directory='.'):
+        """Initialise the restorer
+
+        Keyword arguments:
+        u -- the Util instance of the target geoserver
+        workers -- number of worker threads, defaults to the size of the
+                   connection pool of u
+        sld_directory -- the directory with the SLD files of the export
+        """
+        self._u = u
+        if workers is None:
+            workers = u.pool_size
+        self._pool = ThreadPool(workers)
+        self._sld_directory = sld_directory
+        # keys of the objects that are not on the target geoserver
+        self._missing = set()
+        # key of the resource of every layer
+        self._resources = {}
+        logging.info('Initialised restorer with {0} workers'.format(workers))
+
+    def restore(self, gs):
+        """Restore the export on the geoserver.
+
+        Keyword arguments:
+        gs -- the export as python dict, like geoserver_config.json
+
+        Returns a list with a tuple (kind, key, result) for every object. The
+        result is one of CREATED, EXISTS, FAILED or SKIPPED.
+        """
+        results = []
+        for level in (self._workspace_tasks,
+                      self._store_tasks,
+                      self._resource_tasks,
+                      self._style_tasks,
+                      self._layer_tasks):
+            tasks = level(gs)
+            logging.info('Restoring {0} objects'.format(len(tasks)))
+            results.extend(self._run(tasks))
+            if level == self._workspace_tasks:
+                self._set_default_workspace(gs)
+        for tasks in _layergroup_levels(self._layergroup_tasks(gs)):
+            logging.info('Restoring {0} layergroups'.format(len(tasks)))
+            results.extend(self._run(tasks))
+        return results
+
+    def _run(self, tasks):
+        """Run the tasks of a level concurrently.
+
+        Every task is a tuple (kind, key, parents, create, exists) with create
+        and exists functions that take a Util instance. A task is skipped if
+        one of its parents is missing.
+
+        Returns a list of tuples (kind, key, result).
+        """
+        todo = []
+        results = []
+        for task in tasks:
+            kind, key, parents, create, exists = task
+            if create is None or any(p in self._missing for p in parents):
+                results.append((kind, key, SKIPPED))
+            else:
+                todo.append(task)
+        u = self._u
+        results.extend(self._pool.map(lambda task: _run_task(task, u), todo))
+        for kind, key, result in results:
+            if result in (FAILED, SKIPPED):
+                logging.error('Could not restore {0} {1}: {2}'.format(
+                                    kind, key, result))
+                self._missing.add(key)
+        return results
+
+    def _set_default_workspace(self, gs):
+        """Make the default workspace of the export the default one."""
+        for w, info in gs.get('workspaces', {}).items():
+            if info.get('default') and ('workspaces', w) not in self._missing:
+                workspace.make_workspace_default(w, self._u)
+
+    def _workspace_tasks(self, gs):
+        tasks = []
+        for w in sorted(gs.get('workspaces', {})):
+            tasks.append(_task('workspaces', (), w, {'name': w}))
+        return tasks
+
+    def _store_tasks(self, gs):
+        tasks = []
+        for w, ws in sorted(gs.get('workspaces', {}).items()):
+            for kind in STORE_KINDS:
+                for s, info in sorted((ws.get(kind) or {}).items()):
+                    info = clean_info(kind, info)
+                    tasks.append(_task(kind, (w,), s, info))
+        return tasks
+
+    def _resource_tasks(self, gs):
+        tasks = []
+        for w, ws in sorted(gs.get('workspaces', {}).items()):
+            for store_kind in STORE_KINDS:
+                for kind in rest.children(store_kind):
+                    for s, store in sorted((ws.get(store_kind) or {}).items()):
+                        for r, info in sorted((store.get(kind) or {}).items()):
+                            self._resources[w + ':' + r] = (kind, w, s, r)
+                            info = clean_info(kind, info)
+                            tasks.append(_task(kind, (w, s), r, info))
+        return tasks
+
+    def _style_tasks(self, gs):
+        tasks = []
+        for s, info in sorted(gs.get('styles', {}).items()):
+            create = None
+            if clean_info('styles', info):
+                create = lambda u, s=s, info=info: \
+                                create_style(s, info['filename'],
+                                             self._sld_directory, u)
+            tasks.append(('style', ('styles', s), [], create,
+                          lambda u, s=s: rest.exists('styles', (), s, u)))
+        return tasks
+
+    def _layer_tasks(self, gs):
+        tasks = []
+        for l, info in sorted(gs.get('layers', {}).items()):
+            info = clean_info('layers', info)
+            parents = []
+            if info:
+                resource = (info.get('resource') or {}).get('name')
+                if resource in self._resources:
+                    parents.append(self._resources[resource])
+                style = (info.get('defaultStyle') or {}).get('name')
+                if style in gs.get('styles', {}):
+                    parents.append(('styles', style))
+            # the layer itself is created with its resource, so an existing
+            # layer is not enough when the update fails
+            tasks.append(('layer', ('layers', l), parents,
+                          info and (lambda u, l=l, info=info:
+                                    rest.update('layers', (), l, info, u)),
+                          None))
+        return tasks
+
+    def _layergroup_tasks(self, gs):
+        tasks = []
+        for g, info in sorted(gs.get('layergroups', {}).items()):
+            info = clean_info('layergroups', info)
+            parents = []
+            if info:
+                for p in rest.as_list((info.get('publishables') or {})
+                                      .get('published')):
+                    if p.get('@type') == 'layerGroup':
+                        parents.append(('layergroups', p.get('name')))
+                    else:
+                        parents.append(('layers', p.get('name')))
+            tasks.append(_task('layergroups', (), g, info, parents))
+        return tasks
+
+    def close(self):
+        """Stop the worker threads."""
+        self._pool.close()
+        self._pool.join()
+
+def _layergroup_levels(tasks):
+    """Split the layergroup tasks into levels, layergroups in other
+    layergroups get a level before those layergroups.
+    """
+    levels = []
+    while tasks:
+        keys = set(task[1] for task in tasks)
+        # the layergroups without a layergroup in them that still has to be
+        # created
+        first = [task for task in tasks
+                 if not keys.intersection(task[2])]
+        if not first:
+            # a cycle, try the rest at once
+            first = tasks
+        levels.append(first)
+        done = set(task[1] for task in first)
+        tasks = [task for task in tasks if task[1] not in done]
+    return levels
+
+def _task(kind, parents, name, info, dependencies=None):
+    """Make the task to create an object in its parents.
+
+    Keyword arguments:
+    kind -- the type of the object
+    parents -- the names of the objects it is in
+    name -- the name of the object
+    info -- the payload to create the object with, see clean_info
+    dependencies -- the keys of the objects it needs, default its parent
+
+    Returns a tuple (kind, key, parents, create, exists) for _run, create is
+    None without info.
+    """
+    key = (kind,) + parents + (name,)
+    if dependencies is None:
+        dependencies = []
+        if parents:
+            dependencies.append((rest.RESOURCES[kind].parent,) + parents)
+    return (kind[:-1], key, dependencies,
+            info and (lambda u: rest.create(kind, parents, info, u)),
+            lambda u: rest.exists(kind, parents, name, u))
+
+def _run_task(task, u):
+    """Create the object of the task. When that fails, check if it already
+    exists.
+
+    Returns a tuple (kind, key, result).
+    """
+    kind, key, parents, create, exists = task
+    if create(u):
+        return kind, key, CREATED
+    if exists is not None and exists(u):
+        return kind, key, EXISTS
+    return kind, key, FAILED
+
+def create_style(stylename, sld_filename, sld_directory, u):
+    """Create the style and upload its SLD from the export.
+
+    Keyword arguments:
+    stylename -- the name of the style
+    sld_filename -- the filename of the SLD in the style info
+    sld_directory -- the directory with the SLD files of the export
+    u -- the Util instance of the target geoserver
+
+    Returns True or False if succesful.
+    """
+    filename = os.path.join(sld_directory, sld_filename)
+    try:
+        with open(filename) as f:
+            sld = f.read()
+    except IOError:
+        logging.error('Could not read SLD file "' + filename + '"')
+        return False
+    if not styles.create_style(stylename, sld_filename, u):
+        return False
+    return styles.upload_sld(stylename, sld, u)
+
+def clean_info(kind, info):
+    """Make a payload of exported object info.
+
+    Removes the NOT_SETTINGS of the kind and all links (href) to other
+    objects, the target geoserver derives those from the path. Returns None if
+    info is not the info of an object, but a message that it did not exist.
+    """
+    if not info or info.keys() == ['info']:
+        return None
+    return dict((k, _strip_hrefs(v)) for k, v in info.items()
+                if k not in NOT_SETTINGS[kind])
+
+def _strip_hrefs(value):
+    """Remove all href keys from nested dicts and lists."""
+    if isinstance(value, dict):
+        return dict((k, _strip_hrefs(v)) for k, v in value.items()
+                    if k != 'href')
+    if isinstance(value, list):
+        return [_strip_hrefs(v) for v in value]
+    return value
+
+def main():
+    config = Util()
+    with open('geoserver_config.json') as f:
+        gs = json.load(f)
+    restorer = Restorer(config)
+    for kind, key, result in restorer.restore(gs):
+        print kind, key, result
+    restorer.close()
+
+if __name__ == '__main__':
+    main()
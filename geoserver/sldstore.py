@@ -0,0 +1,181 @@
+"""This file keeps the SLD files of the styles in a content addressed store.
+Every SLD is stored once as a blob named after the sha1 hash of its content,
+an index maps the name of every style to the hash of its SLD. Styles with the
+same SLD share a single blob.
+
+The filename of the style in the export (see get_all_from_geoserver.py) is a
+hard link to the blob, so the SLD files are where restore.py expects them
+without taking extra space. The SLDs are not downloaded again when the info of
+the style has not changed since the last download and it has a modification
+date (dateModified), geoserver updates that date when the SLD changes.
+
+Example:
+    >>> store = SldStore('slds')
+    >>> if not store.is_current('roads', info):
+    ...     store.put('roads', styles.get_sld('roads', config), info)
+    >>> store.link('roads', info['filename'])
+    >>> store.save()
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+
+class SldStore:
+    """Content addressed store of SLD files."""
+
+    def __init__(self, directory='slds'):
+        """Open the store, the directory is created when it doesn't exist
+
+        Keyword arguments:
+        directory -- the directory of the store
+        """
+        self._directory = directory
+        self._blobs = os.path.join(directory, 'blobs')
+        self._index_file = os.path.join(directory, 'index.json')
+        self._lock = threading.Lock()
+        if not os.path.isdir(self._blobs):
+            os.makedirs(self._blobs)
+        self._index = {}
+        if os.path.exists(self._index_file):
+            with open(self._index_file) as f:
+                self._index = json.load(f)
+
+    def _blob(self, digest):
+        return os.path.join(self._blobs, digest + '.sld')
+
+    def get_hash(self, stylename):
+        """Returns the hash of the SLD of the style or None if it is not in
+        the store.
+        """
+        entry = self._index.get(stylename)
+        return entry and entry['hash']
+
+    def get_path(self, stylename):
+        """Returns the filename of the blob with the SLD of the style or None
+        if it is not in the store.
+        """
+        digest = self.get_hash(stylename)
+        return digest and self._blob(digest)
+
+    def is_current(self, stylename, info):
+        """Check if the SLD in the store is that of the style with this info.
+
+        Only styles with a modification date can be checked, for other styles
+        it is not known whether their SLD has changed.
+
+        Returns True or False.
+        """
+        entry = self._index.get(stylename)
+        if entry is None or not (info or {}).get('dateModified'):
+            return False
+        return (entry.get('info') == _info_hash(info)
+                and os.path.exists(self._blob(entry['hash'])))
+
+    def put(self, stylename, sld, info=None):
+        """Put the SLD of a style in the store. The blob is only written when
+        there is no blob with the same content yet.
+
+        Keyword arguments:
+        stylename -- the name of the style
+        sld -- the SLD as text
+        info -- the style info the SLD belongs to, see is_current
+
+        Returns the hash of the SLD.
+        """
+        digest = hashlib.sha1(sld).hexdigest()
+        blob = self._blob(digest)
+        if not os.path.exists(blob):
+            tmp = '{0}.{1}.tmp'.format(blob, threading.current_thread().ident)
+            with open(tmp, 'wb') as f:
+                f.write(sld)
+            os.rename(tmp, blob)
+        with self._lock:
+            self._index[stylename] = {'hash': digest,
+                                      'info': _info_hash(info)}
+        return digest
+
+    def new_file(self):
+        """Returns a filename in the store to download an SLD to, for
+        put_file.
+        """
+        return os.path.join(self._directory, '{0}.download'.format(
+                                threading.current_thread().ident))
+
+    def put_file(self, stylename, filename, info=None):
+        """Put the SLD of a style in the store from a file in the store (see
+        new_file). The file is moved to the blob, or removed when there is a
+        blob with the same content already.
+
+        Returns the hash of the SLD.
+        """
+        sha1 = hashlib.sha1()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), ''):
+                sha1.update(chunk)
+        digest = sha1.hexdigest()
+        blob = self._blob(digest)
+        if os.path.exists(blob):
+            os.remove(filename)
+        else:
+            os.rename(filename, blob)
+        with self._lock:
+            self._index[stylename] = {'hash': digest,
+                                      'info': _info_hash(info)}
+        return digest
+
+    def link(self, stylename, filename):
+        """Make filename a hard link to the blob of the style, or a copy where
+        hard links are not possible.
+
+        Returns True or False if succesful.
+        """
+        blob = self.get_path(stylename)
+        if blob is None or not os.path.exists(blob):
+            return False
+        if os.path.exists(filename):
+            if os.path.samefile(filename, blob):
+                return True
+            os.remove(filename)
+        try:
+            os.link(blob, filename)
+        except (OSError, AttributeError):
+            shutil.copyfile(blob, filename)
+        return True
+
+    def prune(self, stylenames):
+        """Remove the styles that are not in stylenames from the index and
+        delete the blobs that are no longer used.
+
+        Returns the number of deleted blobs.
+        """
+        with self._lock:
+            for name in set(self._index) - set(stylenames):
+                del self._index[name]
+            used = set(entry['hash'] + '.sld'
+                       for entry in self._index.values())
+        removed = 0
+        for blob in os.listdir(self._blobs):
+            if blob.endswith('.sld') and blob not in used:
+                os.remove(os.path.join(self._blobs, blob))
+                removed += 1
+        return removed
+
+    def save(self):
+        """Write the index to disk."""
+        with self._lock:
+            tmp = self._index_file + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self._index, f, sort_keys=True)
+            os.rename(tmp, self._index_file)
+        logging.info('Stored {0} styles in {1} SLD files'.format(
+                    len(self._index),
+                    len(set(e['hash'] for e in self._index.values()))))
+
+def _info_hash(info):
+    """Returns the hash of the style info, or None without info."""
+    if info is None:
+        return None
+    return hashlib.sha1(json.dumps(info, sort_keys=True)).hexdigest()
@@ -12,8 +12,8 @@ Example:
     >>> print style_exists(stylename, config)
     >>> print get_style_info(config)
 """
-import json
 import logging
+import rest
 from util import Util
 
 def get_styles(u):
@@ -24,19 +24,17 @@ def get_styles(u):
     Returns python dict with name of the datastores as key and a dict as
     value. This dict contains the href to the style..
     """
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/styles.json',
-                           payload = None,
-                           mime = 'application/json')
-    json_data = json.loads(ds_request)
-    if json_data.get('styles') == '':
-        return None
-    styles = json_data.get('styles').get('style')
-
-    out = {}
-    for style in styles:
-        out[style.get('name')] = {'href': style.get('href')}
-    return out
+    return rest.get_list('styles', (), u)
+
+def iter_style_names(u):
+    """Iterate over the names of all styles.
+
+    The listing is parsed while it is received, so it is never completely in
+    memory (see jsonstream.py).
+
+    Yields the name of every style.
+    """
+    return rest.iter_names('styles', (), u)
 
 def style_exists(stylename, u):
     """Check if style already exists in this geoserver
@@ -44,53 +42,103 @@ def style_exists(stylename, u):
 
     Returns True of False.
     """
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/styles/' + \
-                                  stylename + '.json',
-                           payload = None,
-                           mime = 'application/json')
-    return stat == 200
+    return rest.exists('styles', (), stylename, u)
 
 def get_style_info(stylename, u):
     """Get information on the style
 
     Returns a dict with the style info.
     """
-    stat, ds_request = u.request(method = 'GET',
-                                 path = 'rest/styles/' + \
-                                        stylename + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    if stat != 200:
-        logging.error('Style: "' + stylename + '" does not' + \
-                      ' exist! Cannot get information.')
-        return {'info': 'Style does not exist!'}
+    return rest.get_info('styles', (), stylename, u)
 
-    ds_info = json.loads(ds_request).get('style')
-    return ds_info
+def create_style(stylename, filename, u):
+    """Create a new style without a SLD, upload the SLD with upload_sld.
 
-#TODO
-#def create_style(stylename, u):
+    Does not check if the style already exists.
 
-#TODO
-#def delete_style(stylename, u):
+    Returns True or False if succesful.
+    """
+    return rest.create('styles', (),
+                       {'name': stylename, 'filename': filename}, u)
+
+def update_style(stylename, style_info, u):
+    """Change the settings of an existing style, use upload_sld to change the
+    SLD.
+
+    The style_info is a dict like get_style_info returns.
+
+    Returns True or False if succesful.
+    """
+    return rest.update('styles', (), stylename, style_info, u)
+
+def delete_style(stylename, u, purge=False):
+    """Delete the style.
+
+    With purge, the SLD file is removed from the geoserver data directory too.
+    Does not check if the style exists or is still used by a layer.
+
+    Returns True or False if succesful.
+    """
+    return rest.delete('styles', (), stylename, u, purge)
+
+def delete_all_styles(u, purge=False):
+    """Delete all styles, one after another.
+
+    Geoserver refuses to delete a style that is still used by a layer. With
+    purge, the SLD files are removed too.
+
+    Returns python dict with the name of every style as key and True or False
+    if it was deleted as value.
+    """
+    return rest.delete_all('styles', (), u, purge)
 
-#TODO
-#def delete_all_styles(u):
 
 def get_sld(stylename, u):
-    if not(style_exists(stylename, u)):
-        logging.error('Style does not exist, cannot get SLD!')
-        return
+    """Get the SLD of the style.
+
+    The SLD is requested directly, a 404 means the style does not exist.
 
+    Returns the SLD as text or None if it could not be retrieved.
+    """
     stat, req = u.request(method = 'GET', path = 'rest/styles/' + stylename + '.sld')
+    if stat == 404:
+        logging.error('Style does not exist, cannot get SLD!')
+        return
     if stat != 200:
         logging.error('Something went wrong getting the SLD:' + stylename)
         return
     return req
 
-#TODO
-#def upload_sld():
+def download_sld(stylename, filename, u):
+    """Download the SLD of the style to a file.
+
+    The SLD is written to the file while it is received, so large SLDs (with
+    embedded graphics) are not kept in memory. A 404 means the style does not
+    exist.
+
+    Returns True or False if succesful.
+    """
+    stat = u.download(path = 'rest/styles/' + stylename + '.sld',
+                      filename = filename,
+                      mime = 'application/vnd.ogc.sld+xml')
+    if stat == 404:
+        logging.error('Style does not exist, cannot get SLD!')
+        return False
+    if stat != 200:
+        logging.error('Something went wrong getting the SLD:' + stylename)
+        return False
+    return True
+
+def upload_sld(stylename, sld, u):
+    """Upload the SLD of an existing style.
+
+    Returns True or False if succesful.
+    """
+    stat, req = u.request(method = 'PUT',
+                          path = 'rest/styles/' + stylename,
+                          payload = sld,
+                          mime = 'application/vnd.ogc.sld+xml')
+    return stat == 200
 
 #TODO
 #def set_style_as_default(stylenam, u):
@@ -0,0 +1,201 @@
+"""This file compares the catalogs of two geoservers and makes a plan with the
+changes that make the target equal to the source. Applying the plan costs one
+request per change, instead of deleting and recreating everything.
+
+The catalogs are python dicts like geoserver_config.json, either crawled from
+a geoserver (see crawler.py) or read from an export. The objects are compared
+on their settings, without the links (href) to other objects and the dates
+geoserver keeps itself. The SLD of a style is not compared, only its info.
+
+The plan is a list of operations (method, kind, key, info):
+    POST -- create an object that is only in the source
+    PUT -- change an object of which the settings differ
+    DELETE -- delete an object that is only in the target, with everything in
+              it, so the objects in it are not deleted separately
+Objects are created parents first and deleted children first. Styles are
+deleted last, after the layers that use them are gone.
+
+Example:
+    >>> source = Util('development.cfg')
+    >>> target = Util('production.cfg')
+    >>> plan = make_plan(Crawler(source).crawl(), Crawler(target).crawl())
+    >>> print_plan(plan)
+    >>> for operation, ok in apply_plan(plan, target):
+    ...     print operation[:3], ok
+"""
+import logging
+
+import workspace
+import rest
+import restore
+from crawler import Crawler
+from util import Util
+
+CREATE = 'POST'
+UPDATE = 'PUT'
+DELETE = 'DELETE'
+
+# the kinds in the order they have to be created
+LEVELS = ('workspaces', 'datastores', 'coveragestores', 'wmsstores',
+          'wmtsstores', 'featuretypes', 'coverages', 'styles', 'layers',
+          'layergroups')
+# the kinds in the order they have to be deleted: the reverse, but styles
+# last, as geoserver refuses to delete a style that a layer still uses and
+# the layers can be deleted with their workspace, store or resource
+DELETE_LEVELS = ('layergroups', 'layers', 'coverages', 'featuretypes',
+                 'wmtsstores', 'wmsstores', 'coveragestores', 'datastores',
+                 'workspaces', 'styles')
+
+# settings geoserver maintains itself, they differ between servers
+IGNORED_SETTINGS = ('dateCreated', 'dateModified')
+
+def flatten(gs):
+    """Make a flat dict of all objects in a catalog.
+
+    Returns python dict with the key of the object as key and the settings of
+    the object (see restore.clean_info) as value. The key is a tuple of the
+    kind and the names of the object and its parents, for example
+    ('featuretypes', workspace, datastore, featuretype).
+    """
+    objects = {}
+    def add(key, info):
+        info = restore.clean_info(key[0], info)
+        if info is not None:
+            for setting in IGNORED_SETTINGS:
+                info.pop(setting, None)
+            objects[key] = info
+
+    for w, ws in gs.get('workspaces', {}).items():
+        add(('workspaces', w), ws)
+        for store_kind in rest.STORE_KINDS:
+            for s, store in (ws.get(store_kind) or {}).items():
+                add((store_kind, w, s), store)
+                for kind in rest.children(store_kind):
+                    for r, resource in (store.get(kind) or {}).items():
+                        add((kind, w, s, r), resource)
+    for kind in ('styles', 'layers', 'layergroups'):
+        for name, info in gs.get(kind, {}).items():
+            add((kind, name), info)
+    return objects
+
+def make_plan(source, target):
+    """Make the plan to change the target catalog into the source catalog.
+
+    Keyword arguments:
+    source -- the catalog as it should be
+    target -- the catalog as it is
+
+    Returns the list of operations (method, kind, key, info).
+    """
+    source = flatten(source)
+    target = flatten(target)
+    plan = []
+
+    for kind in LEVELS:
+        for key in sorted(k for k in source if k[0] == kind):
+            info = source[key]
+            if key not in target:
+                if kind == 'layers':
+                    # geoserver creates the layer with its resource, only the
+                    # settings of it have to be put
+                    plan.append((UPDATE, kind, key, info))
+                    continue
+                plan.append((CREATE, kind, key, info))
+                if kind == 'workspaces' and info.get('default'):
+                    plan.append((UPDATE, kind, key, info))
+            elif info != target[key]:
+                if kind == 'workspaces' and not info.get('default'):
+                    # the only setting of a workspace, another workspace
+                    # takes it over
+                    continue
+                plan.append((UPDATE, kind, key, info))
+
+    gone = set(k for k in target if k not in source)
+    gone_resources = set(k[1] + ':' + k[3] for k in gone
+                         if k[0] in ('featuretypes', 'coverages'))
+    for kind in DELETE_LEVELS:
+        for key in sorted(k for k in gone if k[0] == kind):
+            if kind == 'layers':
+                resource = (target[key].get('resource') or {}).get('name')
+                if resource in gone_resources:
+                    # deleted with its featuretype
+                    continue
+            if _parent(key) in gone:
+                # deleted with its parent
+                continue
+            plan.append((DELETE, kind, key, None))
+    logging.info('Planned {0} changes'.format(len(plan)))
+    return plan
+
+def _parent(key):
+    """Returns the key of the parent of a store, featuretype or coverage, or
+    None.
+    """
+    parent = rest.RESOURCES[key[0]].parent
+    if parent is None:
+        return None
+    return (parent,) + key[1:-1]
+
+def apply_plan(plan, u, sld_directory='.'):
+    """Apply the plan to the target geoserver, one operation at a time.
+
+    Keyword arguments:
+    plan -- the list of operations of make_plan
+    u -- the Util instance of the target geoserver
+    sld_directory -- the directory with the SLD files of the source, used for
+                     new styles
+
+    Returns a list of tuples (operation, True or False if succesful).
+    """
+    results = []
+    for operation in plan:
+        ok = _apply(operation, u, sld_directory)
+        if not ok:
+            logging.error('Failed to apply: {0} {1}'.format(operation[0],
+                                                            operation[2]))
+        results.append((operation, ok))
+    return results
+
+def _apply(operation, u, sld_directory):
+    """Send the request of a single operation.
+
+    Returns True or False if succesful.
+    """
+    method, kind, key, info = operation
+    parents, name = key[1:-1], key[-1]
+    if method == CREATE:
+        if kind == 'workspaces':
+            # the default setting is not accepted on creation
+            return rest.create(kind, parents, {'name': name}, u)
+        if kind == 'styles':
+            return restore.create_style(name, info['filename'],
+                                        sld_directory, u)
+        if kind == 'layers':
+            # geoserver creates the layer with its resource, only the
+            # settings of it have to be put, like make_plan does
+            return rest.update(kind, parents, name, info, u)
+        return rest.create(kind, parents, info, u)
+    if method == UPDATE:
+        if kind == 'workspaces':
+            return workspace.make_workspace_default(name, u)
+        return rest.update(kind, parents, name, info, u)
+    if method == DELETE:
+        # delete everything in it too, but not the resource of a layer or
+        # the SLD of a style
+        return rest.delete(kind, parents, name, u,
+                           kind not in ('layers', 'styles'))
+    raise ValueError('Unknown operation: {0} {1}'.format(method, kind))
+
+def print_plan(plan):
+    """Print the plan, one operation per line."""
+    for method, kind, key, info in plan:
+        print '{0:7} {1:14} {2}'.format(method, kind, '/'.join(key[1:]))
+
+def main():
+    source = Util('source.cfg')
+    target = Util('target.cfg')
+    plan = make_plan(Crawler(source).crawl(), Crawler(target).crawl())
+    print_plan(plan)
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,551 @@
+import atexit
 import ConfigParser
+import errno
+import hashlib
 import httplib
+import json
 import logging
+import os
+import Queue
+import random
+import socket
+import sys
+import threading
+import time
 
 from base64 import b64encode
+from collections import OrderedDict
+
+class ConnectionPool:
+    """Bounded pool of persistent HTTP/1.1 connections to a single server.
+
+    Connections are handed out with get() and given back with put() once the
+    response has been read completely, so they can be reused for the next
+    request. At most `size` connections are open at the same time; get()
+    blocks until one becomes available.
+    """
+
+    def __init__(self, host, port, size=4):
+        """Initialise the pool
+
+        Keyword arguments:
+        host -- the host to connect to
+        port -- the port to connect to
+        size -- maximum number of connections
+        """
+        self._host = host
+        self._port = port
+        self._pool = Queue.LifoQueue(size)
+        for _ in range(size):
+            self._pool.put(None)
+
+    def new_connection(self):
+        """Open a fresh connection to the server."""
+        return httplib.HTTPConnection(self._host, self._port)
+
+    def get(self):
+        """Get a connection from the pool.
+
+        Returns:
+            connection, True if the connection was used before
+        """
+        connection = self._pool.get()
+        if connection is None:
+            return self.new_connection(), False
+        return connection, True
+
+    def put(self, connection):
+        """Give a connection back to the pool to be reused."""
+        self._pool.put(connection)
+
+    def discard(self, connection):
+        """Close a connection that can not be reused and free its slot."""
+        connection.close()
+        self._pool.put(None)
+
+    def close(self):
+        """Close all idle connections in the pool."""
+        connections = []
+        while True:
+            try:
+                connections.append(self._pool.get_nowait())
+            except Queue.Empty:
+                break
+        for connection in connections:
+            if connection is not None:
+                connection.close()
+            self._pool.put(None)
+
+class ResponseCache:
+    """In-memory cache for responses on GET-requests.
+
+    Entries expire after `ttl` seconds. When more than `max_entries` are
+    stored, the least recently used entry is removed. A write to a path
+    invalidates all entries on that path, on the paths below it and on the
+    paths above it (e.g. the listings that contain it).
+    """
+
+    def __init__(self, ttl=300, max_entries=1000):
+        """Initialise the cache
+
+        Keyword arguments:
+        ttl -- number of seconds an entry stays valid
+        max_entries -- maximum number of entries to keep
+        """
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, method, path, mime):
+        """Get a cached response.
+
+        Returns:
+            HTTP statuscode, response as text or None if not cached
+        """
+        key = (method.upper(), path, mime)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            expires, response = entry
+            if expires < time.time():
+                return None
+            self._entries[key] = entry
+            return response
+
+    def put(self, method, path, mime, response):
+        """Store a response (statuscode, text) in the cache."""
+        key = (method.upper(), path, mime)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self._ttl, response)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path):
+        """Remove all entries with a path that starts with path or a path
+        that path starts with.
+        """
+        prefix = _path_stem(path)
+        with self._lock:
+            for key in self._entries.keys():
+                stem = _path_stem(key[1])
+                if _is_below(stem, prefix) or _is_below(prefix, stem):
+                    del self._entries[key]
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+def _path_stem(path):
+    """Strip the query and the extension (.json, .xml, .sld) of a path."""
+    path = path.split('?')[0]
+    for ext in ('.json', '.xml', '.sld'):
+        if path.endswith(ext):
+            return path[:-len(ext)]
+    return path
+
+def _is_below(path, parent):
+    """Check if path is equal to parent or a path below it."""
+    return path == parent or path.startswith(parent + '/')
+
+class ValidatorStore:
+    """On-disk store for the validators (ETag and Last-Modified) and bodies
+    of GET-responses.
+
+    For every path two files are kept in the directory: <key>.json with the
+    validators and <key>.body with the response. The validators are sent
+    with the next request on that path, so the server can answer with
+    '304 Not Modified' instead of sending the same response again.
+
+    The key includes the server, so the Utils of several servers (a source
+    and a target, or the nodes of a cluster) can share a directory without
+    getting the responses of another server.
+    """
+
+    def __init__(self, directory, server=''):
+        """Initialise the store
+
+        Keyword arguments:
+        directory -- the directory to keep the files in, created if needed
+        server -- the server the responses are from, like
+                  localhost:8080/geoserver
+        """
+        self._directory = directory
+        self._server = server
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            # another Util may have created it in the meantime
+            if e.errno != errno.EEXIST or not os.path.isdir(directory):
+                raise
+
+    def _filename(self, path, mime, ext):
+        key = hashlib.sha1('{0}\n{1}\n{2}'.format(self._server, path,
+                                                   mime)).hexdigest()
+        return os.path.join(self._directory, key + ext)
+
+    def get(self, path, mime):
+        """Get the validators of the stored response for path.
+
+        Returns dict with etag and last_modified or None if not stored.
+        """
+        try:
+            with open(self._filename(path, mime, '.json')) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def get_body(self, path, mime):
+        """Get the stored response for path.
+
+        Returns the response as text or None if not stored.
+        """
+        try:
+            with open(self._filename(path, mime, '.body'), 'rb') as f:
+                return f.read()
+        except IOError:
+            return None
+
+    def put(self, path, mime, etag, last_modified, body):
+        """Store the validators and the response for path."""
+        validators = {'server': self._server,
+                      'path': path,
+                      'etag': etag,
+                      'last_modified': last_modified}
+        for ext, data, mode in (('.body', body, 'wb'),
+                                ('.json', json.dumps(validators), 'w')):
+            filename = self._filename(path, mime, ext)
+            # write to a temporary file first, so a reader never sees half a
+            # file
+            tmp = '{0}.{1}.tmp'.format(filename,
+                                       threading.current_thread().ident)
+            with open(tmp, mode) as f:
+                f.write(data)
+            os.rename(tmp, filename)
+
+# placeholder for the names in the collections of the endpoint templates
+PLACEHOLDERS = {
+    'workspaces': '{ws}',
+    'datastores': '{ds}',
+    'featuretypes': '{ft}',
+    'coveragestores': '{cs}',
+    'coverages': '{cov}',
+    'wmsstores': '{wms}',
+    'wmtsstores': '{wmts}',
+    'layers': '{layer}',
+    'layergroups': '{lg}',
+    'styles': '{style}',
+}
+
+def endpoint_template(path):
+    """Replace the names of the objects in a REST path by placeholders, e.g.
+    rest/workspaces/tiger/datastores/nyc.json becomes
+    rest/workspaces/{ws}/datastores/{ds}.json
+    """
+    path = path.split('?')[0]
+    ext = ''
+    for extension in ('.json', '.xml', '.sld'):
+        if path.endswith(extension):
+            path, ext = path[:-len(extension)], extension
+    parts = path.split('/')
+    for i in range(2, len(parts), 2):
+        parts[i] = PLACEHOLDERS.get(parts[i - 1], '{name}')
+    return '/'.join(parts) + ext
+
+class RequestStats:
+    """Collect the number of requests, the time they took, the bytes received
+    and the status codes per endpoint template.
+
+    Hooks are called with (method, path, template, status, seconds, size) for
+    every request, to feed the numbers to another metrics system. The status
+    is None when the request failed. An error in a hook is logged, it does
+    not fail the request.
+    """
+
+    def __init__(self):
+        self._endpoints = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """Call hook for every request."""
+        self._hooks.append(hook)
+
+    def record(self, method, path, status, seconds, size):
+        """Record a request.
+
+        Keyword arguments:
+        method -- the http method
+        path -- the path of the request
+        status -- the HTTP statuscode, None when the request failed
+        seconds -- the time the request took
+        size -- the number of bytes received
+        """
+        template = endpoint_template(path)
+        with self._lock:
+            endpoint = self._endpoint(method, template)
+            endpoint['requests'] += 1
+            endpoint['seconds'] += seconds
+            endpoint['max_seconds'] = max(endpoint['max_seconds'], seconds)
+            endpoint['bytes'] += size
+            status_key = str(status) if status is not None else 'error'
+            endpoint['status'][status_key] = \
+                    endpoint['status'].get(status_key, 0) + 1
+        for hook in self._hooks:
+            try:
+                hook(method, path, template, status, seconds, size)
+            except Exception:
+                logging.exception('Error in request stats hook {0!r}'.format(
+                                        hook))
+
+    def record_cached(self, method, path):
+        """Record a request that was answered from the response cache."""
+        with self._lock:
+            self._endpoint(method, endpoint_template(path))['cached'] += 1
+
+    def _endpoint(self, method, template):
+        """Get the numbers of an endpoint, call with the lock held."""
+        key = '{0} {1}'.format(method.upper(), template)
+        if key not in self._endpoints:
+            self._endpoints[key] = {'requests': 0, 'cached': 0,
+                                    'seconds': 0.0, 'max_seconds': 0.0,
+                                    'bytes': 0, 'status': {}}
+        return self._endpoints[key]
+
+    def get(self):
+        """Returns a copy of the numbers per endpoint."""
+        with self._lock:
+            return json.loads(json.dumps(self._endpoints))
+
+    def summary(self):
+        """Returns a table with the numbers per endpoint, the endpoints that
+        took most time first.
+        """
+        endpoints = self.get()
+        lines = ['{0:<66} {1:>8} {2:>8} {3:>9} {4:>9} {5:>12}'.format(
+                    'endpoint', 'requests', 'cached', 'total s', 'avg ms',
+                    'bytes')]
+        for key, e in sorted(endpoints.items(),
+                             key=lambda item: -item[1]['seconds']):
+            avg = 1000.0 * e['seconds'] / e['requests'] if e['requests'] else 0
+            lines.append('{0:<66} {1:>8} {2:>8} {3:>9.2f} {4:>9.1f} '
+                         '{5:>12}'.format(key, e['requests'], e['cached'],
+                                          e['seconds'], avg, e['bytes']))
+        return '\n'.join(lines)
+
+    def write(self, filename):
+        """Write the numbers per endpoint as json to filename."""
+        with open(filename, 'w') as f:
+            json.dump(self.get(), f, indent=4, sort_keys=True)
+
+class QueueHandler(logging.Handler):
+    """Log handler that puts the records on a queue, a background thread
+    writes them with the real handler. So a request never waits for the log
+    file. When the queue is full, records are dropped instead of waiting.
+    """
+
+    def __init__(self, handler, size=10000):
+        """Start the background thread
+
+        Keyword arguments:
+        handler -- the handler that writes the records
+        size -- maximum number of records on the queue
+        """
+        logging.Handler.__init__(self)
+        self._handler = handler
+        self._queue = Queue.Queue(size)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._write)
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def emit(self, record):
+        # format the message now, the arguments may change afterwards
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                                    record.exc_info)
+            record.exc_info = None
+        try:
+            self._queue.put_nowait(record)
+        except Queue.Full:
+            self.dropped += 1
+
+    def _write(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            self._handler.handle(record)
+
+    def close(self):
+        """Write the remaining records and stop the background thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+            if self.dropped:
+                self._handler.handle(logging.makeLogRecord({
+                    'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': 'Dropped {0} log records'.format(self.dropped)}))
+            self._handler.close()
+        logging.Handler.close(self)
+
+class RateLimiter:
+    """Limit the requests to a server with a token bucket and a maximum number
+    of requests in flight.
+
+    The bucket holds at most `burst` tokens and is refilled with `rate` tokens
+    per second. Every request takes a token and waits for one when the bucket
+    is empty, so on average no more than `rate` requests per second are sent.
+    """
+
+    def __init__(self, rate=0.0, burst=1, max_in_flight=0):
+        """Initialise the limiter
+
+        Keyword arguments:
+        rate -- requests per second, 0 for no limit
+        burst -- number of requests that can be sent at once after a quiet
+                 period
+        max_in_flight -- maximum number of requests at the same time, 0 for no
+                         limit
+        """
+        self._rate = float(rate)
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._last = time.time()
+        self._lock = threading.Lock()
+        self._in_flight = None
+        if max_in_flight:
+            self._in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def acquire(self):
+        """Wait until a request may be sent."""
+        if self._in_flight is not None:
+            self._in_flight.acquire()
+        if not self._rate:
+            return
+        while True:
+            with self._lock:
+                now = time.time()
+                self._tokens = min(self._burst, self._tokens +
+                                   (now - self._last) * self._rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+    def release(self):
+        """Mark a request as finished."""
+        if self._in_flight is not None:
+            self._in_flight.release()
+
+# methods that can be sent again without changing the result
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+# statuses of a server that is temporarily unable to answer
+RETRY_STATUSES = (429, 502, 503, 504)
+
+class StreamedResponse:
+    """A response of which the body is read while it is used, see
+    Util.stream.
+
+    It is a file-like object with read, and iterating over it yields the body
+    in chunks.
+    """
+
+    def __init__(self, u, connection, response, method, path, start):
+        self._u = u
+        self._connection = connection
+        self._response = response
+        self._method = method
+        self._path = path
+        self._start = start
+        self._size = 0
+        self._closed = False
+        # the connection was closed before the whole body was received
+        self._incomplete = False
+        self.status = response.status
+
+    def getheader(self, name, default=None):
+        """Returns the value of a header of the response."""
+        return self._response.getheader(name, default)
+
+    def read(self, size=-1):
+        """Read at most size bytes of the body, or the rest of the body.
+
+        Returns the text read, an empty string at the end of the body.
+        """
+        if self._closed:
+            return ''
+        if size < 0:
+            data = self._response.read()
+        else:
+            data = self._response.read(size)
+        self._size += len(data)
+        if not data and size and self._response.length:
+            # httplib does not raise this when a part of the body is read
+            self._incomplete = True
+            self.close()
+            raise httplib.IncompleteRead('', self._response.length)
+        if self._response.isclosed():
+            self.close()
+        return data
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self._u._chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        """Stop reading. The connection is given back to the pool when the
+        whole body has been read, otherwise it is closed.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._response.isclosed() and not self._incomplete:
+                self._u._release(self._connection, self._response)
+            else:
+                self._u._pool.discard(self._connection)
+        finally:
+            self._u.limiter.release()
+        self._u.stats.record(self._method, self._path, self.status,
+                             time.time() - self._start, self._size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def server_sections(config_file):
+    """Get the sections of the servers in the config file.
+
+    Every server of a cluster has its own section, named server: followed by
+    the name of the server, like [server:node1]. The options that are the same
+    for all servers can be put in the server section.
+
+    Returns a sorted list with the names of the sections, or ['server'] if
+    there are no sections of servers.
+    """
+    config = ConfigParser.RawConfigParser()
+    config.read(config_file)
+    sections = sorted(s for s in config.sections() if s.startswith('server:'))
+    return sections or ['server']
 
 class Util:
     """Util Class to help with all the annoying tasks."""
 
-    def __init__(self, config_file='settings.sfg'):
+    def __init__(self, config_file='settings.sfg', section='server'):
         """Initilise the util class
 
         Read the configuraton file and setup logging. It uses some default
@@ -16,19 +554,45 @@ class Util:
 
         Keyword arguments:
         config_file -- the config file to use
+        section -- the section of the config file with the server to use, see
+                   server_sections
         """
         self.config = ConfigParser.RawConfigParser()
+        self.section = section
         self.check_config(config_file)
 
-        self._url = self.config.get('server','url')
-        self._port = self.config.get('server', 'port')
-        self._address = self.config.get('server', 'address')
+        self._url = self.config.get(section, 'url')
+        self._port = self.config.get(section, 'port')
+        self._address = self.config.get(section, 'address')
+        self.pool_size = self.get_option(section, 'pool_size', 4)
+        self._chunk_size = self.get_option(section, 'chunk_size', 65536)
+        self._pool = ConnectionPool(self._url, self._port, self.pool_size)
+        self.cache = None
+        if self.get_option('cache', 'enabled', False):
+            self.cache = ResponseCache(
+                    self.get_option('cache', 'ttl', 300),
+                    self.get_option('cache', 'max_entries', 1000))
+        self.stats = RequestStats()
+        self.validators = None
+        if self.get_option('conditional', 'enabled', False):
+            self.validators = ValidatorStore(
+                    self.get_option('conditional', 'directory', 'validators'),
+                    '{0}:{1}/{2}'.format(self._url, self._port,
+                                         self._address))
         self._auth = 'Basic {0}'.format(b64encode('{0}:{1}'.format(
-                            self.config.get('server','user'),
-                            self.config.get('server','pass'))))
+                            self.config.get(section, 'user'),
+                            self.config.get(section, 'pass'))))
 
-        logging.basicConfig(filename=self.config.get('logging','filename'), \
-                            level=self.config.get('logging','level'))
+        self._max_body_length = self.get_option('logging', 'max_body_length',
+                                                1000)
+        self._retries = self.get_option('retry', 'retries', 0)
+        self._backoff = self.get_option('retry', 'backoff', 0.5)
+        self._max_backoff = self.get_option('retry', 'max_backoff', 30.0)
+        self.limiter = RateLimiter(
+                self.get_option('rate_limit', 'rate', 0.0),
+                self.get_option('rate_limit', 'burst', 1),
+                self.get_option('rate_limit', 'max_in_flight', 0))
+        self.setup_logging()
         logging.info('Initialised Util class with settings')
         logging.info('Using server: {0} at port {1} on {2}'.format(
                     self._address,
@@ -36,9 +600,9 @@ class Util:
                     self._url))
 
     def check_config(self, config_file):
-    """Perform basic checks on the config file and set default if the key values
-    are not present.
-    """
+        """Perform basic checks on the config file and set default if the key
+        values are not present.
+        """
         try:
             self.config.readfp(open(config_file))
         except IOError:
@@ -49,17 +613,25 @@ class Util:
             self.config.set('server', 'address', 'geoserver')
             self.config.set('server', 'user', 'admin')
             self.config.set('server','pass', 'geoserver')
+            self.config.set('server', 'pool_size', '4')
             self.config.add_section('logging')
             self.config.set('logging', 'filename', 'geoserver-python.log')
             self.config.set('logging', 'level', logging.INFO)
-        if (not(self.config.has_section('server')
-                and self.config.has_option('server', 'url')
-                and self.config.has_option('server','port')
-                and self.config.has_option('server','address')
+        if (self.section != 'server' and self.config.has_section(self.section)
+                and self.config.has_section('server')):
+            # the options that are not set for this server are those of the
+            # server section
+            for option, value in self.config.items('server'):
+                if not self.config.has_option(self.section, option):
+                    self.config.set(self.section, option, value)
+        if (not(self.config.has_section(self.section)
+                and self.config.has_option(self.section, 'url')
+                and self.config.has_option(self.section, 'port')
+                and self.config.has_option(self.section, 'address')
                )
            ):
             print 'Config file is not complete! I need url, ' + \
-                  'port and address in the server section!'
+                  'port and address in the ' + self.section + ' section!'
             raise ValueError('Config file is not complete.')
         if (not(self.config.has_section('logging')
                 and self.config.has_option('logging', 'filename')
@@ -69,6 +641,45 @@ class Util:
             print 'Config file not complete! I need a setup for logging!'
             raise ValueError('Config file is not complete.')
 
+    def setup_logging(self):
+        """Log to the file of the config file, through a QueueHandler when
+        the option queue is set in the logging section.
+
+        Like logging.basicConfig, nothing is changed when logging has been set
+        up already.
+        """
+        root = logging.getLogger()
+        if root.handlers:
+            return
+        handler = logging.FileHandler(self.config.get('logging', 'filename'))
+        handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        if self.get_option('logging', 'queue', False):
+            handler = QueueHandler(handler,
+                                   self.get_option('logging', 'queue_size',
+                                                   10000))
+        root.addHandler(handler)
+        root.setLevel(self.config.get('logging', 'level'))
+
+    def get_option(self, section, option, default):
+        """Get an optional value from the config file.
+
+        The value is converted to the type of the default value.
+
+        Keyword arguments:
+        section -- the section of the config file
+        option -- the name of the option
+        default -- the value to use when the option is not present
+        """
+        if not self.config.has_option(section, option):
+            return default
+        if isinstance(default, bool):
+            return self.config.getboolean(section, option)
+        if isinstance(default, int):
+            return self.config.getint(section, option)
+        if isinstance(default, float):
+            return self.config.getfloat(section, option)
+        return self.config.get(section, option)
+
 
     def request(self, method, path, payload='', mime='text/xml'):
         """Perform http-request and get the response
@@ -82,41 +693,352 @@ class Util:
         Returns:
             HTTP statuscode, response as text
         """
-        logging.debug('Sending request with method: {0} to path: {1}:{2}/{3}/{4}'.format(
-                            method,
-                            self._url,
-                            self._port,
-                            self._address,
-                            path))
+        logging.debug('Sending request with method: %s to path: %s:%s/%s/%s',
+                      method,
+                      self._url,
+                      self._port,
+                      self._address,
+                      path)
+        if self.cache is not None:
+            if method.upper() == 'GET':
+                cached = self.cache.get(method, path, mime)
+                if cached is not None:
+                    logging.debug('Using cached response')
+                    self.stats.record_cached(method, path)
+                    return cached
+            else:
+                self.cache.invalidate(path)
+
         headers = {}
         headers['Authorization'] = self._auth
         headers['Content-type'] = mime
 
+        validators = None
+        if self.validators is not None and method.upper() == 'GET':
+            validators = self.validators.get(path, mime)
+            if validators is not None:
+                if validators.get('etag'):
+                    headers['If-None-Match'] = validators['etag']
+                if validators.get('last_modified'):
+                    headers['If-Modified-Since'] = validators['last_modified']
+
+        response, resp = self._send_with_retries(method, path, payload,
+                                                 headers)
+
+        status = response.status
+        if self.validators is not None and method.upper() == 'GET':
+            status, resp = self._check_validators(path, mime, validators,
+                                                  response, resp)
+            if status == 304 and validators is not None:
+                # the stored response is gone, get the full response
+                logging.debug('Stored response missing, requesting again')
+                headers.pop('If-None-Match', None)
+                headers.pop('If-Modified-Since', None)
+                response, resp = self._send_with_retries(method, path,
+                                                         payload, headers)
+                status, resp = self._check_validators(path, mime, None,
+                                                      response, resp)
+        if (self.cache is not None and method.upper() == 'GET'
+                and status in (200, 404)):
+            self.cache.put(method, path, mime, (status, resp))
+        return status, resp
+
+    def download(self, path, filename, mime='text/xml'):
+        """Perform a GET-request and write the response to a file.
+
+        The response is written in chunks of chunk_size (see the server
+        section) as it comes in, so a large response is never completely in
+        memory. The file is only written when the request is succesful. The
+        response cache and conditional requests are not used.
+
+        Keyword-arguments:
+          path -- the path to send the request to
+          filename -- the file to write the response to
+          mime -- mime-type
+
+        Returns:
+            HTTP statuscode
+        """
+        logging.debug('Downloading %s to %s', path, filename)
+        headers = {}
+        headers['Authorization'] = self._auth
+        headers['Content-type'] = mime
+        tmp = '{0}.{1}.part'.format(filename,
+                                    threading.current_thread().ident)
         try:
-            connection = httplib.HTTPConnection(
-                    self._url,
-                    self._port)
-            connection.request(
-                    method,
-                    '/' + self._address + '/' + path,
-                    payload,
-                    headers)
-            response = connection.getresponse()
-            resp = response.read()
-            logging.debug('Succeeded in getting response: {0}'.format(resp))
-        except Exception as e:
-            logging.error('Error with sending "{0}"-request to ' + \
+            with open(tmp, 'wb') as sink:
+                response, resp = self._send_with_retries('GET', path, None,
+                                                         headers, sink)
+            if response.status == 200:
+                os.rename(tmp, filename)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return response.status
+
+    def stream(self, method, path, payload=None, mime='application/json'):
+        """Perform http-request and get the response without reading it.
+
+        The body is read from the returned StreamedResponse while it is used,
+        so a large response is never completely in memory. Close it when done,
+        or use it in a with statement, to give the connection back. Failed
+        requests are retried like with request, the response cache and
+        conditional requests are not used.
+
+        Keyword-arguments:
+          method -- the http method to use
+          path -- the path to send the request to
+          payload -- the extra content to send
+          mime -- mime-type
+
+        Returns:
+            StreamedResponse
+        """
+        logging.debug('Streaming request with method: %s to path: %s',
+                      method, path)
+        headers = {}
+        headers['Authorization'] = self._auth
+        headers['Content-type'] = mime
+        attempt = 0
+        while True:
+            error = response = None
+            self.limiter.acquire()
+            start = time.time()
+            try:
+                connection, response = self._start(method, path, payload,
+                                                   headers)
+            except Exception as e:
+                self.limiter.release()
+                self.stats.record(method, path, None, time.time() - start, 0)
+                error = e
+                exc_info = sys.exc_info()
+            if not self._should_retry(method, attempt, error, response):
+                break
+            if response is not None:
+                StreamedResponse(self, connection, response, method, path,
+                                 start).close()
+            delay = self._retry_delay(attempt, error, response)
+            logging.warning('Retrying "%s"-request to %s in %.1f seconds ' \
+                            '(%s)', method, path, delay,
+                            error or response.status)
+            time.sleep(delay)
+            attempt += 1
+        if error is not None:
+            logging.error('Error with sending "{0}"-request to ' \
                           '{1}:{2}/{3}/{4}. Get error: {5}'.format(method,
                                                         self._url,
                                                         self._port,
                                                         self._address,
                                                         path,
-                                                        e))
-            raise e
-        finally:
-            connection.close()
+                                                        error))
+            raise exc_info[0], exc_info[1], exc_info[2]
+        return StreamedResponse(self, connection, response, method, path,
+                                start)
+
+    def _send_with_retries(self, method, path, payload, headers, sink=None):
+        """Send the request, and send it again when it failed and may be
+        retried (see _should_retry).
+
+        Returns:
+            HTTP response, response as text or None when written to sink
+        """
+        attempt = 0
+        while True:
+            error = response = None
+            self.limiter.acquire()
+            try:
+                response, resp = self._perform(method, path, payload, headers,
+                                               sink)
+            except Exception as e:
+                error = e
+                exc_info = sys.exc_info()
+            finally:
+                self.limiter.release()
+            if not self._should_retry(method, attempt, error, response):
+                break
+            delay = self._retry_delay(attempt, error, response)
+            logging.warning('Retrying "%s"-request to %s in %.1f seconds ' \
+                            '(%s)', method, path, delay,
+                            error or response.status)
+            time.sleep(delay)
+            attempt += 1
+        if error is not None:
+            logging.error('Error with sending "{0}"-request to ' \
+                          '{1}:{2}/{3}/{4}. Get error: {5}'.format(method,
+                                                        self._url,
+                                                        self._port,
+                                                        self._address,
+                                                        path,
+                                                        error))
+            raise exc_info[0], exc_info[1], exc_info[2]
+        return response, resp
+
+    def _perform(self, method, path, payload, headers, sink=None):
+        """Send the request over a connection from the pool and read the
+        response, into sink when given (see _read).
+
+        Returns:
+            HTTP response, response as text or None when written to sink
+        """
+        start = time.time()
+        try:
+            connection, response = self._start(method, path, payload,
+                                               headers)
+        except Exception:
+            self.stats.record(method, path, None, time.time() - start, 0)
+            raise
+        try:
+            resp = self._read(response, sink)
+            if resp is not None and \
+                    logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug('Succeeded in getting response: %s',
+                              self._truncate(resp))
+        except Exception:
+            self._pool.discard(connection)
+            self.stats.record(method, path, None, time.time() - start, 0)
+            raise
+        # the connection goes back to the pool first, the stats can not keep
+        # it from there
+        self._release(connection, response)
+        self.stats.record(method, path, response.status, time.time() - start,
+                          len(resp) if resp is not None else sink.tell())
+        return response, resp
+
+    def _start(self, method, path, payload, headers):
+        """Send the request over a connection from the pool and wait for the
+        status and headers of the response. The body is not read yet.
+
+        Returns:
+            the connection, HTTP response
+        """
+        connection, reused = self._pool.get()
+        try:
+            try:
+                response = self._send(connection, method, path, payload,
+                                      headers)
+            except (httplib.HTTPException, socket.error):
+                if not reused or method.upper() not in IDEMPOTENT_METHODS:
+                    raise
+                # The server has closed the idle keep-alive connection in the
+                # meantime, try once more with a fresh connection. Not for a
+                # POST, the server may have received it already.
+                logging.debug('Stale connection, reconnecting to server')
+                connection.close()
+                connection = self._pool.new_connection()
+                response = self._send(connection, method, path, payload,
+                                      headers)
+        except Exception:
+            self._pool.discard(connection)
+            raise
+        return connection, response
+
+    def _release(self, connection, response):
+        """Give the connection back to the pool once the response has been
+        read completely.
+        """
+        if response.will_close:
+            self._pool.discard(connection)
+        else:
+            self._pool.put(connection)
+
+    def _should_retry(self, method, attempt, error, response):
+        """Check if a failed request should be sent again.
+
+        Only idempotent requests are retried, when the connection failed or
+        the server answered it is temporarily unavailable.
+        """
+        if attempt >= self._retries:
+            return False
+        if method.upper() not in IDEMPOTENT_METHODS:
+            return False
+        if error is not None:
+            return isinstance(error, (httplib.HTTPException, socket.error))
+        return response.status in RETRY_STATUSES
+
+    def _retry_delay(self, attempt, error, response):
+        """Get the time to wait before the next attempt.
+
+        The delay is random between 0 and an exponentially growing maximum, so
+        the worker threads do not retry all at the same time. A Retry-After
+        header of the server is respected.
+
+        Returns the delay in seconds.
+        """
+        delay = random.uniform(0, min(self._max_backoff,
+                                      self._backoff * 2 ** attempt))
+        if error is None:
+            retry_after = response.getheader('retry-after')
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, min(self._max_backoff, int(retry_after)))
+        return delay
+
+    def _check_validators(self, path, mime, validators, response, resp):
+        """Use the stored response on '304 Not Modified' and store the
+        validators of a new response.
+
+        Returns:
+            HTTP statuscode, response as text
+        """
+        if response.status == 304 and validators is not None:
+            body = self.validators.get_body(path, mime)
+            if body is not None:
+                logging.debug('Not modified, using stored response')
+                return 200, body
+        if response.status == 200:
+            etag = response.getheader('etag')
+            last_modified = response.getheader('last-modified')
+            if etag or last_modified:
+                self.validators.put(path, mime, etag, last_modified, resp)
         return response.status, resp
 
+    def _truncate(self, body):
+        """Shorten a response body to max_body_length for the log."""
+        if self._max_body_length and len(body) > self._max_body_length:
+            return '{0}... ({1} bytes)'.format(body[:self._max_body_length],
+                                               len(body))
+        return body
+
+    def _send(self, connection, method, path, payload, headers):
+        """Send the request over the connection.
+
+        Returns:
+            HTTP response
+        """
+        connection.request(
+                method,
+                '/' + self._address + '/' + path,
+                payload,
+                headers)
+        return connection.getresponse()
+
+    def _read(self, response, sink=None):
+        """Read the full response, so the connection can be reused
+        afterwards.
+
+        A succesful response is written to sink in chunks, when given.
+
+        Returns:
+            response as text or None when written to sink
+        """
+        if sink is None or response.status != 200:
+            return response.read()
+        # start over when this is a retry
+        sink.seek(0)
+        sink.truncate()
+        while True:
+            chunk = response.read(self._chunk_size)
+            if not chunk:
+                break
+            sink.write(chunk)
+        if response.length:
+            # httplib does not raise this when a part of the body is read
+            raise httplib.IncompleteRead('', response.length)
+        return None
+
+    def close(self):
+        """Close all open connections to the server."""
+        self._pool.close()
+
 def main():
     u = Util('settings.cfg')
     stat, response = u.request('get', 'test', None)
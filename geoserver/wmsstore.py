@@ -13,9 +13,7 @@ Example:
     >>> print wmsstore_exists('tiger','nyc', config)
     >>> print get_wmsstore_info('tiger', 'nyc', config)
 """
-import json
-import logging
-import workspace
+import rest
 from util import Util
 
 def get_wmsstores(workspace, u):
@@ -25,70 +23,74 @@ def get_wmsstores(workspace, u):
     workspace exists.
 
     Returns python dict with name of the wmsstores as key and a dict as
-    value. This dict contains the href to the wmsstore.
+    value. This dict contains the href to the wmsstore. Returns None if
+    there are no wmsstores. Raises rest.ListingError if they could not be
+    listed.
     """
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/workspaces/' + workspace + \
-                                  '/wmsstores.json',
-                           payload = None,
-                           mime = 'application/json')
-    json_data = json.loads(ds_request)
-    if json_data.get('wmsStores') == '':
-        return None
-    wmsstores = json_data.get('wmsStores').get('wmsStore')
-
-    out = {}
-    for wmsstore in wmsstores:
-        out[wmsstore.get('name')] = {'href': wmsstore.get('href')}
-    return out
+    return rest.get_list('wmsstores', (workspace,), u)
 
 def wmsstore_exists(workspacename, wmsstorename, u):
     """Check if wmsstore alreade exists in this geoserver configuration.
 
+    Only when the wmsstore is not found, the workspace is checked to log why.
+
     Returns True of False.
     """
-    if (not(workspace.workspace_exists(workspacename, u))):
-            logging.error('WMSstore cannot exist if workspace doesn\'t exist.')
-            return False
-    
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/workspaces/' + workspacename + \
-                                  '/wmsstores/' + wmsstorename + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    return stat == 200
+    return rest.exists('wmsstores', (workspacename,), wmsstorename, u)
 
 def get_wmsstore_info(workspacename, wmsstorename, u):
     """Get information on the wmsstore
 
+    The workspace is only checked when the wmsstore is not found, to tell
+    which of the two is missing.
+
     Returns a dict with the wmsstore info.
     """
-    if (not(workspace.workspace_exists(workspacename, u))):
-            logging.error('Workspace doesn\'t exist, so no info on ' + \
-                          'wmsstore available.')
-            return {'info': 'No workspace, so no wmsstore info.'}
-    stat, ds_request = u.request(method = 'GET',
-                                 path = 'rest/workspaces/' + workspacename + \
-                                        '/wmsstores/' + \
-                                        wmsstorename + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    if stat != 200:
-        logging.error('WMSstore: "' + wmsstorename + '" does not' + \
-                      ' exist! Cannot get information.')
-        return {'info': 'WMSstore does not exist!'}
-
-    ds_info = json.loads(ds_request).get('wmsStore')
-    return ds_info
-
-#TODO
-#def create_wmsstore(workspace, wmsstorename, u):
-
-#TODO
-#def delete_wmsstore(workspace, wmsstorename, u):
-
-#TODO
-#def delete_all_wmsstores(workspace, u):
+    return rest.get_info('wmsstores', (workspacename,), wmsstorename, u)
+
+def create_wmsstore(workspacename, wmsstore_info, u):
+    """Create a new wmsstore in the workspace.
+
+    The wmsstore_info is a dict like get_wmsstore_info returns. Does not
+    check if the wmsstore already exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.create('wmsstores', (workspacename,), wmsstore_info, u)
+
+def update_wmsstore(workspacename, wmsstorename, wmsstore_info, u):
+    """Change the settings of an existing wmsstore.
+
+    The wmsstore_info is a dict like get_wmsstore_info returns.
+
+    Returns True or False if succesful.
+    """
+    return rest.update('wmsstores', (workspacename,), wmsstorename,
+                       wmsstore_info, u)
+
+def delete_wmsstore(workspacename, wmsstorename, u, recurse=False):
+    """Delete the wmsstore from the workspace.
+
+    With recurse, everything in the wmsstore (and the layers of it) is deleted
+    too, otherwise geoserver refuses to delete a wmsstore that is not empty.
+    Does not check if the wmsstore exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.delete('wmsstores', (workspacename,), wmsstorename, u,
+                       recurse)
+
+def delete_all_wmsstores(workspacename, u, recurse=False):
+    """Delete all wmsstores from the workspace, one after another.
+
+    With recurse, everything in the wmsstores is deleted too, see
+    delete_wmsstore.
+
+    Returns python dict with the name of every wmsstore as key and True or
+    False if it was deleted as value.
+    """
+    return rest.delete_all('wmsstores', (workspacename,), u, recurse)
+
 
 def main():
     print 'calling wmsstore.main'
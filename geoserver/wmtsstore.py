@@ -13,9 +13,7 @@ Example:
     >>> print wmtsstore_exists('tiger','nyc', config)
     >>> print get_wmtsstore_info('tiger', 'nyc', config)
 """
-import json
-import logging
-import workspace
+import rest
 from util import Util
 
 def get_wmtsstores(workspace, u):
@@ -25,70 +23,74 @@ def get_wmtsstores(workspace, u):
     workspace exists.
 
     Returns python dict with name of the wmtsstores as key and a dict as
-    value. This dict contains the href to the wmtsstore.
+    value. This dict contains the href to the wmtsstore. Returns None if
+    there are no wmtsstores. Raises rest.ListingError if they could not be
+    listed.
     """
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/workspaces/' + workspace + \
-                                  '/wmtsstores.json',
-                           payload = None,
-                           mime = 'application/json')
-    json_data = json.loads(ds_request)
-    if json_data.get('wmtsStores') == '':
-        return None
-    wmtsstores = json_data.get('wmtsStores').get('wmtsStore')
-
-    out = {}
-    for wmtsstore in wmtsstores:
-        out[wmtsstore.get('name')] = {'href': wmtsstore.get('href')}
-    return out
+    return rest.get_list('wmtsstores', (workspace,), u)
 
 def wmtsstore_exists(workspacename, wmtsstorename, u):
     """Check if wmtsstore alreade exists in this geoserver configuration.
 
+    Only when the wmtsstore is not found, the workspace is checked to log why.
+
     Returns True of False.
     """
-    if (not(workspace.workspace_exists(workspacename, u))):
-            logging.error('WMTSstore cannot exist if workspace doesn\'t exist.')
-            return False
-    
-    stat, ds_request = u.request(method = 'GET',
-                           path = 'rest/workspaces/' + workspacename + \
-                                  '/wmtsstores/' + wmtsstorename + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    return stat == 200
+    return rest.exists('wmtsstores', (workspacename,), wmtsstorename, u)
 
 def get_wmtsstore_info(workspacename, wmtsstorename, u):
     """Get information on the wmtsstore
 
+    The workspace is only checked when the wmtsstore is not found, to tell
+    which of the two is missing.
+
     Returns a dict with the wmtsstore info.
     """
-    if (not(workspace.workspace_exists(workspacename, u))):
-            logging.error('Workspace doesn\'t exist, so no info on ' + \
-                          'wmtsstore available.')
-            return {'info': 'No workspace, so no wmtsstore info.'}
-    stat, ds_request = u.request(method = 'GET',
-                                 path = 'rest/workspaces/' + workspacename + \
-                                        '/wmtsstores/' + \
-                                        wmtsstorename + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    if stat != 200:
-        logging.error('WMTSstore: "' + wmtsstorename + '" does not' + \
-                      ' exist! Cannot get information.')
-        return {'info': 'WMTSstore does not exist!'}
-
-    ds_info = json.loads(ds_request).get('wmtsStore')
-    return ds_info
-
-#TODO
-#def create_wmtsstore(workspace, wmtsstorename, u):
-
-#TODO
-#def delete_wmtsstore(workspace, wmtsstorename, u):
-
-#TODO
-#def delete_all_wmtsstores(workspace, u):
+    return rest.get_info('wmtsstores', (workspacename,), wmtsstorename, u)
+
+def create_wmtsstore(workspacename, wmtsstore_info, u):
+    """Create a new wmtsstore in the workspace.
+
+    The wmtsstore_info is a dict like get_wmtsstore_info returns. Does not
+    check if the wmtsstore already exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.create('wmtsstores', (workspacename,), wmtsstore_info, u)
+
+def update_wmtsstore(workspacename, wmtsstorename, wmtsstore_info, u):
+    """Change the settings of an existing wmtsstore.
+
+    The wmtsstore_info is a dict like get_wmtsstore_info returns.
+
+    Returns True or False if succesful.
+    """
+    return rest.update('wmtsstores', (workspacename,), wmtsstorename,
+                       wmtsstore_info, u)
+
+def delete_wmtsstore(workspacename, wmtsstorename, u, recurse=False):
+    """Delete the wmtsstore from the workspace.
+
+    With recurse, everything in the wmtsstore (and the layers of it) is deleted
+    too, otherwise geoserver refuses to delete a wmtsstore that is not empty.
+    Does not check if the wmtsstore exists.
+
+    Returns True or False if succesful.
+    """
+    return rest.delete('wmtsstores', (workspacename,), wmtsstorename, u,
+                       recurse)
+
+def delete_all_wmtsstores(workspacename, u, recurse=False):
+    """Delete all wmtsstores from the workspace, one after another.
+
+    With recurse, everything in the wmtsstores is deleted too, see
+    delete_wmtsstore.
+
+    Returns python dict with the name of every wmtsstore as key and True or
+    False if it was deleted as value.
+    """
+    return rest.delete_all('wmtsstores', (workspacename,), u, recurse)
+
 
 def main():
     print 'calling wmtsstore.main'
@@ -17,7 +17,7 @@ Example:
 """
 import json
 import logging
-
+import rest
 from util import Util
 
 def get_workspaces(u):
@@ -28,46 +28,21 @@ def get_workspaces(u):
     Returns python dict with name of the workspaces as key and a dict as
     value. This dict contains the href to the workspace.
     """
-    stat, ws_request = u.request(method = 'GET',
-                           path = 'rest/workspaces.json',
-                           payload = None,
-                           mime = 'application/json')
-    ws = json.loads(ws_request).get('workspaces').get('workspace')
-
-    out = {}
-    for w in ws:
-        out[w.get('name')] = {'href': w.get('href')}
-    return out
+    return rest.get_list('workspaces', (), u) or {}
 
 def workspace_exists(workspacename, u):
     """Check if workspace alreade exists in this geoserver configuration.
 
     Returns True of False.
     """
-    stat, ws_request = u.request(method = 'GET',
-                                 path = 'rest/workspaces/' + \
-                                            workspacename + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    return stat == 200
+    return rest.exists('workspaces', (), workspacename, u)
 
 def get_workspace_info(workspacename, u):
     """Get information on the workspaces
 
     Returns a dict with the workspace info.
     """
-    stat, ws_request = u.request(method = 'GET',
-                                 path = 'rest/workspaces/' + \
-                                        workspacename + '.json',
-                                 payload = None,
-                                 mime = 'application/json')
-    if stat != 200:
-        logging.error('Workspace: "' + workspacename + '" does not' + \
-                      ' exist! Cannot get information.')
-        return {'info': 'Workspace does not exist!'}
-
-    ws_info = json.loads(ws_request).get('workspace')
-    return ws_info
+    return rest.get_info('workspaces', (), workspacename, u)
 
 def create_workspace(workspacename, u):
     """Create a new workspace
@@ -76,26 +51,14 @@ def create_workspace(workspacename, u):
 
     Returns True or False if succesful.
     """
-    logging.info('Creating workspace "' + workspacename +'"')
-    payload = '<workspace>'
-    payload += '<name>'
-    payload += workspacename
-    payload +='</name>'
-    payload +='</workspace>'
-
-    stat, ws_request = u.request(method = 'POST',
-                                 path = 'rest/workspaces',
-                                 payload = payload,
-                                 mime = 'text/xml')
-
-    return stat == 201
+    return rest.create('workspaces', (), {'name': workspacename}, u)
 
 def make_workspace_default(workspacename, u):
     """Make the workspace the default option.
 
     Return True or False if succesful.
     """
-    if(not(workspace_exists(workspacename))):
+    if(not(workspace_exists(workspacename, u))):
         logging.error('Could not make workspace "' + workspacename + \
             '" the default workspace, since it doesn\'t exists.')
         return False
@@ -113,28 +76,28 @@ def make_workspace_default(workspacename, u):
 
     return stat == 200
 
-def delete_workspace(workspacename, u):
+def delete_workspace(workspacename, u, recurse=False):
     """Delete the workspace from the geoserver.
 
-    Does not checkt if the workspace exists.
+    With recurse, everything in the workspace is deleted too, otherwise
+    geoserver refuses to delete a workspace that is not empty. Does not checkt
+    if the workspace exists.
 
     Returns True or False if succesful.
     """
-    logging.info('Deleting workspace "' + workspacename + '"')
-    stat, ws_request = u.request(method = 'DELETE',
-                                 path = 'rest/workspaces/' + workspacename,
-                                 payload = None,
-                                 mime = 'text/xml')
-
-    return stat == 200
+    return rest.delete('workspaces', (), workspacename, u, recurse)
 
-def delete_all_workspaces(u):
+def delete_all_workspaces(u, recurse=False):
     """Delete all the workspaces from the geosever.
+
+    With recurse, everything in the workspaces is deleted too, see
+    delete_workspace.
+
+    Returns python dict with the name of every workspace as key and True or
+    False if it was deleted as value.
     """
     logging.info('Deleting ALL workspaces.')
-    workspaces = get_workspaces(u)
-    for ws in workspaces:
-        delete_workspace(ws, u)
+    return rest.delete_all('workspaces', (), u, recurse)
 
 def get_name_of_default_workspace(u):
     stat, ws_request = u.request(method = 'GET',
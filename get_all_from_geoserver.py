@@ -1,69 +1,110 @@
-"""Get all the data from a single geoserver.
+"""Get all the data from a single geoserver: the workspaces with all their
+stores (data, coverage, WMS and WMTS), featuretypes and coverages, the layers,
+layergroups and styles with their SLDs.
 
-Put all the data into a python dict and dump it to json.
+Every object is written to an export file (JSON Lines) as soon as it is
+fetched, the json documents are derived from that file afterwards (see
+geoserver/export.py). The per-item requests are spread over a number of worker
+threads (see geoserver/crawler.py).
 
-TODO: layersgroups and the 'other' stores
-"""
-
-import json
-from geoserver import util
-from geoserver import workspace
-from geoserver import datastore
-from geoserver import featuretype
-from geoserver import layers
-from geoserver import styles
-
-config = util.Util(config_file='settings.cfg')
-gs = {}
+With --incremental, the previous export is read. The listings are always
+requested, so new objects are added and removed objects are left out. The
+listings of geoserver do not tell when an object changed, so when conditional
+requests are enabled (the conditional section of the config file), every
+object is requested again and the server only answers with the info of the
+objects that changed. Without conditional requests only new objects are
+fetched, and changed objects keep the info of the previous export. SLDs are
+downloaded when the style changed or the file is missing.
 
-### WORKSPACES, DATASTORES, AND FEATUERS ###
-workspaces = workspace.get_workspaces(config)
-default_workspace = workspace.get_name_of_default_workspace(config)
-gs['workspaces'] = {}
+The export file is written under a temporary name until the crawl is complete.
+When a crawl is interrupted, --resume continues it: the objects in the partial
+export are kept and only the rest is fetched.
 
-for w in workspaces:
-    gs['workspaces'][w] = {}
-    gs['workspaces'][w]['name'] = w
-    gs['workspaces'][w]['default'] = w == default_workspace
+With --sld-store, the SLDs are kept in a content addressed store (see
+geoserver/sldstore.py): identical SLDs are stored once and the SLD files are
+links to the store. SLDs of styles that have not changed are not downloaded
+again.
 
-    dat_store = datastore.get_datastores(w, config)
-    if dat_store:
-        gs['workspaces'][w]['datastores'] = {}
-        for d in dat_store:
-            gs['workspaces'][w]['datastores'][d] = \
-                datastore.get_datastore_info(w, d, config)
+With --sqlite, the export is also copied into a SQLite database to query it
+offline (see geoserver/mirror.py). Only the objects that changed since the
+previous run are written to the database again.
+"""
 
-            features = featuretype.get_featuretypes(w, d, config)
-            if features:
-                gs['workspaces'][w]['datastores'][d]['featuretypes'] = {}
-                for f in features:
-                    gs['workspaces'][w]['datastores'][d]['featuretypes'][f] = \
-                        featuretype.get_featuretype_info(w, d, f, config)
+import argparse
+import os
+from geoserver import util
+from geoserver import crawler
+from geoserver import export
+from geoserver import sldstore
+from geoserver import mirror
 
-### LAYERS ###
-gs_layers = layers.get_layers(config)
-gs['layers'] = {}
+parser = argparse.ArgumentParser(description='Export the configuration of a ' +
+                                             'geoserver to json.')
+parser.add_argument('--workers', type=int, default=None,
+                    help='number of concurrent requests (default: pool_size ' +
+                         'from the config file)')
+parser.add_argument('--incremental', action='store_true',
+                    help='only fetch the objects that are new or, with ' +
+                         'conditional requests, changed since the ' +
+                         'previous export')
+parser.add_argument('--resume', action='store_true',
+                    help='continue an interrupted export, only fetch the ' +
+                         'objects that are not in the partial export')
+parser.add_argument('--sld-store', default=None,
+                    help='keep the SLDs in a content addressed store in ' +
+                         'this directory')
+parser.add_argument('--sqlite', default=None,
+                    help='also write the export to this SQLite database')
+parser.add_argument('--stats', action='store_true',
+                    help='print the number of requests and the time they ' +
+                         'took per endpoint')
+parser.add_argument('--stats-file', default=None,
+                    help='write the request statistics as json to this file')
+args = parser.parse_args()
 
-if gs_layers:
-    for l in gs_layers:
-        gs['layers'][l] = {}
-        gs['layers'][l] = layers.get_layer_info(l, config)
+EXPORT = 'geoserver_config.jsonl'
 
-### STYLES ###
-gs_styles = styles.get_styles(config)
-gs['styles'] = {}
+config = util.Util(config_file='settings.cfg')
+previous = None
+resume = args.resume and os.path.exists(EXPORT + '.new')
+if resume:
+    export.repair_export(EXPORT + '.new')
+    previous = export.ExportReader(EXPORT + '.new')
+elif args.incremental and os.path.exists(EXPORT):
+    previous = export.ExportReader(EXPORT)
+    if config.validators is None:
+        print 'Conditional requests are not enabled, only new objects are ' + \
+              'fetched and changed objects are not detected'
+# the objects of a partial export are current, those of the previous export
+# are checked with conditional requests
+revalidate = previous is not None and not resume and \
+             config.validators is not None
+gs_crawler = crawler.Crawler(config, workers=args.workers, previous=previous,
+                             revalidate=revalidate)
 
-if gs_styles:
-    for s in gs_styles:
-        gs['styles'][s] = {}
-        gs['styles'][s] = styles.get_style_info(s, config)
+### WORKSPACES, DATASTORES, FEATURES, LAYERS AND STYLES ###
+export.write_export(gs_crawler, EXPORT + '.new', resume=resume)
+os.rename(EXPORT + '.new', EXPORT)
 
-        # write SLD to file
-        with open(gs['styles'][s]['filename'], 'w') as f:
-            f.write(styles.get_sld(s, config))
+# write SLDs to file
+store = None
+if args.sld_store:
+    store = sldstore.SldStore(args.sld_store)
+gs_crawler.download_slds(dict((name, data) for kind, name, data in
+                              export.iter_export(EXPORT, 'styles')),
+                         only_missing=args.incremental or args.resume,
+                         store=store)
+if previous:
+    previous.close()
+gs_crawler.close()
+config.close()
 
-with open('geoserver_config.json', 'w') as f:
-    f.write(json.dumps(gs))
+export.write_json(EXPORT, 'geoserver_config.json')
+export.write_json(EXPORT, 'geoserver_config_prettyprint.json', indent=4)
+if args.sqlite:
+    mirror.mirror_export(EXPORT, args.sqlite)
 
-with open('geoserver_config_prettyprint.json', 'w') as f:
-    f.write(json.dumps(gs, indent=4, sort_keys=True))
+if args.stats:
+    print config.stats.summary()
+if args.stats_file:
+    config.stats.write(args.stats_file)
@@ -0,0 +1,38 @@
+"""Put all the data of an export (see get_all_from_geoserver.py) on a geoserver.
+
+The objects are created level by level (workspaces, stores, featuretypes,
+styles, layers, layergroups), the objects of a level concurrently by a number
+of worker threads (see geoserver/restore.py). Prints the result for every
+object.
+"""
+
+import argparse
+import json
+from geoserver import util
+from geoserver import restore
+
+parser = argparse.ArgumentParser(description='Restore an export on a ' +
+                                             'geoserver.')
+parser.add_argument('--config', default='settings.cfg',
+                    help='config file of the target geoserver')
+parser.add_argument('--export', default='geoserver_config.json',
+                    help='the export to restore')
+parser.add_argument('--sld-directory', default='.',
+                    help='the directory with the SLD files of the export')
+parser.add_argument('--workers', type=int, default=None,
+                    help='number of concurrent requests (default: pool_size ' +
+                         'from the config file)')
+args = parser.parse_args()
+
+config = util.Util(config_file=args.config)
+with open(args.export) as f:
+    gs = json.load(f)
+
+restorer = restore.Restorer(config, workers=args.workers,
+                            sld_directory=args.sld_directory)
+results = restorer.restore(gs)
+restorer.close()
+config.close()
+
+for kind, key, result in results:
+    print '{0:13} {1:8} {2}'.format(kind, result, '/'.join(key[1:]))
@@ -0,0 +1,54 @@
+"""Make the catalog of a target geoserver equal to a source geoserver or an
+export, with as few requests as possible.
+
+Both catalogs are compared and only the differences are applied: objects that
+are only in the source are created, objects with other settings are changed
+and objects that are only in the target are deleted (see geoserver/sync.py).
+With --dry-run, the plan is only printed.
+"""
+
+import argparse
+from geoserver import util
+from geoserver import crawler
+from geoserver import export
+from geoserver import sync
+
+parser = argparse.ArgumentParser(description='Synchronise a geoserver with ' +
+                                             'another one or an export.')
+source = parser.add_mutually_exclusive_group(required=True)
+source.add_argument('--source-config',
+                    help='config file of the source geoserver')
+source.add_argument('--source-export',
+                    help='export (.json or .jsonl) to use as source')
+parser.add_argument('--target-config', default='settings.cfg',
+                    help='config file of the target geoserver')
+parser.add_argument('--sld-directory', default='.',
+                    help='the directory with the SLD files of the source')
+parser.add_argument('--workers', type=int, default=None,
+                    help='number of concurrent requests for crawling ' +
+                         '(default: pool_size from the config file)')
+parser.add_argument('--dry-run', action='store_true',
+                    help='only print the plan')
+args = parser.parse_args()
+
+def crawl(config):
+    gs_crawler = crawler.Crawler(config, workers=args.workers)
+    gs = gs_crawler.crawl()
+    gs_crawler.close()
+    return gs
+
+target = util.Util(config_file=args.target_config)
+if args.source_export:
+    source_gs = export.load_export(args.source_export)
+else:
+    source_gs = crawl(util.Util(config_file=args.source_config))
+
+plan = sync.make_plan(source_gs, crawl(target))
+sync.print_plan(plan)
+
+if not args.dry_run:
+    failed = [operation for operation, ok in
+              sync.apply_plan(plan, target, args.sld_directory) if not ok]
+    print 'Applied {0} of {1} changes'.format(len(plan) - len(failed),
+                                              len(plan))
+target.close()
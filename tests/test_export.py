@@ -0,0 +1,116 @@
+"""Tests of resuming and repairing an interrupted export of export.py.
+
+Run with:
+    python -m unittest discover tests
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..',
+                                'geoserver'))
+import export
+
+class Crawler:
+    """Stand-in for crawler.Crawler, that yields fixed objects."""
+
+    def __init__(self, gs):
+        self._gs = gs
+
+    def _iter(self, kind):
+        return sorted(self._gs.get(kind, {}).items())
+
+    def iter_workspaces(self):
+        return self._iter('workspaces')
+
+    def iter_layers(self):
+        return self._iter('layers')
+
+    def iter_layergroups(self):
+        return self._iter('layergroups')
+
+    def iter_styles(self):
+        return self._iter('styles')
+
+GS = {
+    'workspaces': {'ws1': {'name': 'ws1'}, 'ws2': {'name': 'ws2'}},
+    'layers': {'ws1:roads': {'name': 'roads'}},
+    'layergroups': {},
+    'styles': {'line': {'name': 'line', 'filename': 'line.sld'}},
+}
+
+def line(kind, name, data):
+    return json.dumps({'kind': kind, 'name': name, 'data': data},
+                      sort_keys=True) + '\n'
+
+class ExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'export.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text):
+        with open(self.filename, 'w') as f:
+            f.write(text)
+
+    def read(self):
+        with open(self.filename) as f:
+            return f.read()
+
+    def test_repair_incomplete_line(self):
+        complete = line('workspaces', 'ws1', {'name': 'ws1'})
+        self.write(complete + line('workspaces', 'ws2', {'name': 'ws2'})[:20])
+        self.assertTrue(export.repair_export(self.filename))
+        self.assertEqual(self.read(), complete)
+
+    def test_repair_line_without_newline(self):
+        complete = line('workspaces', 'ws1', {'name': 'ws1'})
+        self.write(complete + line('workspaces', 'ws2', {'name': 'ws2'})[:-1])
+        self.assertTrue(export.repair_export(self.filename))
+        self.assertEqual(self.read(), complete)
+
+    def test_repair_complete(self):
+        complete = line('workspaces', 'ws1', {'name': 'ws1'})
+        self.write(complete)
+        self.assertFalse(export.repair_export(self.filename))
+        self.assertEqual(self.read(), complete)
+
+    def test_write(self):
+        export.write_export(Crawler(GS), self.filename)
+        self.assertEqual(export.load_export(self.filename), GS)
+
+    def test_resume(self):
+        # the crawl was interrupted while writing the second workspace
+        self.write(line('workspaces', 'ws1', {'name': 'ws1', 'old': True}) +
+                   line('workspaces', 'ws2', {'name': 'ws2'})[:20])
+        export.write_export(Crawler(GS), self.filename, resume=True)
+        records = [(kind, name) for kind, name, data
+                   in export.iter_export(self.filename)]
+        # every object once, the ones in the export are not fetched again
+        self.assertEqual(sorted(records), sorted(
+                (kind, name) for kind in GS for name in GS[kind]))
+        gs = export.load_export(self.filename)
+        self.assertEqual(gs['workspaces']['ws1'], {'name': 'ws1',
+                                                   'old': True})
+        self.assertEqual(gs['styles'], GS['styles'])
+
+    def test_resume_without_export(self):
+        export.write_export(Crawler(GS), self.filename, resume=True)
+        self.assertEqual(export.load_export(self.filename), GS)
+
+    def test_reader(self):
+        export.write_export(Crawler(GS), self.filename)
+        reader = export.ExportReader(self.filename)
+        self.assertEqual(reader.names('workspaces'), ['ws1', 'ws2'])
+        self.assertEqual(reader.get('layers', 'ws1:roads'), {'name': 'roads'})
+        self.assertIsNone(reader.get('layers', 'ws2:roads'))
+        reader.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Tests of the incremental listing parser jsonstream.iter_list, with the
+response split into chunks of every size.
+
+Run with:
+    python -m unittest discover tests
+"""
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..',
+                                'geoserver'))
+import jsonstream
+
+def chunked(text, size):
+    """Returns text split into chunks of size characters."""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class IterListTest(unittest.TestCase):
+
+    def assertParsed(self, text, expected, root='layers', child='layer'):
+        """Check that text gives the expected items, for every chunk
+        size.
+        """
+        for size in range(1, len(text) + 1):
+            items = list(jsonstream.iter_list(chunked(text, size), root,
+                                              child))
+            self.assertEqual(items, expected, 'chunk size {0}'.format(size))
+
+    def test_listing(self):
+        layers = [{'name': 'roads', 'href': 'http://gs/rest/layers/roads'},
+                  {'name': 'rivers', 'href': 'http://gs/rest/layers/rivers'}]
+        self.assertParsed(json.dumps({'layers': {'layer': layers}}), layers)
+
+    def test_empty_listing(self):
+        self.assertParsed('{"layers": ""}', [])
+
+    def test_single_item(self):
+        self.assertParsed('{"layers": {"layer": {"name": "roads"}}}',
+                          [{'name': 'roads'}])
+
+    def test_whitespace(self):
+        self.assertParsed('{ "layers" : { "layer" : [ {"name": "a"} ,\n'
+                          ' {"name": "b"} ] } }\n',
+                          [{'name': 'a'}, {'name': 'b'}])
+
+    def test_numbers_after_listing(self):
+        self.assertParsed('{"layers": {"layer": [{"name": "a"}]}, '
+                          '"x": 1.5, "y": -12e3, "z": 10}',
+                          [{'name': 'a'}])
+
+    def test_numbers_before_listing(self):
+        self.assertParsed('{"x": 1.5, "y": 2E-2, "layers": {"count": 123, '
+                          '"layer": [{"name": "a"}]}}',
+                          [{'name': 'a'}])
+
+    def test_numbers_in_items(self):
+        items = [{'name': 'a', 'size': 1.25}, {'name': 'b', 'size': 100},
+                 {'name': 'c', 'size': -3.5e10}]
+        self.assertParsed(json.dumps({'layers': {'layer': items}}), items)
+
+    def test_number_at_end_of_item(self):
+        self.assertParsed('{"layers": {"layer": [{"n": 12.75},{"n": 3}]}}',
+                          [{'n': 12.75}, {'n': 3}])
+
+    def test_escaped_strings(self):
+        items = [{'name': u'a"b\\c', 'title': u'caf\xe9 \u2603'},
+                 {'name': 'tab\tnew\nline'}]
+        self.assertParsed(json.dumps({'layers': {'layer': items}}), items)
+
+    def test_utf8_strings(self):
+        # a character of several bytes can be split over two chunks
+        items = [{'name': u'caf\xe9 \u2603'}]
+        self.assertParsed(json.dumps({'layers': {'layer': items}},
+                                     ensure_ascii=False).encode('utf-8'),
+                          items)
+
+    def test_other_keys(self):
+        self.assertParsed('{"styles": {"style": [{"name": "s"}]}}',
+                          [{'name': 's'}], 'styles', 'style')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+"""Tests of rest.as_list, for the lists of geoserver that are a single
+object or missing.
+
+Run with:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..',
+                                'geoserver'))
+import rest
+
+class AsListTest(unittest.TestCase):
+
+    def test_missing(self):
+        self.assertEqual(rest.as_list(None), [])
+
+    def test_single(self):
+        # geoserver does not put a single object in a list
+        self.assertEqual(rest.as_list({'name': 'roads'}), [{'name': 'roads'}])
+
+    def test_list(self):
+        layers = [{'name': 'roads'}, {'name': 'rivers'}]
+        self.assertEqual(rest.as_list(layers), layers)
+        self.assertEqual(rest.as_list([]), [])
+
+if __name__ == '__main__':
+    unittest.main()
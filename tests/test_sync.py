@@ -0,0 +1,97 @@
+"""Tests of the order of the operations in a plan of sync.make_plan.
+
+Run with:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..',
+                                'geoserver'))
+import sync
+
+def catalog(workspaces, styles):
+    """Make a catalog with a datastore with a featuretype, and its layer, in
+    every workspace. The layer of workspace w uses style s<w>, a layergroup
+    holds all layers.
+    """
+    gs = {'workspaces': {}, 'layers': {}, 'layergroups': {}, 'styles': {}}
+    for w in workspaces:
+        gs['workspaces'][w] = {
+            'name': w,
+            'datastores': {'ds': {'name': 'ds', 'type': 'PostGIS',
+                                  'featuretypes': {'roads': {
+                                      'name': 'roads', 'srs': 'EPSG:4326'}}}},
+        }
+        gs['layers'][w + ':roads'] = {
+            'name': 'roads',
+            'resource': {'@class': 'featureType', 'name': w + ':roads'},
+            'defaultStyle': {'name': 's' + w},
+        }
+    for s in styles:
+        gs['styles'][s] = {'name': s, 'filename': s + '.sld'}
+    if workspaces:
+        gs['layergroups']['all'] = {
+            'name': 'all',
+            'publishables': {'published': [
+                {'@type': 'layer', 'name': w + ':roads'}
+                for w in workspaces]},
+        }
+    return gs
+
+def positions(plan):
+    """Returns python dict with (method, key) as key and its position in the
+    plan as value.
+    """
+    return dict(((method, key), i)
+                for i, (method, kind, key, info) in enumerate(plan))
+
+class MakePlanTest(unittest.TestCase):
+
+    def test_styles_deleted_after_workspaces(self):
+        plan = sync.make_plan(catalog([], []),
+                              catalog(['ws9'], ['sws9']))
+        order = positions(plan)
+        self.assertIn(('DELETE', ('workspaces', 'ws9')), order)
+        self.assertGreater(order[('DELETE', ('styles', 'sws9'))],
+                           order[('DELETE', ('workspaces', 'ws9'))])
+
+    def test_objects_deleted_with_parent(self):
+        plan = sync.make_plan(catalog([], []),
+                              catalog(['ws9'], ['sws9']))
+        deleted = [key for method, kind, key, info in plan
+                   if method == 'DELETE']
+        # the datastore, featuretype and layer go with the workspace
+        self.assertEqual(deleted, [('layergroups', 'all'),
+                                   ('workspaces', 'ws9'),
+                                   ('styles', 'sws9')])
+
+    def test_delete_order(self):
+        plan = sync.make_plan(catalog([], []),
+                              catalog(['ws8', 'ws9'], ['sws8', 'sws9']))
+        kinds = [kind for method, kind, key, info in plan
+                 if method == 'DELETE']
+        self.assertEqual(kinds, sorted(kinds,
+                                       key=sync.DELETE_LEVELS.index))
+
+    def test_create_order(self):
+        plan = sync.make_plan(catalog(['ws1'], ['sws1']), catalog([], []))
+        order = positions(plan)
+        self.assertLess(order[('POST', ('workspaces', 'ws1'))],
+                        order[('POST', ('datastores', 'ws1', 'ds'))])
+        self.assertLess(order[('POST', ('datastores', 'ws1', 'ds'))],
+                        order[('POST', ('featuretypes', 'ws1', 'ds',
+                                        'roads'))])
+        # the style has to exist before the layer that uses it
+        self.assertLess(order[('POST', ('styles', 'sws1'))],
+                        order[('PUT', ('layers', 'ws1:roads'))])
+        self.assertLess(order[('PUT', ('layers', 'ws1:roads'))],
+                        order[('POST', ('layergroups', 'all'))])
+
+    def test_no_changes(self):
+        gs = catalog(['ws1'], ['sws1'])
+        self.assertEqual(sync.make_plan(gs, gs), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,287 @@
+"""Tests of the response cache, the conditional requests and the retries of
+util.Util, against the fake geoserver or a server with canned responses.
+
+Run with:
+    python -m unittest discover tests
+"""
+import httplib
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..',
+                                'geoserver'))
+import fake_geoserver
+import util
+
+def make_util(directory, port, **sections):
+    """Make a Util for a server on localhost.
+
+    Keyword arguments:
+    directory -- the directory to write the config file to
+    port -- the port of the server
+    sections -- dict with the options of every extra section of the config
+    """
+    filename = os.path.join(directory, 'settings.cfg')
+    with open(filename, 'w') as f:
+        f.write('[server]\nurl=127.0.0.1\nport={0}\naddress=geoserver\n'
+                'user=admin\npass=geoserver\npool_size=1\n'
+                '[logging]\nfilename={1}\nlevel=INFO\n'.format(port,
+                                                             os.devnull))
+        for section, options in sections.items():
+            f.write('[{0}]\n'.format(section))
+            for option, value in options.items():
+                f.write('{0}={1}\n'.format(option, value))
+    return util.Util(filename)
+
+class Clock:
+    """Stand-in for the time module, with a time that is set by the test."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self._time = util.time
+        util.time = self.clock
+
+    def tearDown(self):
+        util.time = self._time
+
+    def test_get(self):
+        cache = util.ResponseCache(ttl=10)
+        cache.put('get', 'rest/styles.json', 'application/json', (200, 'x'))
+        self.assertEqual(cache.get('GET', 'rest/styles.json',
+                                   'application/json'), (200, 'x'))
+        self.assertIsNone(cache.get('GET', 'rest/styles.json', 'text/xml'))
+
+    def test_expires(self):
+        cache = util.ResponseCache(ttl=10)
+        cache.put('GET', 'rest/styles.json', 'text/xml', (200, 'x'))
+        self.clock.now += 10
+        self.assertEqual(cache.get('GET', 'rest/styles.json', 'text/xml'),
+                         (200, 'x'))
+        self.clock.now += 0.5
+        self.assertIsNone(cache.get('GET', 'rest/styles.json', 'text/xml'))
+
+    def test_put_renews(self):
+        cache = util.ResponseCache(ttl=10)
+        cache.put('GET', 'a', 'text/xml', (200, 'old'))
+        self.clock.now += 8
+        cache.put('GET', 'a', 'text/xml', (200, 'new'))
+        self.clock.now += 8
+        self.assertEqual(cache.get('GET', 'a', 'text/xml'), (200, 'new'))
+
+    def test_least_recently_used_removed(self):
+        cache = util.ResponseCache(ttl=10, max_entries=2)
+        cache.put('GET', 'a', 'text/xml', (200, 'a'))
+        cache.put('GET', 'b', 'text/xml', (200, 'b'))
+        # a is used, so b is the least recently used
+        cache.get('GET', 'a', 'text/xml')
+        cache.put('GET', 'c', 'text/xml', (200, 'c'))
+        self.assertEqual(cache.get('GET', 'a', 'text/xml'), (200, 'a'))
+        self.assertIsNone(cache.get('GET', 'b', 'text/xml'))
+        self.assertEqual(cache.get('GET', 'c', 'text/xml'), (200, 'c'))
+
+    def test_invalidate(self):
+        cache = util.ResponseCache()
+        paths = ['rest/workspaces.json',
+                 'rest/workspaces/ws.json',
+                 'rest/workspaces/ws/datastores.json',
+                 'rest/workspaces/ws/datastores/ds.xml',
+                 'rest/workspaces/ws2.json',
+                 'rest/styles.json']
+        for path in paths:
+            cache.put('GET', path, 'text/xml', (200, path))
+        cache.invalidate('rest/workspaces/ws/datastores/ds?recurse=true')
+        cached = [path for path in paths
+                  if cache.get('GET', path, 'text/xml') is not None]
+        # the listings above it go, its siblings and other paths stay
+        self.assertEqual(cached, ['rest/workspaces/ws2.json',
+                                  'rest/styles.json'])
+
+class FakeGeoserverTest(unittest.TestCase):
+    """Start a fake geoserver and a Util with conditional requests."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = fake_geoserver.FakeGeoserver(
+                ('127.0.0.1', 0), fake_geoserver.Catalog(workspaces=1,
+                                                         styles=2))
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.validators = os.path.join(self.directory, 'validators')
+        self.u = make_util(self.directory, self.server.server_address[1],
+                           conditional={'enabled': 'true',
+                                        'directory': self.validators})
+
+    def tearDown(self):
+        self.u.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def requests(self):
+        return sum(self.server.stats()['requests'].values())
+
+class ValidatorStoreTest(FakeGeoserverTest):
+
+    def test_not_modified(self):
+        first = self.u.request('GET', 'rest/styles.json', None,
+                               'application/json')
+        self.server.reset_stats()
+        self.assertEqual(self.u.request('GET', 'rest/styles.json', None,
+                                        'application/json'), first)
+        self.assertEqual(self.requests(), 1)
+
+    def test_not_modified_without_body(self):
+        first = self.u.request('GET', 'rest/styles.json', None,
+                               'application/json')
+        for filename in os.listdir(self.validators):
+            if filename.endswith('.body'):
+                os.remove(os.path.join(self.validators, filename))
+        self.server.reset_stats()
+        # the 304 is useless now, the full response is asked for again
+        self.assertEqual(self.u.request('GET', 'rest/styles.json', None,
+                                        'application/json'), first)
+        self.assertEqual(self.requests(), 2)
+        self.server.reset_stats()
+        self.assertEqual(self.u.request('GET', 'rest/styles.json', None,
+                                        'application/json'), first)
+        self.assertEqual(self.requests(), 1)
+
+    def test_key_includes_server(self):
+        store = util.ValidatorStore(self.validators, 'a:8080/geoserver')
+        other = util.ValidatorStore(self.validators, 'b:8080/geoserver')
+        store.put('rest/styles.json', 'text/xml', '"1"', None, 'body')
+        self.assertEqual(store.get_body('rest/styles.json', 'text/xml'),
+                         'body')
+        self.assertIsNone(other.get('rest/styles.json', 'text/xml'))
+        self.assertIsNone(other.get_body('rest/styles.json', 'text/xml'))
+
+class CannedServer(threading.Thread):
+    """Server that answers every connection with the next of a list of raw
+    responses and closes it.
+    """
+
+    def __init__(self, responses):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.responses = list(responses)
+        self.socket = socket.socket()
+        self.socket.bind(('127.0.0.1', 0))
+        self.socket.listen(5)
+        self.port = self.socket.getsockname()[1]
+
+    def run(self):
+        while self.responses:
+            connection, address = self.socket.accept()
+            connection.recv(65536)
+            connection.sendall(self.responses.pop(0))
+            connection.close()
+        self.socket.close()
+
+def response(body, length=None):
+    """Make a raw response, with a Content-Length of length when given."""
+    if length is None:
+        length = len(body)
+    return ('HTTP/1.1 200 OK\r\nContent-Length: {0}\r\n'
+            'Connection: close\r\n\r\n{1}'.format(length, body))
+
+class RetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_util(self, responses):
+        server = CannedServer(responses)
+        server.start()
+        return make_util(self.directory, server.port,
+                         retry={'retries': 1, 'backoff': 0.0})
+
+    def test_request_after_partial_body(self):
+        u = self.make_util([response('01234', 10), response('0123456789')])
+        self.assertEqual(u.request('GET', 'rest/styles.json'),
+                         (200, '0123456789'))
+        u.close()
+
+    def test_download_after_partial_body(self):
+        # the part of the first attempt is not kept in the file
+        u = self.make_util([response('01234', 10), response('0123456789')])
+        filename = os.path.join(self.directory, 'style.sld')
+        self.assertEqual(u.download('rest/styles/s.sld', filename), 200)
+        with open(filename) as f:
+            self.assertEqual(f.read(), '0123456789')
+        u.close()
+
+    def test_stream_partial_body(self):
+        u = self.make_util([response('01234', 10)])
+        with u.stream('GET', 'rest/styles.json') as streamed:
+            self.assertEqual(streamed.read(5), '01234')
+            self.assertRaises(httplib.IncompleteRead, streamed.read, 5)
+        u.close()
+
+    def test_no_retry_of_post(self):
+        u = self.make_util([response('01234', 10), response('0123456789')])
+        self.assertRaises(Exception, u.request, 'POST', 'rest/styles', 'x')
+        u.close()
+
+class Response:
+    """Stand-in for a HTTP response with headers."""
+
+    def __init__(self, status, headers):
+        self.status = status
+        self._headers = headers
+
+    def getheader(self, name, default=None):
+        return self._headers.get(name, default)
+
+class RetryDelayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.u = make_util(self.directory, 8080,
+                           retry={'backoff': 0.5, 'max_backoff': 4.0})
+
+    def tearDown(self):
+        self.u.close()
+        shutil.rmtree(self.directory)
+
+    def test_bounds(self):
+        for attempt in range(8):
+            maximum = min(4.0, 0.5 * 2 ** attempt)
+            delays = [self.u._retry_delay(attempt, None, Response(503, {}))
+                      for i in range(200)]
+            self.assertTrue(all(0 <= d <= maximum for d in delays))
+            # the delays are spread, not all the maximum
+            self.assertLess(min(delays), maximum / 2)
+
+    def test_retry_after(self):
+        for i in range(50):
+            delay = self.u._retry_delay(0, None,
+                                        Response(503, {'retry-after': '3'}))
+            self.assertTrue(3 <= delay <= 4.0)
+        delay = self.u._retry_delay(0, None,
+                                    Response(429, {'retry-after': '100'}))
+        self.assertTrue(delay <= 4.0)
+
+    def test_error(self):
+        delay = self.u._retry_delay(1, socket.error(), None)
+        self.assertTrue(0 <= delay <= 1.0)
+
+if __name__ == '__main__':
+    unittest.main()